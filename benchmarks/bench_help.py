@@ -0,0 +1,149 @@
+"""Benchmark: help rendering on synthetic command trees of growing size.
+
+Run with ``python benchmarks/bench_help.py [--depth 3] [--fanout 2 4 8]``.
+
+For every fan-out a tree is generated with ``synthetic.py`` and the
+root help, the help of the deepest command and the root help with
+``use_tree=False`` are rendered, each with the cached layouts of the tree
+cleared, so the layout walk is always timed. Wall time (best of
+``--repeat``), peak memory (tracemalloc), the number of generation-0
+garbage collections (a measure of allocation churn) and the time per
+thousand nodes are reported, so the rows form a scaling curve. Import
+times are measured in a fresh process.
+"""
+
+import argparse
+import gc
+import json
+import re
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+from synthetic import count_nodes, deepest_path, synthetic_tree
+
+from treeclick import TreeGroup
+from treeclick.core import format_tree_help, make_help_context
+
+SCENARIOS = ("root", "deep", "indent")
+
+
+def render(root, scenario, width, renderer="rich"):
+    path = deepest_path(root) if scenario == "deep" else ()
+    ctx = make_help_context(root, path, terminal_width=width)
+    return format_tree_help(
+        ctx,
+        is_group=isinstance(ctx.command, TreeGroup),
+        use_tree=scenario != "indent",
+        max_width=width,
+        root_name=root.name,
+        renderer=renderer,
+    )
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def gc_collections(func):
+    """Number of generation-0 collections triggered while running ``func``."""
+    gc.collect()
+    before = gc.get_stats()[0]["collections"]
+    func()
+    return gc.get_stats()[0]["collections"] - before
+
+
+def import_times():
+    """Cumulative import time in ms of treeclick and of its rich renderer."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import treeclick.render"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            cumulative[match.group(2)] = int(match.group(1)) / 1000
+    return {
+        "treeclick": cumulative.get("treeclick", 0.0),
+        "treeclick.render": cumulative.get("treeclick.render", 0.0),
+    }
+
+
+def run(args):
+    results = []
+    for fanout in args.fanout:
+        root = synthetic_tree(
+            depth=args.depth,
+            fanout=fanout,
+            options=args.options,
+            help_words=args.help_words,
+            name="bench",
+        )
+        nodes = count_nodes(root)
+        for scenario in SCENARIOS:
+
+            def cold_render(root=root, scenario=scenario):
+                # Without its cached layout every render walks the tree.
+                root.__dict__.pop("_help_layouts", None)
+                render(root, scenario, args.width, args.renderer)
+
+            seconds = min(timeit.repeat(cold_render, number=1, repeat=args.repeat))
+            results.append(
+                {
+                    "scenario": scenario,
+                    "fanout": fanout,
+                    "nodes": nodes,
+                    "ms": seconds * 1000,
+                    "ms_per_1k_nodes": seconds * 1000 * 1000 / nodes,
+                    "peak_kib": peak_memory(cold_render) / 1024,
+                    "gc_collections": gc_collections(cold_render),
+                }
+            )
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, nargs="+", default=[2, 4, 6, 8])
+    parser.add_argument("--options", type=int, default=3)
+    parser.add_argument("--help-words", type=int, default=8)
+    parser.add_argument("--width", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--renderer", choices=("rich", "ansi"), default="rich")
+    parser.add_argument("--json", action="store_true", help="Print JSON results.")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    imports = import_times()
+    if args.json:
+        print(json.dumps({"imports_ms": imports, "results": results}, indent=2))
+        return
+
+    print(
+        f"import treeclick: {imports['treeclick']:.1f} ms, "
+        f"with renderer: {imports['treeclick.render']:.1f} ms"
+    )
+    print(
+        f"{'scenario':<8} {'fanout':>6} {'nodes':>8} {'ms':>10} "
+        f"{'ms/1k nodes':>12} {'peak KiB':>10} {'gc runs':>8}"
+    )
+    for row in results:
+        print(
+            f"{row['scenario']:<8} {row['fanout']:>6} {row['nodes']:>8} "
+            f"{row['ms']:>10.1f} {row['ms_per_1k_nodes']:>12.2f} "
+            f"{row['peak_kib']:>10.0f} {row['gc_collections']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark: help renders per second from a growing number of threads.
+
+Run with ``python benchmarks/bench_threads.py [--threads 1 2 4 8]``.
+
+One ``treeclick.threadsafe.HelpRenderer`` is shared by all threads, which
+render the help of every command of a synthetic tree in turn. Every output
+is compared with a single-threaded render, so a corrupted render fails the
+run. On interpreters with a GIL the rate stays roughly flat as threads are
+added; on free-threaded builds it grows with the number of cores.
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from synthetic import count_nodes, synthetic_tree
+
+from treeclick.threadsafe import HelpRenderer
+
+
+def command_paths(root, path=()):
+    yield path
+    if isinstance(root, click.Group):
+        for name, cmd in sorted(root.commands.items()):
+            yield from command_paths(cmd, path + (name,))
+
+
+def run(args):
+    root = synthetic_tree(depth=args.depth, fanout=args.fanout, name="bench")
+    renderer = HelpRenderer(root, renderer=args.renderer)
+    paths = list(command_paths(root))
+    jobs = (paths * (args.renders // len(paths) + 1))[: args.renders]
+    expected = {path: renderer.render(path, args.width) for path in paths}
+    results = []
+    for threads in args.threads:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            outputs = list(pool.map(lambda p: renderer.render(p, args.width), jobs))
+        seconds = time.perf_counter() - start
+        if any(output != expected[path] for path, output in zip(jobs, outputs)):
+            raise SystemExit(f"corrupted output with {threads} threads")
+        results.append(
+            {
+                "threads": threads,
+                "renders": len(jobs),
+                "seconds": seconds,
+                "renders_per_s": len(jobs) / seconds,
+            }
+        )
+    return count_nodes(root), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--renders", type=int, default=400)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--renderer", choices=("rich", "ansi"), default="ansi")
+    parser.add_argument("--json", action="store_true", help="Print JSON results.")
+    args = parser.parse_args(argv)
+
+    nodes, results = run(args)
+    if args.json:
+        print(json.dumps({"nodes": nodes, "results": results}, indent=2))
+        return
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"{nodes} nodes, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>7} {'renders':>8} {'s':>8} {'renders/s':>10}")
+    for row in results:
+        print(
+            f"{row['threads']:>7} {row['renders']:>8} {row['seconds']:>8.2f} "
+            f"{row['renders_per_s']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
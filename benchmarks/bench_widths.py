@@ -0,0 +1,47 @@
+"""Microbenchmark: label measurement with rich versus treeclick.widths.
+
+Run with ``python benchmarks/bench_widths.py [N]``.
+"""
+
+import sys
+import timeit
+
+from rich.console import Console
+from rich.text import Text
+
+from treeclick.widths import cell_widths
+
+
+def make_labels(count):
+    labels = []
+    for i in range(count):
+        name = f"option-{i % 997}-{'x' * (i % 13)}"
+        if i % 50 == 0:
+            name += "-名前"
+        labels.append(f"--{name}, -{chr(97 + i % 26)}")
+    return labels
+
+
+def measure_with_rich(labels, console):
+    return [
+        console.measure(Text.from_markup(f"[bold yellow]{label}[/bold yellow]")).maximum
+        for label in labels
+    ]
+
+
+def main(count=20000):
+    labels = make_labels(count)
+    console = Console(width=120)
+    assert measure_with_rich(labels, console) == cell_widths(labels)
+    rich_time = min(
+        timeit.repeat(lambda: measure_with_rich(labels, console), number=1, repeat=3)
+    )
+    fast_time = min(timeit.repeat(lambda: cell_widths(labels), number=1, repeat=3))
+    print(f"{count} option labels")
+    print(f"  rich measure:      {rich_time * 1000:8.1f} ms")
+    print(f"  treeclick.widths:  {fast_time * 1000:8.1f} ms")
+    print(f"  speedup:           {rich_time / fast_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
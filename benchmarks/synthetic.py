@@ -0,0 +1,109 @@
+from itertools import count
+
+import click
+
+from treeclick import TreeCommand, TreeGroup
+
+WORDS = (
+    "manage",
+    "the",
+    "configured",
+    "resources",
+    "for",
+    "each",
+    "selected",
+    "project",
+    "and",
+    "report",
+    "any",
+    "changes",
+    "to",
+    "remote",
+    "storage",
+)
+
+
+def help_text(words, seed):
+    """Deterministic help text of ``words`` words."""
+    return " ".join(WORDS[(seed + i) % len(WORDS)] for i in range(words)).capitalize()
+
+
+def synthetic_tree(
+    depth=3,
+    fanout=4,
+    options=3,
+    help_words=8,
+    arguments=1,
+    name="synthetic",
+    **settings,
+):
+    """Build a deterministic ``TreeGroup`` hierarchy for benchmarks and tests.
+
+    Every group has ``fanout`` children down to ``depth`` levels; the last
+    level holds commands. Each command has ``arguments`` arguments, and
+    every command and group has ``options`` options. Help texts are
+    ``help_words`` long. ``settings`` are passed to the root group.
+    """
+    counter = count()
+
+    def params(number):
+        return [
+            click.Option(
+                [f"--option-{i}", f"-{chr(97 + i % 26)}"],
+                help=help_text(help_words, next(counter)),
+                required=i == 0 and number > 1,
+            )
+            for i in range(number)
+        ]
+
+    def fill(group, level):
+        for i in range(fanout):
+            child_name = f"{'group' if level < depth else 'command'}-{level}-{i}"
+            if level < depth:
+                child = TreeGroup(
+                    name=child_name,
+                    help=help_text(help_words, next(counter)),
+                    params=params(options),
+                )
+                group.add_command(child)
+                fill(child, level + 1)
+            else:
+                child_params = [
+                    click.Argument([f"arg_{j}"]) for j in range(arguments)
+                ] + params(options)
+                group.add_command(
+                    TreeCommand(
+                        name=child_name,
+                        help=help_text(help_words, next(counter)),
+                        params=child_params,
+                    )
+                )
+
+    root = TreeGroup(
+        name=name,
+        help=help_text(help_words, next(counter)),
+        params=params(options),
+        **settings,
+    )
+    if depth > 0:
+        fill(root, 1)
+    return root
+
+
+def deepest_path(root):
+    """Name path of the first command on the deepest level below ``root``."""
+    path = []
+    cmd = root
+    while isinstance(cmd, click.Group) and cmd.commands:
+        name = min(cmd.commands)
+        path.append(name)
+        cmd = cmd.commands[name]
+    return tuple(path)
+
+
+def count_nodes(root):
+    """Number of commands and options in the tree, root included."""
+    nodes = 1 + sum(1 for param in root.params if isinstance(param, click.Option))
+    if isinstance(root, click.Group):
+        nodes += sum(count_nodes(cmd) for cmd in root.commands.values())
+    return nodes
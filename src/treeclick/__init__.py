@@ -1,5 +1,14 @@
 __version__ = "0.1.0"
 
-from .core import TreeGroup, TreeCommand
+from .core import TreeCommand, TreeGroup
+from .lazy import LazyCommand, LazyTreeGroup
+from .providers import LazyChoice, TreeOption
 
-__all__ = ["TreeGroup", "TreeCommand"]
+__all__ = [
+    "LazyChoice",
+    "LazyCommand",
+    "LazyTreeGroup",
+    "TreeCommand",
+    "TreeGroup",
+    "TreeOption",
+]
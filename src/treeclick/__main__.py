@@ -0,0 +1,150 @@
+import click
+
+from .catalog import DEFAULT_WIDTHS, build_catalog
+from .completion import SCRIPTS, completion_script, index_path, write_completion_index
+from .core import TreeCommand, TreeGroup
+from .docs import FORMATS, write_docs
+
+main = TreeGroup(name="treeclick", help="Tools for treeclick-based CLIs.")
+
+
+@main.command(name="build-catalog", cls=TreeCommand)
+@click.argument("target")
+@click.option("--output", "-o", default="help.catalog", help="Catalog file to write.")
+@click.option(
+    "--width",
+    "-w",
+    "widths",
+    type=int,
+    multiple=True,
+    help="Width bucket to pre-render; repeat for several.",
+)
+@click.option("--prog-name", help="Program name the CLI is invoked as.")
+@click.option("--processes", "-p", type=int, help="Number of render processes.")
+def build_catalog_command(target, output, widths, prog_name, processes):
+    """Pre-render help for every command of TARGET (module:cli) into a catalog."""
+    try:
+        count = build_catalog(
+            target,
+            output,
+            widths=widths or DEFAULT_WIDTHS,
+            prog_name=prog_name,
+            processes=processes,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e)) from e
+    click.echo(f"Wrote {count} help entries to {output}")
+
+
+@main.command(name="completion-index", cls=TreeCommand)
+@click.argument("target")
+@click.option("--output", "-o", default="completion.index", help="Index file to write.")
+def completion_index_command(target, output):
+    """Write the shell completion index of TARGET (module:cli).
+
+    A relative OUTPUT is written to the user cache directory.
+    """
+    from .lazy import load_object
+
+    output = index_path(output)
+    if write_completion_index(load_object(target), output):
+        click.echo(f"Wrote completion index to {output}")
+    else:
+        click.echo(f"Completion index {output} is up to date")
+
+
+@main.command(name="completion-script", cls=TreeCommand)
+@click.option("--shell", type=click.Choice(sorted(SCRIPTS)), default="bash")
+@click.option("--prog-name", required=True, help="Program name to complete.")
+@click.option("--index", required=True, help="Completion index file.")
+def completion_script_command(shell, prog_name, index):
+    """Print a shell script that completes PROG_NAME from an index file."""
+    click.echo(completion_script(shell, prog_name, index), nl=False)
+
+
+def parse_formats(ctx, param, value):
+    formats = [fmt.strip() for fmt in value.split(",") if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise click.BadParameter(
+            f"expected a comma-separated list of {', '.join(FORMATS)}"
+        )
+    return formats
+
+
+@main.command(name="docs", cls=TreeCommand)
+@click.argument("target")
+@click.option("--output", "-o", default="docs", help="Directory to write pages to.")
+@click.option(
+    "--format",
+    "-f",
+    "formats",
+    default=",".join(FORMATS),
+    callback=parse_formats,
+    help="Comma-separated page formats: md, html, man.",
+)
+@click.option("--prog-name", help="Program name the CLI is invoked as.")
+def docs_command(target, output, formats, prog_name):
+    """Write a documentation page per command of TARGET (module:cli)."""
+    from .lazy import load_object
+
+    count = write_docs(load_object(target), output, formats, prog_name=prog_name)
+    click.echo(f"Wrote {count} pages to {output}")
+
+
+@main.command(name="profile", cls=TreeCommand)
+@click.argument("target")
+@click.option("--prog-name", help="Program name the CLI is invoked as.")
+@click.option("--width", "-w", type=int, default=80, help="Terminal width.")
+@click.option(
+    "--renderer", type=click.Choice(["ansi", "rich"]), default="ansi", help="Backend."
+)
+@click.option("--repeat", type=int, default=3, help="Warm renders per path.")
+@click.option("--max-depth", type=int, help="Deepest command paths to profile.")
+@click.option("--functions", type=int, default=10, help="Hot functions to list.")
+@click.option(
+    "--sort",
+    type=click.Choice(["path", "nodes", "cold", "warm", "memory", "size"]),
+    default="path",
+    help="Order of the table rows.",
+)
+@click.option("--limit", type=int, help="Number of table rows to show.")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON.")
+def profile_command(
+    target,
+    prog_name,
+    width,
+    renderer,
+    repeat,
+    max_depth,
+    functions,
+    sort,
+    limit,
+    as_json,
+):
+    """Measure help rendering for every command of TARGET (module:cli)."""
+    import json
+
+    from .lazy import load_object
+    from .profiling import format_report, module_import_time, profile_cli
+
+    import_ms = module_import_time(target)
+    report = profile_cli(
+        load_object(target),
+        prog_name=prog_name,
+        width=width,
+        renderer=renderer,
+        repeat=repeat,
+        max_depth=max_depth,
+        functions=functions,
+    )
+    report = {"target": target, "import_ms": import_ms, **report}
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        for line in format_report(report, sort, limit):
+            click.echo(line)
+
+
+if __name__ == "__main__":
+    main(prog_name="treeclick")
@@ -0,0 +1,438 @@
+"""Help renderer that writes text and ANSI escapes directly, without rich.
+
+It produces the same layout as the rich renderer in ``render.py``: lines
+are wrapped and folded with the same rules rich uses, so only the escape
+sequences can differ. Styled text is handled as lists of ``(text, style)``
+runs, one list per output line, where ``style`` is a space-separated list
+of the style words used in help output.
+"""
+
+import os
+import re
+from itertools import islice
+
+from .core import context_path, default_root_name, help_layout
+from .instrument import NULL_RECORDER, record_layout
+from .layout import (
+    DESCRIPTION_LABEL,
+    GROUP_USAGE,
+    GUIDES,
+    INDENT_SIZE,
+    STREAM_BATCH,
+    Header,
+    guide_levels,
+    help_width,
+    select_rows,
+    wrap_text,
+)
+from .widths import cache_info, cell_width
+from .wrapping import divide_line, fit_line
+
+ATTRIBUTE_CODES = {"bold": "1", "dim": "2", "italic": "3"}
+STANDARD_COLORS = {"red": "31", "green": "32", "yellow": "33", "cyan": "36"}
+# 8-bit colors and their closest standard color for 16-color terminals.
+EIGHT_BIT_COLORS = {"orange1": ("38;5;214", "93")}
+
+HIGHLIGHT_RE = re.compile(r"(?P<bold>[][{}()])|(?P<yellow>\.\.\.)")
+
+
+def detect_palette(environ=None):
+    """Map color names to SGR parameters for the terminal, as rich does.
+
+    Returns None when no escapes should be written at all (dumb terminals),
+    and an empty palette when ``NO_COLOR`` is set.
+    """
+    environ = os.environ if environ is None else environ
+    term = environ.get("TERM", "").strip().lower()
+    if term in ("dumb", "unknown"):
+        return None
+    if environ.get("NO_COLOR", ""):
+        return {}
+    color_term = environ.get("COLORTERM", "").strip().lower()
+    eight_bit = color_term in ("truecolor", "24bit") or term.rpartition("-")[2] in (
+        "256color",
+        "kitty",
+    )
+    palette = dict(STANDARD_COLORS)
+    for name, (code, standard) in EIGHT_BIT_COLORS.items():
+        palette[name] = code if eight_bit else standard
+    return palette
+
+
+class Painter:
+    """Turns runs into strings with escape sequences for one palette."""
+
+    def __init__(self, palette):
+        self.palette = palette
+        self._codes = {}
+
+    def sgr(self, style):
+        """Return the escape sequence that starts ``style``, or ""."""
+        codes = self._codes.get(style)
+        if codes is None:
+            if self.palette is None:
+                codes = ""
+            else:
+                words = style.split()
+                params = [
+                    ATTRIBUTE_CODES[word] for word in ATTRIBUTE_CODES if word in words
+                ]
+                colors = [word for word in words if word in self.palette]
+                if colors:
+                    params.append(self.palette[colors[-1]])
+                codes = f"\x1b[{';'.join(params)}m" if params else ""
+            self._codes[style] = codes
+        return codes
+
+    def line(self, runs):
+        """Render one line of runs, merging neighbours with the same style."""
+        parts = []
+        current, texts = None, []
+        for text, style in runs:
+            if not text:
+                continue
+            if style != current and texts:
+                parts.append(self._paint("".join(texts), current))
+                texts = []
+            current = style
+            texts.append(text)
+        if texts:
+            parts.append(self._paint("".join(texts), current))
+        return "".join(parts)
+
+    def _paint(self, text, style):
+        codes = self.sgr(style) if style else ""
+        return f"{codes}{text}\x1b[0m" if codes else text
+
+
+def dimmed(runs):
+    """Return ``runs`` with the dim attribute added to every run."""
+    return [(text, f"{style} dim" if style else "dim") for text, style in runs]
+
+
+def plain_text(runs):
+    return "".join(text for text, _ in runs)
+
+
+def runs_width(runs):
+    return sum(cell_width(text) for text, _ in runs)
+
+
+def split_runs(runs, offsets):
+    """Split a line of runs at the character ``offsets`` of its text."""
+    lines, line, position = [], [], 0
+    offsets = list(offsets)
+    for text, style in runs:
+        while offsets and offsets[0] < position + len(text):
+            cut = offsets.pop(0) - position
+            line.append((text[:cut], style))
+            lines.append(line)
+            line, text, position = [], text[cut:], position + cut
+        line.append((text, style))
+        position += len(text)
+    lines.append(line)
+    return lines
+
+
+def crop_runs(runs, length):
+    """Keep the first ``length`` characters of a line of runs."""
+    cropped = []
+    for text, style in runs:
+        if length <= 0:
+            break
+        cropped.append((text[:length], style))
+        length -= len(text)
+    return cropped
+
+
+def wrap_runs(runs, width):
+    """Word wrap one line of runs to ``width`` cells."""
+    text = plain_text(runs)
+    if len(text) <= width and cell_width(text) <= width:
+        return [runs]
+    lines = []
+    for line in split_runs(runs, divide_line(text, width)):
+        line_text = plain_text(line)
+        keep = fit_line(line_text, width)
+        if keep < len(line_text):
+            line = crop_runs(line, keep)
+        lines.append(line)
+    return lines
+
+
+def highlight(text):
+    """Runs for ``text`` with brackets in bold and ellipses in yellow."""
+    runs, position = [], 0
+    for match in HIGHLIGHT_RE.finditer(text):
+        if match.start() > position:
+            runs.append((text[position : match.start()], ""))
+        runs.append((match.group(0), match.lastgroup))
+        position = match.end()
+    if position < len(text):
+        runs.append((text[position:], ""))
+    return runs
+
+
+class Output:
+    """Collects printed lines, wrapping them to the output width."""
+
+    def __init__(self, width, painter):
+        self.width = width
+        self.painter = painter
+        self.lines = []
+        self._partial = ""
+
+    def print(self, lines=((),), end="\n"):
+        """Print lines of runs; with ``end=""`` the last line stays open."""
+        texts = []
+        for runs in lines:
+            for line in wrap_runs(list(runs), self.width):
+                texts.append(self.painter.line(line))
+        text = self._partial + "\n".join(texts) + end
+        self._partial = ""
+        *complete, last = text.split("\n")
+        self.lines.extend(line + "\n" for line in complete)
+        self._partial = last
+
+    def drain(self):
+        """Return the complete lines printed so far and forget them."""
+        lines, self.lines = self.lines, []
+        return lines
+
+
+def command_text(node):
+    """Runs of a command node's label: its name and arguments."""
+    runs = [(node.name, "bold green" if node.kind == "group" else "cyan"), (" ", "")]
+    for index, arg in enumerate(node.args):
+        if index:
+            runs.append((" ", ""))
+        runs.extend((("[", ""), (arg, "orange1"), ("]", "")))
+    return runs
+
+
+def option_text(node):
+    """Runs of an option node's label: its flags."""
+    return [(node.label, "bold yellow")]
+
+
+def star_text(option):
+    """Required marker plus the space that separates it from the help."""
+    if option.required:
+        return [("*", "red"), (" ", "")]
+    return [(" ", "")]
+
+
+def command_label(
+    left, left_len, level, help, global_column, width, style, recorder=NULL_RECORDER
+):
+    """Lines of a command row; ``style`` is "current", "dim" or None."""
+    pad = global_column - level * INDENT_SIZE - left_len
+    help_start_relative = left_len + pad
+    available_width = help_width(width, level * INDENT_SIZE + help_start_relative)
+    lines = wrap_text(help or "", available_width, recorder)
+    indent = " " * help_start_relative
+    if style == "dim":
+        first = dimmed(left) + [(" " * pad, "")]
+        if lines:
+            first.append((lines[0], "dim"))
+        rest = [[(indent, "dim"), (line, "dim")] for line in lines[1:]]
+    else:
+        help_style = "bold" if style == "current" else ""
+        first = left + [(" " * pad, "")]
+        if lines:
+            first.append((lines[0], help_style))
+        rest = [[(indent, ""), (line, help_style)] for line in lines[1:]]
+    return [first] + rest
+
+
+def option_label(option, global_column, width, dim=False, recorder=NULL_RECORDER):
+    """Lines of an option row."""
+    left = option_text(option)
+    pad = global_column + 4 - option.depth * INDENT_SIZE - option.width
+    star = star_text(option)
+    help_start_relative = option.width + pad + cell_width(plain_text(star))
+    help_start_absolute = option.depth * INDENT_SIZE + help_start_relative
+    available_width = help_width(width, help_start_absolute)
+    lines = wrap_text(option.help, available_width, recorder)
+    indent = " " * help_start_relative
+    help_style = "italic yellow dim" if dim else "italic yellow"
+    first = left + [(" " * pad, "")] + star
+    if dim:
+        first = dimmed(first)
+    if lines:
+        first.append((lines[0], help_style))
+    rest = [[(indent, "dim" if dim else ""), (line, help_style)] for line in lines[1:]]
+    return [first] + rest
+
+
+def tree_lines(rows, root_name, global_column, width, guides, recorder):
+    """Lines of runs, guides included, for rows from ``guide_levels``."""
+    guide_chars = GUIDES[guides]
+    lines = []
+    for node, style, levels in rows:
+        if node.depth == 0:
+            label = command_label(
+                [(root_name, "bold green")],
+                cell_width(root_name),
+                0,
+                node.help,
+                global_column,
+                width,
+                style,
+                recorder,
+            )
+        elif node.kind == "notice":
+            label = [[(node.help, "red")]]
+        elif node.kind == "summary":
+            label = [[(node.label, "dim")]]
+        elif node.kind == "option":
+            label = option_label(node, global_column, width, style == "dim", recorder)
+        else:
+            label = command_label(
+                command_text(node),
+                node.width,
+                node.depth,
+                node.help,
+                global_column,
+                width,
+                style,
+                recorder,
+            )
+        available = width - node.depth * INDENT_SIZE
+        prefix = levels[0]
+        for line in label:
+            if available > 0 and runs_width(line) > available:
+                pieces = wrap_runs(line, available)
+            else:
+                pieces = [line]
+            for piece in pieces:
+                lines.append([(guide_chars[level], "dim") for level in prefix] + piece)
+                prefix = levels[1]
+    return lines
+
+
+def iter_tree_rows(rows, root_name, global_column, output, guides, recorder):
+    """Print ``rows`` in batches, yielding each batch's lines."""
+    rows = guide_levels(rows)
+    while True:
+        batch = list(islice(rows, STREAM_BATCH))
+        if not batch:
+            break
+        recorder.count("rows", len(batch))
+        with recorder.phase("labels"):
+            lines = tree_lines(
+                batch, root_name, global_column, output.width, guides, recorder
+            )
+        with recorder.phase("render"):
+            output.print(lines)
+        yield from output.drain()
+
+
+def print_header(output, ctx, is_group, layout, path, budget, recorder):
+    """Print the usage, description, options and "Commands:" heading."""
+    header = Header(ctx, is_group, layout, path, budget, output.width, recorder)
+    if header.arguments is None:
+        usage = GROUP_USAGE
+    else:
+        args = " ".join(f"[{name}]" for name in header.arguments)
+        usage = "[OPTIONS]" + (f" {args}" if args else "")
+    output.print(
+        [(), [("Usage:", "bold")] + highlight(f" {ctx.command_path} {usage}"), ()]
+    )
+
+    output.print([[(DESCRIPTION_LABEL.rstrip(), "bold"), (" ", "")]], end="")
+    if header.description:
+        output.print([[(header.description[0], "bold")]])
+        indent = " " * header.description_indent
+        for line in header.description[1:]:
+            output.print([[(indent + line, "bold")]])
+    else:
+        output.print()
+
+    if header.options:
+        output.print([[("Options:", "bold")]])
+        for option in header.options:
+            first = (
+                option_text(option.node)
+                + [(" " * option.pad, "")]
+                + star_text(option.node)
+            )
+            if option.lines:
+                first.append((option.lines[0], "italic yellow"))
+            indent = " " * option.indent
+            output.print(
+                [first]
+                + [[(indent, ""), (line, "italic yellow")] for line in option.lines[1:]]
+            )
+        output.print()
+
+    output.print([[("Commands:", "bold")]])
+
+
+def iter_ansi_help(
+    ctx,
+    is_group,
+    guides="tree",
+    max_width=None,
+    root_name=None,
+    budget=None,
+    recorder=NULL_RECORDER,
+):
+    """Yield help for ``ctx`` line by line, with the rich renderer's layout."""
+    width = max_width or ctx.terminal_width or 80
+    output = Output(width, Painter(detect_palette()))
+
+    # Names as invoked, since a command may be registered under other names.
+    path = [ctx.find_root().command.name, *context_path(ctx)]
+    root_command = ctx.find_root().command
+
+    if recorder.enabled:
+        before = cache_info()
+    with recorder.phase("layout"):
+        layout = help_layout(root_command, path[1:], budget, recorder)
+    if recorder.enabled:
+        record_layout(recorder, layout, before, cache_info())
+
+    with recorder.phase("header"):
+        print_header(output, ctx, is_group, layout, path[1:], budget, recorder)
+    yield from output.drain()
+
+    if root_name is None:
+        root_name = default_root_name(path[0])
+    rows = select_rows(layout, path[1:])
+    yield from iter_tree_rows(
+        rows, root_name, layout.global_column, output, guides, recorder
+    )
+
+    output.print()
+    yield from output.drain()
+
+
+def iter_ansi_search(
+    query, layout, rows, shown, total, width, root_name, guides="tree"
+):
+    """Yield ``shown`` of the ``total`` matches for ``query`` as a pruned tree."""
+    output = Output(width, Painter(detect_palette()))
+    output.print()
+    if not total:
+        output.print([[("No commands match ", ""), (query, "bold"), (".", "")]])
+        output.print()
+        yield from output.drain()
+        return
+    output.print(
+        [
+            [
+                ("Search:", "bold"),
+                (f" {total} match{'' if total == 1 else 'es'} for ", ""),
+                (query, "bold"),
+                (f" (showing {shown})" if shown < total else "", ""),
+            ]
+        ]
+    )
+    output.print()
+    yield from output.drain()
+    yield from iter_tree_rows(
+        rows, root_name, layout.global_column, output, guides, NULL_RECORDER
+    )
+    output.print()
+    yield from output.drain()
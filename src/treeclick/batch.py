@@ -0,0 +1,123 @@
+"""Run many command lines in one warm process: ``--batch FILE`` and ``--shell``.
+
+Every line is dispatched through the root group like a separate
+invocation, but imported modules, the command tree and cached help
+layouts are reused. Errors and exit codes are isolated per command line.
+"""
+
+import shlex
+import time
+import traceback
+
+import click
+
+EXIT_WORDS = ("exit", "quit")
+
+
+def parse_line(line):
+    """Return the arguments of a command line, or None for blanks and comments."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    return shlex.split(line)
+
+
+def run_command(root, args, prog_name=None):
+    """Run ``args`` through ``root`` in this process and return the exit code.
+
+    Errors are reported the way click's standalone mode reports them, but
+    never exit the process.
+    """
+    try:
+        with root.make_context(prog_name or root.name, list(args)) as ctx:
+            root.invoke(ctx)
+    except click.ClickException as e:
+        e.show()
+        return e.exit_code
+    except click.exceptions.Exit as e:
+        return e.exit_code
+    except click.Abort:
+        click.echo("Aborted!", err=True)
+        return 1
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        click.echo(e.code, err=True)
+        return 1
+    except Exception:  # noqa: BLE001
+        # A crash in one command line is reported and must not end the run.
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def run_batch(root, lines, prog_name=None):
+    """Run every command line of ``lines``; return 1 if any failed, else 0.
+
+    The exit code and time of each command, then the totals and the
+    throughput, are reported on stderr.
+    """
+    count = failed = 0
+    start = time.perf_counter()
+    for number, line in enumerate(lines, 1):
+        began = time.perf_counter()
+        try:
+            args = parse_line(line)
+        except ValueError as e:
+            click.echo(f"Error: line {number}: {e}", err=True)
+            code = 2
+        else:
+            if args is None:
+                continue
+            code = run_command(root, args, prog_name)
+        seconds = time.perf_counter() - began
+        count += 1
+        failed += code != 0
+        click.echo(
+            f"[line {number}] exit {code} in {seconds * 1000:.1f} ms: {line.strip()}",
+            err=True,
+        )
+    total = time.perf_counter() - start
+    rate = count / total if total else 0.0
+    click.echo(
+        f"{count} commands, {failed} failed in {total:.3f} s ({rate:.1f} commands/s)",
+        err=True,
+    )
+    return 1 if failed else 0
+
+
+def run_shell(root, prog_name=None):
+    """Read and run command lines until ``exit``, ``quit`` or end of input.
+
+    Returns the exit code of the last command.
+    """
+    try:
+        import readline  # noqa: F401 - line editing and history for input()
+    except ImportError:
+        pass
+    prompt = f"{prog_name or root.name}> "
+    code = 0
+    while True:
+        try:
+            line = input(prompt)
+        except EOFError:
+            click.echo()
+            break
+        except KeyboardInterrupt:
+            click.echo()
+            continue
+        if line.strip() in EXIT_WORDS:
+            break
+        try:
+            args = parse_line(line)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            continue
+        if args is None:
+            continue
+        try:
+            code = run_command(root, args, prog_name)
+        except KeyboardInterrupt:
+            click.echo("Interrupted", err=True)
+            code = 130
+    return code
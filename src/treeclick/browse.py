@@ -0,0 +1,350 @@
+"""Interactive explorer of a command tree, opened with ``--help-browse``.
+
+Groups start collapsed. The rows below a command are laid out the first
+time it is expanded, from the command objects and their metadata, so lazily
+loaded commands are never imported. Only the rows in the visible window are
+labelled and painted, labels are kept until the width changes, and only
+the screen lines that changed are written.
+"""
+
+import shutil
+import signal
+
+import click
+
+from .ansi import Painter, crop_runs, detect_palette, plain_text, tree_lines
+from .instrument import NULL_RECORDER
+from .layout import (
+    CONTINUE,
+    END,
+    FORK,
+    SPACE,
+    Layout,
+    LayoutNode,
+    command_node,
+    measure_nodes,
+    option_nodes,
+    sorted_children,
+    subtree_extents,
+)
+from .widths import cell_width
+
+# Width of the column left of the tree, holding the cursor and the
+# expanded/collapsed marker.
+GUTTER = 3
+
+MARKERS = {
+    "tree": ("❯", "▸", "▾"),
+    "ascii": (">", "+", "-"),
+    "indent": (">", "+", "-"),
+}
+
+KEYS = {
+    "\x1b[A": "up",
+    "\x1bOA": "up",
+    "\xe0H": "up",
+    "k": "up",
+    "\x1b[B": "down",
+    "\x1bOB": "down",
+    "\xe0P": "down",
+    "j": "down",
+    "\x1b[C": "expand",
+    "\x1bOC": "expand",
+    "\xe0M": "expand",
+    "l": "expand",
+    "\x1b[D": "collapse",
+    "\x1bOD": "collapse",
+    "\xe0K": "collapse",
+    "h": "collapse",
+    "\r": "toggle",
+    "\n": "toggle",
+    " ": "toggle",
+    "\x1b[5~": "page_up",
+    "\x1b[6~": "page_down",
+    "\x1b[H": "home",
+    "\x1b[1~": "home",
+    "g": "home",
+    "\x1b[F": "end",
+    "\x1b[4~": "end",
+    "G": "end",
+    "q": "quit",
+    "\x1b": "quit",
+}
+
+HINTS = "↑↓ move  → expand  ← collapse  q quit"
+
+
+class BrowseItem:
+    """A row of the explorer: a layout node, its command and its state.
+
+    ``cmd`` is None for options. ``children`` is built on first expansion.
+    """
+
+    __slots__ = ("children", "cmd", "expanded", "last", "line", "node", "parent")
+
+    def __init__(self, node, cmd, parent, last=False):
+        self.node = node
+        self.cmd = cmd
+        self.parent = parent
+        self.last = last
+        self.expanded = False
+        self.children = None
+        self.line = None
+
+    @property
+    def expandable(self):
+        cmd = self.cmd
+        if cmd is None:
+            return False
+        if isinstance(cmd, click.Group) and cmd.commands:
+            return True
+        # The root's options are not part of the tree, as in help output.
+        return self.parent is not None and any(
+            isinstance(param, click.Option) and param.name != "help"
+            for param in cmd.params
+        )
+
+    def path(self):
+        """Names from the root to this row, the root excluded."""
+        names = []
+        item = self
+        while item.parent is not None:
+            names.append(item.node.name)
+            item = item.parent
+        return names[::-1]
+
+    def levels(self):
+        """Guide indexes of the row's first and following lines."""
+        if self.parent is None:
+            return (), ()
+        above = []
+        ancestor = self.parent
+        while ancestor.parent is not None:
+            above.append(SPACE if ancestor.last else CONTINUE)
+            ancestor = ancestor.parent
+        above = tuple(above[::-1])
+        return (
+            above + (END if self.last else FORK,),
+            above + (SPACE if self.last else CONTINUE,),
+        )
+
+
+def build_children(item):
+    """Lay out the option and command rows directly below ``item``."""
+    cmd = item.cmd
+    depth = item.node.depth + 1
+    options = option_nodes(cmd, depth) if item.parent is not None else []
+    commands = []
+    if isinstance(cmd, click.Group):
+        commands = [
+            (command_node(name, child, depth), child)
+            for name, child in sorted_children(cmd)
+        ]
+    measure_nodes(options + [node for node, _ in commands])
+    children = [BrowseItem(option, None, item) for option in options]
+    children += [BrowseItem(node, child, item) for node, child in commands]
+    if children:
+        children[-1].last = True
+    return children
+
+
+def visible_below(item):
+    """Yield the rows shown below an expanded ``item``."""
+    for child in item.children:
+        yield child
+        if child.expanded:
+            yield from visible_below(child)
+
+
+class Browser:
+    """State of the explorer: the visible rows, the cursor and the scroll.
+
+    ``handle`` applies an action from ``KEYS`` and ``render`` returns the
+    painted lines of the screen for a terminal size.
+    """
+
+    def __init__(self, root_command, root_name=None, guides="tree", palette=None):
+        root = LayoutNode(
+            "group", root_command.name, 0, root_command.name, root_command.help
+        )
+        root.options = option_nodes(root_command, 1)
+        for option in root.options:
+            option.offset = 0
+        nodes = [root] + root.options
+        measure_nodes(nodes)
+        # The help column of the whole tree, so it does not move as
+        # subtrees are expanded.
+        layout = Layout(root, nodes, extents=subtree_extents(root_command))
+        self.global_column = layout.global_column
+        self.root_name = root_name or root_command.name
+        self.guides = guides
+        self.markers = MARKERS[guides]
+        self.painter = Painter(palette)
+        self.root = BrowseItem(root, root_command, None, last=True)
+        self.rows = [self.root]
+        self.cursor = 0
+        self.top = 0
+        self.height = 1
+        self.expand(0)
+
+    def expand(self, index):
+        item = self.rows[index]
+        if item.expanded or not item.expandable:
+            return
+        if item.children is None:
+            item.children = build_children(item)
+        item.expanded = True
+        self.rows[index + 1 : index + 1] = list(visible_below(item))
+
+    def collapse(self, index):
+        item = self.rows[index]
+        if not item.expanded:
+            if item.parent is not None:
+                self.cursor = self.rows.index(item.parent, 0, index)
+            return
+        end = index + 1
+        while end < len(self.rows) and self.rows[end].node.depth > item.node.depth:
+            end += 1
+        del self.rows[index + 1 : end]
+        item.expanded = False
+
+    def handle(self, action):
+        """Apply ``action``; return False when the explorer should close."""
+        page = max(self.height - 1, 1)
+        last = len(self.rows) - 1
+        if action == "quit":
+            return False
+        if action == "up":
+            self.cursor = max(self.cursor - 1, 0)
+        elif action == "down":
+            self.cursor = min(self.cursor + 1, last)
+        elif action == "page_up":
+            self.cursor = max(self.cursor - page, 0)
+        elif action == "page_down":
+            self.cursor = min(self.cursor + page, last)
+        elif action == "home":
+            self.cursor = 0
+        elif action == "end":
+            self.cursor = last
+        elif action == "expand":
+            self.expand(self.cursor)
+        elif action == "collapse":
+            self.collapse(self.cursor)
+        elif action == "toggle":
+            if self.rows[self.cursor].expanded:
+                self.collapse(self.cursor)
+            else:
+                self.expand(self.cursor)
+        return True
+
+    def row_line(self, item, width):
+        """Runs of the first line of ``item``'s help row, cached per width."""
+        if item.line is None or item.line[0] != width:
+            first, rest = item.levels()
+            root_name = self.root_name if item.parent is None else None
+            lines = tree_lines(
+                [(item.node, None, (first, rest))],
+                root_name,
+                self.global_column,
+                width,
+                self.guides,
+                NULL_RECORDER,
+            )
+            item.line = (width, lines[0])
+        return item.line[1]
+
+    def gutter(self, item, selected):
+        cursor, collapsed, expanded = self.markers
+        marker = " "
+        if item.expandable:
+            marker = expanded if item.expanded else collapsed
+        return [
+            (cursor if selected else " ", "bold cyan"),
+            (marker, "dim"),
+            (" ", ""),
+        ]
+
+    def footer(self, width):
+        item = self.rows[self.cursor]
+        path = " ".join([self.root_name] + item.path())
+        runs = [(path, "bold"), ("  ", ""), (HINTS, "dim")]
+        if cell_width(plain_text(runs)) > width:
+            runs = crop_runs(runs, max(width, 0))
+        return runs
+
+    def render(self, width, height):
+        """Painted lines of the screen: the window of rows and a footer."""
+        self.height = max(height - 1, 1)
+        if self.cursor < self.top:
+            self.top = self.cursor
+        elif self.cursor >= self.top + self.height:
+            self.top = self.cursor - self.height + 1
+        self.top = max(min(self.top, len(self.rows) - self.height), 0)
+        lines = []
+        for index in range(self.top, min(self.top + self.height, len(self.rows))):
+            item = self.rows[index]
+            runs = self.gutter(item, index == self.cursor)
+            runs += self.row_line(item, width - GUTTER)
+            lines.append(self.painter.line(runs))
+        lines += [""] * (self.height - len(lines))
+        lines.append(self.painter.line(self.footer(width)))
+        return lines
+
+
+class Screen:
+    """Alternate terminal screen that only rewrites lines that changed."""
+
+    def __init__(self, out):
+        self.out = out
+        self.size = None
+        self.frame = []
+
+    def draw(self, lines):
+        parts = []
+        for row, line in enumerate(lines):
+            if row >= len(self.frame) or self.frame[row] != line:
+                parts.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+        if len(lines) < len(self.frame):
+            parts.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+        self.frame = lines
+        self.out.write("".join(parts))
+        self.out.flush()
+
+    def __enter__(self):
+        self.out.write("\x1b[?1049h\x1b[?25l\x1b[2J")
+        self.out.flush()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.out.write("\x1b[?25h\x1b[?1049l")
+        self.out.flush()
+
+
+def browse(root_command, root_name=None, guides="tree"):
+    """Run the explorer on the terminal until the user quits."""
+    browser = Browser(root_command, root_name, guides, detect_palette())
+    screen = Screen(click.get_text_stream("stdout"))
+
+    def redraw(*args):
+        size = shutil.get_terminal_size()
+        if size != screen.size:
+            # Labels are rebuilt for the new width and every line redrawn.
+            screen.size = size
+            screen.frame = []
+        screen.draw(browser.render(size.columns, size.lines))
+
+    resize = getattr(signal, "SIGWINCH", None)
+    with screen:
+        previous = signal.signal(resize, redraw) if resize is not None else None
+        try:
+            while True:
+                redraw()
+                try:
+                    key = click.getchar()
+                except (KeyboardInterrupt, EOFError):
+                    break
+                if not browser.handle(KEYS.get(key)):
+                    break
+        finally:
+            if resize is not None:
+                signal.signal(resize, previous)
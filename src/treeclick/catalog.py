@@ -0,0 +1,327 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import click
+
+from .layout import sorted_children
+
+CATALOG_ENV = "TREECLICK_CATALOG"
+MAGIC = b"TREECLICK-CATALOG\x01"
+DEFAULT_WIDTHS = (60, 80, 100, 120, 160, 200)
+POOL_THRESHOLD = 256
+CATALOG_GUIDES = ("tree", "indent")
+
+_open_catalogs = {}
+
+
+def iter_command_paths(root, path=(), ancestors=frozenset()):
+    """Yield the name path of every command below ``root``, root included.
+
+    A command below itself is yielded once more, but not its subtree.
+    """
+    yield path
+    if isinstance(root, click.Group) and id(root) not in ancestors:
+        below = ancestors | {id(root)}
+        for name, cmd in sorted_children(root):
+            yield from iter_command_paths(cmd, path + (name,), below)
+
+
+def tree_fingerprint(root):
+    """Hash everything in the command tree that shows up in help output.
+
+    Option help is hashed as rendered, with its choices and default. A tree
+    with help, defaults or choices from providers (see
+    ``treeclick.providers``) has no fingerprint: their output could change
+    without notice, and producing it would defeat them. Returns None then.
+    The hash is kept on ``root`` until commands or parameters change.
+    """
+    from .core import TreeGroup, help_budget
+
+    budget = help_budget(root)
+    key = (TreeGroup.structure_version, budget and budget.key())
+    cached = getattr(root, "_tree_fingerprint", None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    import hashlib
+
+    from . import __version__
+
+    digest = hashlib.sha1(__version__.encode())
+    stack = [(root.name or "", root, frozenset())]
+    fingerprint = None
+    while stack:
+        name, cmd, ancestors = stack.pop()
+        if cmd is None:
+            digest.update(b"\2")
+            continue
+        if uses_providers(cmd):
+            break
+        parts = [name, type(cmd).__name__, cmd.help or ""]
+        for param in cmd.params:
+            parts.append(param.param_type_name)
+            parts.extend(param.opts)
+            parts.append(str(param.required))
+            # TreeOption help includes the choices and default it shows.
+            help_text = getattr(param, "help_text", None)
+            help = help_text() if help_text else getattr(param, "help", None)
+            parts.append(help or "")
+        digest.update("\0".join(parts).encode() + b"\1")
+        if isinstance(cmd, click.Group) and id(cmd) not in ancestors:
+            below = ancestors | {id(cmd)}
+            # None marks the end of the group's children.
+            stack.append(("", None, below))
+            children = [(name, child, below) for name, child in sorted_children(cmd)]
+            stack.extend(reversed(children))
+    else:
+        digest.update(repr(key[1]).encode())
+        fingerprint = digest.hexdigest()
+    root._tree_fingerprint = (key, fingerprint)
+    return fingerprint
+
+
+def uses_providers(cmd):
+    """Whether the help of ``cmd`` or its parameters comes from providers."""
+    from .providers import has_provider
+
+    if has_provider(cmd, "help"):
+        return True
+    return any(
+        has_provider(param, "help")
+        or has_provider(param, "show_default")
+        or has_provider(param.type, "choices")
+        for param in cmd.params
+    )
+
+
+def entry_key(path, guides, width):
+    return f"{guides}|{width}|{' '.join(path)}"
+
+
+class Catalog:
+    """Read-only view of a precompiled help catalog, backed by ``mmap``."""
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{filename} is not a treeclick help catalog")
+        start = len(MAGIC) + 8
+        (header_len,) = struct.unpack("<Q", self._map[len(MAGIC) : start])
+        header = json.loads(self._map[start : start + header_len])
+        self._data_start = start + header_len
+        self.fingerprint = header["fingerprint"]
+        self.prog_name = header["prog_name"]
+        self.root_name = header["root_name"]
+        self.widths = sorted(header["widths"])
+        self.entries = header["entries"]
+        self._search = header.get("search")
+
+    def search_data(self):
+        """Return the stored search index data, or None if there is none."""
+        if self._search is None:
+            return None
+        offset, length = self._search
+        start = self._data_start + offset
+        return json.loads(zlib.decompress(self._map[start : start + length]))
+
+    def get(self, path, guides, width):
+        """Return the help text for ``path``, or None if it is not present.
+
+        Widths that were not pre-rendered use the widest bucket that fits.
+        """
+        entry = self.entries.get(entry_key(path, guides, width))
+        if entry is None:
+            fitting = [w for w in self.widths if w <= width]
+            if not fitting:
+                return None
+            entry = self.entries.get(entry_key(path, guides, fitting[-1]))
+            if entry is None:
+                return None
+        offset, length = entry
+        start = self._data_start + offset
+        return zlib.decompress(self._map[start : start + length]).decode("utf-8")
+
+
+def open_catalog(filename):
+    """Open ``filename`` once per process; None if it cannot be read."""
+    if filename not in _open_catalogs:
+        try:
+            _open_catalogs[filename] = Catalog(filename)
+        except (OSError, ValueError):
+            _open_catalogs[filename] = None
+    return _open_catalogs[filename]
+
+
+def fresh_catalog(root):
+    """Return the catalog of ``root`` if it matches the tree, else None."""
+    filename = getattr(root, "catalog", None) or os.environ.get(CATALOG_ENV)
+    if not filename:
+        return None
+    catalog = open_catalog(filename)
+    if catalog is None:
+        return None
+    fingerprint = tree_fingerprint(root)
+    if fingerprint is None or fingerprint != catalog.fingerprint:
+        return None
+    return catalog
+
+
+def lookup_help(ctx, guides, max_width):
+    """Return pre-rendered help for ``ctx`` from the root's catalog, if fresh."""
+    root_ctx = ctx.find_root()
+    catalog = fresh_catalog(root_ctx.command)
+    if catalog is None:
+        return None
+
+    from .core import context_path, default_root_name
+
+    if root_ctx.info_name != catalog.prog_name:
+        return None
+    if default_root_name(root_ctx.command.name) != catalog.root_name:
+        return None
+    width = max_width or ctx.terminal_width or 80
+    return catalog.get(context_path(ctx), guides, width)
+
+
+def lookup_search_data(root):
+    """Return the search index data stored in the root's catalog, if fresh."""
+    catalog = fresh_catalog(root)
+    return None if catalog is None else catalog.search_data()
+
+
+def render_entry(root, path, guides, width, prog_name, root_name):
+    """Render the help for one catalog entry, or None for non-tree commands."""
+    from .core import (
+        TreeCommand,
+        TreeGroup,
+        format_tree_help,
+        help_budget,
+        make_help_context,
+    )
+
+    ctx = make_help_context(root, path, prog_name, terminal_width=width)
+    if not isinstance(ctx.command, (TreeGroup, TreeCommand)):
+        return None
+    return format_tree_help(
+        ctx,
+        is_group=isinstance(ctx.command, TreeGroup),
+        max_width=width,
+        guides=guides,
+        root_name=root_name,
+        budget=help_budget(root),
+        renderer="rich",
+    )
+
+
+_worker_state = {}
+
+
+def _init_worker(target, prog_name, root_name):
+    from .lazy import load_object
+
+    _worker_state["args"] = (load_object(target), prog_name, root_name)
+
+
+def _render_chunk(jobs):
+    root, prog_name, root_name = _worker_state["args"]
+    return [
+        (job, render_entry(root, job[0], job[1], job[2], prog_name, root_name))
+        for job in jobs
+    ]
+
+
+def build_catalog(
+    target,
+    filename,
+    widths=DEFAULT_WIDTHS,
+    prog_name=None,
+    root_name=None,
+    processes=None,
+):
+    """Pre-render help for every command path into a compressed catalog file.
+
+    ``target`` is a command object or a ``module:attr`` import path; only an
+    import path can be rendered across a process pool. Each command is
+    rendered for every width in ``widths`` (or just its own ``max_width``)
+    and for both ``use_tree`` modes, i.e. tree and indented guides. The
+    search index of the tree is stored alongside (see
+    ``treeclick.search``). Returns the number of entries written.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .lazy import load_object
+    from .search import SearchIndex
+
+    root = load_object(target) if isinstance(target, str) else target
+    fingerprint = tree_fingerprint(root)
+    if fingerprint is None:
+        raise ValueError(
+            "Help from providers cannot be checked for changes; "
+            "serve it live instead of from a catalog"
+        )
+    prog_name = prog_name or root.name
+    root_name = root_name or prog_name
+
+    jobs = []
+    for path in iter_command_paths(root):
+        cmd = root
+        for name in path:
+            cmd = cmd.commands[name]
+        max_width = getattr(cmd, "max_width", None)
+        cmd_widths = [max_width] if max_width else widths
+        for guides in CATALOG_GUIDES:
+            for width in cmd_widths:
+                jobs.append((path, guides, width))
+
+    if processes is None:
+        processes = os.cpu_count() if len(jobs) >= POOL_THRESHOLD else 1
+    if processes > 1 and isinstance(target, str):
+        size = max(1, len(jobs) // (processes * 4))
+        chunks = [jobs[i : i + size] for i in range(0, len(jobs), size)]
+        with ProcessPoolExecutor(
+            processes,
+            initializer=_init_worker,
+            initargs=(target, prog_name, root_name),
+        ) as pool:
+            results = [
+                item for chunk in pool.map(_render_chunk, chunks) for item in chunk
+            ]
+    else:
+        results = [
+            (job, render_entry(root, *job, prog_name, root_name)) for job in jobs
+        ]
+
+    entries = {}
+    blobs = []
+    offset = 0
+    for (path, guides, width), text in results:
+        if text is None:
+            continue
+        blob = zlib.compress(text.encode("utf-8"), 9)
+        entries[entry_key(path, guides, width)] = [offset, len(blob)]
+        blobs.append(blob)
+        offset += len(blob)
+    search = json.dumps(SearchIndex(root).to_data()).encode("utf-8")
+    blobs.append(zlib.compress(search, 9))
+    header = json.dumps(
+        {
+            "fingerprint": fingerprint,
+            "prog_name": prog_name,
+            "root_name": root_name,
+            "widths": sorted({width for _, _, width in jobs}),
+            "entries": entries,
+            "search": [offset, len(blobs[-1])],
+        }
+    ).encode("utf-8")
+    with open(filename, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    _open_catalogs.pop(filename, None)
+    return len(entries)
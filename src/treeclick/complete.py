@@ -0,0 +1,92 @@
+"""Standalone shell completer answering from a treeclick completion index.
+
+Shell scripts run this file directly, ``python complete.py INDEX``, with
+``COMP_WORDS`` (the command line) and ``COMP_CWORD`` (the index of the word
+being completed) in the environment. It only uses the standard library and
+never imports treeclick, click or the application, so completion stays fast
+however heavy the CLI is. Candidates are printed one per line.
+"""
+
+import json
+import os
+import shlex
+import sys
+
+
+def load_index(filename):
+    """Return the completion trie of an index file, skipping its header line."""
+    with open(filename, encoding="utf-8") as f:
+        f.readline()
+        return json.loads(f.readline())
+
+
+def split_words(line):
+    try:
+        return shlex.split(line)
+    except ValueError:
+        return line.split()
+
+
+def complete(tree, args, incomplete):
+    """Return the candidates for ``incomplete`` after the words ``args``."""
+    node = tree
+    position = 0
+    pending = None
+    for word in args:
+        if pending is not None:
+            pending = None
+            continue
+        if word.startswith("-") and word != "-":
+            flag, sep, _ = word.partition("=")
+            option = node["options"].get(flag)
+            if option is not None and option["value"] and not sep:
+                pending = option
+            continue
+        child = node["commands"].get(word)
+        if child is not None:
+            node = child
+            position = 0
+        else:
+            position += 1
+    if pending is not None:
+        return [c for c in pending.get("choices", ()) if c.startswith(incomplete)]
+    if incomplete.startswith("-"):
+        flag, sep, value = incomplete.partition("=")
+        option = node["options"].get(flag)
+        if sep and option is not None:
+            return [
+                f"{flag}={choice}"
+                for choice in option.get("choices", ())
+                if choice.startswith(value)
+            ]
+        return sorted(f for f in node["options"] if f.startswith(incomplete))
+    candidates = sorted(
+        name for name in node["commands"] if name.startswith(incomplete)
+    )
+    arguments = node["arguments"]
+    if position < len(arguments):
+        choices = arguments[position].get("choices", ())
+        candidates.extend(c for c in choices if c.startswith(incomplete))
+    return candidates
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: complete.py INDEX", file=sys.stderr)
+        return 2
+    try:
+        tree = load_index(argv[0])
+    except (OSError, ValueError):
+        return 1
+    words = split_words(os.environ.get("COMP_WORDS", ""))
+    cword = int(os.environ.get("COMP_CWORD", len(words)))
+    args = words[1:cword]
+    incomplete = words[cword] if cword < len(words) else ""
+    for candidate in complete(tree, args, incomplete):
+        print(candidate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
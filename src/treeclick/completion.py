@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import re
+import shlex
+import sys
+
+import click
+
+from .layout import sorted_children
+
+INDEX_VERSION = 1
+COMPLETER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "complete.py")
+
+BASH_SCRIPT = """\
+%(func)s() {
+    local IFS=$'\\n'
+    COMPREPLY=( $(env COMP_WORDS="${COMP_WORDS[*]}" COMP_CWORD=$COMP_CWORD \\
+        %(python)s %(completer)s %(index)s) )
+}
+complete -o default -F %(func)s %(prog)s
+"""
+
+ZSH_SCRIPT = """\
+#compdef %(prog)s
+%(func)s() {
+    local -a completions
+    completions=("${(@f)$(env COMP_WORDS="${words[*]}" COMP_CWORD=$((CURRENT-1)) \\
+        %(python)s %(completer)s %(index)s)}")
+    compadd -U -V unsorted -a completions
+}
+compdef %(func)s %(prog)s
+"""
+
+FISH_SCRIPT = """\
+complete -c %(prog)s -f -a "(env COMP_WORDS=(commandline -cp) \\
+    COMP_CWORD=(math (count (commandline -cop))) \\
+    %(python)s %(completer)s %(index)s)"
+"""
+
+SCRIPTS = {"bash": BASH_SCRIPT, "zsh": ZSH_SCRIPT, "fish": FISH_SCRIPT}
+
+
+def index_node(cmd, help_names=("--help",), extra_options=(), ancestors=frozenset()):
+    """Completion trie node for ``cmd``: subcommands, option flags and arguments.
+
+    Option entries tell whether the option takes a value and list its
+    choices; hidden commands and options are left out. A command below
+    itself gets no subcommands there.
+    """
+    options = {}
+    arguments = []
+    params = list(cmd.params) + list(extra_options)
+    for param in params:
+        if getattr(param, "hidden", False):
+            continue
+        choices = getattr(param.type, "choices", None)
+        if isinstance(param, click.Option):
+            entry = {"value": not param.is_flag and not param.count}
+            if choices is not None:
+                entry["choices"] = [str(choice) for choice in choices]
+            for flag in (*param.opts, *param.secondary_opts):
+                options[flag] = entry
+        elif isinstance(param, click.Argument):
+            argument = {"name": param.name}
+            if choices is not None:
+                argument["choices"] = [str(choice) for choice in choices]
+            arguments.append(argument)
+    if cmd.add_help_option:
+        help_names = cmd.context_settings.get("help_option_names", help_names)
+        for flag in help_names:
+            options.setdefault(flag, {"value": False})
+    commands = {}
+    if isinstance(cmd, click.Group) and id(cmd) not in ancestors:
+        below = ancestors | {id(cmd)}
+        for name, child in sorted_children(cmd):
+            if not child.hidden:
+                commands[name] = index_node(child, help_names, (), below)
+    return {"commands": commands, "options": options, "arguments": arguments}
+
+
+def tree_signature(root):
+    """Hash of everything the completion index of ``root`` holds.
+
+    It is computed in one walk without building the index, so ``main`` can
+    check an existing index cheaply, and it is kept until the tree changes.
+    ``LazyChoice`` choices are hashed by their provider's name, so they are
+    produced only when the index is written.
+    """
+    from .core import TreeGroup
+    from .providers import stable_value
+
+    cached = getattr(root, "_completion_signature", None)
+    if cached is not None and cached[0] == TreeGroup.structure_version:
+        return cached[1]
+    digest = hashlib.sha1(str(INDEX_VERSION).encode())
+
+    def visit(name, cmd, extra_options, ancestors):
+        parts = [name, str(cmd.add_help_option)]
+        parts.extend(cmd.context_settings.get("help_option_names", ()))
+        for param in (*cmd.params, *extra_options):
+            if getattr(param, "hidden", False):
+                continue
+            parts.extend([param.param_type_name, param.name or "", *param.opts])
+            parts.extend(param.secondary_opts)
+            parts.append(str(getattr(param, "is_flag", False)))
+            parts.append(str(getattr(param, "count", False)))
+            choices = stable_value(param.type, "choices")
+            if isinstance(choices, str):
+                parts.append(choices)
+            elif choices is not None:
+                parts.extend(map(str, choices))
+        digest.update("\0".join(parts).encode() + b"\1")
+        if isinstance(cmd, click.Group) and id(cmd) not in ancestors:
+            below = ancestors | {id(cmd)}
+            for child_name, child in sorted_children(cmd):
+                if not child.hidden:
+                    visit(child_name, child, (), below)
+            digest.update(b"\2")
+
+    root_options = root.root_options() if hasattr(root, "root_options") else ()
+    visit(root.name or "", root, root_options, frozenset())
+    signature = digest.hexdigest()
+    root._completion_signature = (TreeGroup.structure_version, signature)
+    return signature
+
+
+def build_index(root):
+    """Return the header and trie of the completion index for ``root``."""
+    root_options = root.root_options() if hasattr(root, "root_options") else ()
+    tree = index_node(root, extra_options=root_options)
+    header = {"version": INDEX_VERSION, "signature": tree_signature(root)}
+    return header, json.dumps(tree, sort_keys=True, separators=(",", ":"))
+
+
+def read_signature(filename):
+    """Signature stored in an index file, or None if it cannot be read."""
+    try:
+        with open(filename, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    if header.get("version") != INDEX_VERSION:
+        return None
+    return header.get("signature")
+
+
+def cache_dir():
+    """The user cache directory that relative index paths are resolved in."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA")
+    return base or os.path.expanduser(os.path.join("~", ".cache"))
+
+
+def index_path(filename):
+    """Absolute path of the index ``filename``, relative to ``cache_dir()``."""
+    return os.path.join(cache_dir(), os.path.expanduser(filename))
+
+
+def write_completion_index(root, filename):
+    """Write the completion index of ``root`` unless it is already current.
+
+    The file holds a JSON header line with a signature of the tree's
+    structure (see ``tree_signature``), then the trie as JSON. The trie is
+    built only if the stored signature differs. A relative ``filename`` is
+    resolved in the user cache directory (see ``index_path``). Returns True
+    if the file was written.
+    """
+    filename = index_path(filename)
+    if read_signature(filename) == tree_signature(root):
+        return False
+    header, text = build_index(root)
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{filename}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n" + text + "\n")
+    os.replace(temporary, filename)
+    return True
+
+
+def refresh_completion_index(root, filename):
+    """Write the index if it does not exist yet, ignoring unwritable paths.
+
+    An existing index is left alone: checking it against the tree takes a
+    walk of the whole tree, too slow for every run of a large CLI. Rewrite
+    it with ``write_completion_index`` when the tree changes.
+    """
+    filename = index_path(filename)
+    if os.path.exists(filename):
+        return False
+    try:
+        return write_completion_index(root, filename)
+    except OSError:
+        return False
+
+
+def completion_script(shell, prog_name, index):
+    """Shell code that completes ``prog_name`` from the index file ``index``."""
+    if shell not in SCRIPTS:
+        raise ValueError(f"Unsupported shell {shell!r}")
+    func = "_" + re.sub(r"\W", "_", prog_name) + "_treeclick_completion"
+    return SCRIPTS[shell] % {
+        "func": func,
+        "prog": prog_name,
+        "python": shlex.quote(sys.executable),
+        "completer": shlex.quote(COMPLETER),
+        "index": shlex.quote(index_path(index)),
+    }
@@ -1,522 +1,868 @@
-import click
+import _thread
 import os
 import sys
-import textwrap
-from io import StringIO
-from rich.console import Console
-from rich.tree import Tree
-from rich.text import Text
-from .strip_tree_guides import strip_tree_guides
+from bisect import insort
+
+import click
 
-console = Console()
+from .catalog import CATALOG_ENV, lookup_help
+from .dispatch import SUGGESTION_LIMIT, NameIndex
+from .instrument import NULL_RECORDER, help_recorder, record_compile
+from .layout import INDENT_SIZE, child_extents, compile_layout, count_subtree
+from .providers import Deferred, pop_provider
 
 
-class TreeCommand(click.Command):
-    """Custom Command with tree-formatted help."""
+# Help layouts kept per root group, e.g. for ``--batch`` and ``--shell``.
+LAYOUT_CACHE_SIZE = 64
+
+# Held while a layout is compiled, so concurrent renders compile it once.
+# From ``_thread``, since importing ``threading`` costs several milliseconds.
+_layout_lock = _thread.allocate_lock()
+
+# Settings configured on the root group and copied down to subcommands.
+PROPAGATED_SETTINGS = ("use_tree", "max_width", "guides", "streaming", "pager")
+
+
+def propagate_settings(parent, cmd):
+    """Copy the tree configuration of ``parent`` to ``cmd``."""
+    if isinstance(cmd, (TreeGroup, TreeCommand)):
+        for setting in PROPAGATED_SETTINGS:
+            setattr(cmd, setting, getattr(parent, setting))
+
+
+def prefix_matching(ctx):
+    """Whether the root group of ``ctx`` lets unique prefixes select commands."""
+    return getattr(ctx.find_root().command, "prefix_matching", False)
+
+
+def guide_style(use_tree, guides=None):
+    """Resolve the guide style: explicit ``guides`` wins over ``use_tree``."""
+    return guides or ("tree" if use_tree else "indent")
+
+
+class ParamList(list):
+    """The ``params`` of a TreeCommand or TreeGroup, reporting every change.
+
+    Parameters added after a command is registered, e.g. by a click option
+    decorator applied to the command object, still update the extents of
+    its parents and invalidate cached layouts.
+    """
+
+    def __init__(self, owner, params=()):
+        super().__init__(params)
+        self.owner = owner
+        self._quiet_threads = set()
+
+    def __iadd__(self, params):
+        self.extend(params)
+        return self
+
+    def unreported(self, call, *args):
+        """Return ``call(*args)``, not reporting changes it makes meanwhile."""
+        thread = _thread.get_ident()
+        self._quiet_threads.add(thread)
+        try:
+            return call(*args)
+        finally:
+            self._quiet_threads.discard(thread)
+
+
+def _report_change(method):
+    def changed(self, *args):
+        result = method(self, *args)
+        if _thread.get_ident() not in self._quiet_threads:
+            params_changed(self.owner)
+        return result
+
+    return changed
+
+
+for _method in (
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+):
+    setattr(ParamList, _method, _report_change(getattr(list, _method)))
+
+
+class TrackedParams:
+    """``params`` attribute that wraps whatever is assigned in a ParamList."""
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj.__dict__["params"]
+
+    def __set__(self, obj, value):
+        obj.__dict__["params"] = ParamList(obj, value or ())
+        params_changed(obj)
+
+
+def params_changed(cmd):
+    """Update the extents and counts above ``cmd`` and invalidate caches."""
+    parents = getattr(cmd, "_parents", None)
+    if parents is None:
+        # Still being constructed, so not part of any tree yet.
+        return
+    if isinstance(cmd, TreeGroup):
+        cmd._root_options = None
+    for parent in parents:
+        parent._refresh_extents()
+        parent._refresh_counts()
+    TreeGroup.structure_version += 1
 
-    def __init__(self, *args, use_tree=True, max_width=None, **kwargs):
+
+class TreeCommand(click.Command):
+    """Custom Command with tree-formatted help.
+
+    ``help`` may be a callable returning the help text, called the first
+    time help showing the command is rendered.
+    """
+
+    help = Deferred()
+    params = TrackedParams()
+
+    def __init__(
+        self,
+        *args,
+        use_tree=True,
+        max_width=None,
+        guides=None,
+        streaming=False,
+        pager=False,
+        **kwargs,
+    ):
+        help = pop_provider(kwargs, "help")
         super().__init__(*args, no_args_is_help=False, **kwargs)
+        if help is not None:
+            self.help = help
         self.use_tree = use_tree
         self.max_width = max_width
+        self.guides = guides
+        self.streaming = streaming
+        self.pager = pager
         self.connector_width = 4
+        self._parents = []
 
-    def get_help(self, ctx):
+    def iter_help(self, ctx):
+        """Yield the help text line by line as it is rendered."""
         config = ctx.obj.get("treeclick_config", {}) if ctx.obj else {}
         use_tree = config.get("use_tree", self.use_tree)
         max_width = config.get("max_width", self.max_width)
-        return format_tree_help(
-            ctx,
-            is_group=False,
-            use_tree=use_tree,
-            max_width=max_width,
-        )
+        guides = guide_style(use_tree, config.get("guides", self.guides))
+        return iter_command_help(ctx, False, guides, max_width)
+
+    def get_help(self, ctx):
+        return "".join(self.iter_help(ctx))
 
+    def get_help_option(self, ctx):
+        # Click appends the help option to ``params`` and pops it again.
+        option = self.params.unreported(super().get_help_option, ctx)
+        return streamed_help_option(self, option)
 
-class TreeGroup(click.Group):
-    """Custom Group with tree-formatted help."""
 
-    def __init__(self, *args, use_tree=True, max_width=None, **kwargs):
+class TreeGroup(click.Group):
+    """Custom Group with tree-formatted help.
+
+    ``guides`` selects the tree guide style ("tree", "ascii" or "indent");
+    by default it follows ``use_tree``. With ``streaming`` help is written
+    out while it is rendered, and with ``pager`` it is streamed through
+    ``click.echo_via_pager``.
+
+    The help budgets ``max_depth``, ``max_children``, ``max_options``,
+    ``time_budget`` and ``commands_only`` are read from the root group and
+    collapse whatever does not fit into one-line summaries.
+
+    With ``help_search`` the root group accepts ``--help-search TERM``,
+    which shows only the commands matching TERM, and with ``help_json`` it
+    accepts ``--help-json`` and ``--help-jsonl``, which print the command
+    tree as JSON or JSON Lines (see ``to_dict``). With ``help_browse`` it
+    accepts ``--help-browse``, which opens an interactive tree explorer.
+    With ``batch_mode`` it accepts ``--batch FILE`` and ``--shell``, which
+    run many command lines in this process (see ``treeclick.batch``).
+    These root options are listed in the root help, and any whose flag the
+    group's own parameters already use is left out.
+
+    ``renderer`` on the root group picks the help backend: "rich", "ansi"
+    (plain text and escapes written directly, without importing rich) or
+    "auto", which uses "ansi" when stdout is not a terminal.
+
+    ``instrument`` on the root group records phase timings and counters of
+    every help render: a hook ``hook(event, data)``, a list of hooks, or
+    True to print a summary to stderr.
+
+    ``completion_index`` on the root group names a file that ``main`` writes
+    a static completion index of the tree to if it does not exist yet, which
+    shells complete from without importing the CLI (see
+    ``treeclick.completion``). Relative names are resolved in the user cache
+    directory.
+
+    Every TreeGroup keeps its child names sorted in ``child_names`` and the
+    widest command and option labels of its subtree in ``subtree_extents``
+    (see ``layout.subtree_extents``), and the number of commands and options
+    below it in ``subtree_counts`` (see ``layout.count_subtree``), updated
+    bottom-up as commands are added, so help below the root and budgeted
+    help do not have to walk the whole tree. Parameters added to a
+    TreeCommand or TreeGroup later update them too (see ``ParamList``). A
+    group may be added under several parents; once a group is added below
+    itself, or a plain ``click.Group`` is added, the extents and counts of
+    the groups above it are set to None and measured on demand.
+
+    Commands can have aliases, given to ``add_command`` or the ``command``
+    and ``group`` decorators as ``aliases`` or added with ``add_alias``.
+    Names and aliases are kept in a trie (``name_index``, see
+    ``treeclick.dispatch``), so with ``prefix_matching`` on the root group
+    a unique prefix also selects a command, and unknown names get "did you
+    mean" suggestions.
+
+    Like ``TreeCommand``, a TreeGroup accepts a callable as ``help``.
+    """
+
+    help = Deferred()
+    params = TrackedParams()
+
+    # Bumped whenever a command is added to any TreeGroup, so caches built
+    # from the command tree know when they must be rebuilt.
+    structure_version = 0
+
+    def __init__(
+        self,
+        *args,
+        use_tree=True,
+        max_width=None,
+        guides=None,
+        streaming=False,
+        pager=False,
+        catalog=None,
+        max_depth=None,
+        max_children=None,
+        max_options=None,
+        time_budget=None,
+        commands_only=False,
+        help_search=False,
+        help_json=False,
+        help_browse=False,
+        batch_mode=False,
+        instrument=None,
+        renderer="auto",
+        completion_index=None,
+        prefix_matching=False,
+        **kwargs,
+    ):
+        help = pop_provider(kwargs, "help")
         super().__init__(*args, no_args_is_help=True, **kwargs)
+        if help is not None:
+            self.help = help
         self.use_tree = use_tree
         self.max_width = max_width
+        self.guides = guides
+        self.streaming = streaming
+        self.pager = pager
+        self.catalog = catalog
+        self.max_depth = max_depth
+        self.max_children = max_children
+        self.max_options = max_options
+        self.time_budget = time_budget
+        self.commands_only = commands_only
+        self.help_search = help_search
+        self.help_json = help_json
+        self.help_browse = help_browse
+        self.batch_mode = batch_mode
+        self.instrument = instrument
+        self.renderer = renderer
+        self.completion_index = completion_index
+        self.prefix_matching = prefix_matching
         self.connector_width = 4
+        self._root_options = None
+        self._parents = []
+        self.child_names = []
+        self.subtree_extents = (0, 0)
+        self.subtree_counts = (0, 0)
+        self.aliases = {}
+        self.name_index = NameIndex()
+        for name, cmd in self.commands.items():
+            self._index_command(name, cmd, replaced=None)
+
+    def iter_help(self, ctx):
+        """Yield the help text line by line as it is rendered."""
+        guides = guide_style(self.use_tree, self.guides)
+        return iter_command_help(ctx, True, guides, self.max_width)
+
+    def main(self, *args, **kwargs):
+        if self.completion_index:
+            from .completion import refresh_completion_index
+
+            refresh_completion_index(self, self.completion_index)
+        return super().main(*args, **kwargs)
 
     def get_help(self, ctx):
-        return format_tree_help(
-            ctx,
-            is_group=True,
-            use_tree=self.use_tree,
-            max_width=self.max_width,
-        )
+        return "".join(self.iter_help(ctx))
+
+    def get_help_option(self, ctx):
+        # Click appends the help option to ``params`` and pops it again.
+        option = self.params.unreported(super().get_help_option, ctx)
+        return streamed_help_option(self, option)
+
+    def get_params(self, ctx):
+        params = super().get_params(ctx)
+        if ctx.parent is None:
+            params = [*params, *self.root_options()]
+        return params
+
+    def root_options(self):
+        """Eager options only the root group accepts, like ``--help-search``.
+
+        An option is left out if one of its flags is already used by the
+        group's own parameters or help option.
+        """
+        if self._root_options is None:
+            self._root_options = []
+            if self.help_search:
+                self._add_root_option(
+                    click.Option(
+                        ["--help-search"],
+                        metavar="TERM",
+                        expose_value=False,
+                        is_eager=True,
+                        callback=show_search_results,
+                        help="Show the commands matching TERM and exit.",
+                    )
+                )
+            if self.help_json:
+                for flag, form in (("--help-json", "json"), ("--help-jsonl", "jsonl")):
+                    self._add_root_option(
+                        click.Option(
+                            [flag],
+                            is_flag=True,
+                            flag_value=form,
+                            expose_value=False,
+                            is_eager=True,
+                            callback=show_json_export,
+                            help=f"Print the command tree as {form.upper()} and exit.",
+                        )
+                    )
+            if self.help_browse:
+                self._add_root_option(
+                    click.Option(
+                        ["--help-browse"],
+                        is_flag=True,
+                        expose_value=False,
+                        is_eager=True,
+                        callback=show_browser,
+                        help="Explore the command tree interactively and exit.",
+                    )
+                )
+            if self.batch_mode:
+                self._add_root_option(
+                    click.Option(
+                        ["--batch"],
+                        type=click.File("r"),
+                        metavar="FILE",
+                        expose_value=False,
+                        is_eager=True,
+                        callback=run_batch_file,
+                        help="Run the command lines of FILE (- for stdin) and exit.",
+                    )
+                )
+                self._add_root_option(
+                    click.Option(
+                        ["--shell"],
+                        is_flag=True,
+                        expose_value=False,
+                        is_eager=True,
+                        callback=run_interactive_shell,
+                        help="Read and run command lines interactively.",
+                    )
+                )
+        return self._root_options
+
+    def _add_root_option(self, option):
+        taken = set(self.context_settings.get("help_option_names", ["--help"]))
+        for param in self.params:
+            taken.update(param.opts)
+            taken.update(param.secondary_opts)
+        if taken.isdisjoint(option.opts):
+            self._root_options.append(option)
+
+    def to_dict(self):
+        """Export the command tree as a dict with a stable schema.
+
+        The result is cached until commands are added and must not be
+        modified.
+        """
+        from .export import tree_export
 
-    def add_command(self, cmd, name=None):
+        return tree_export(self).to_dict()
+
+    def to_json(self):
+        """Export the command tree as a JSON document."""
+        from .export import tree_export
+
+        return tree_export(self).to_json()
+
+    def iter_json_lines(self):
+        """Yield the command tree as JSON Lines: a header, then one node each."""
+        from .export import tree_export
+
+        return tree_export(self).json_lines()
+
+    def add_command(self, cmd, name=None, aliases=()):
         name = name or cmd.name
+        replaced = self.commands.get(name)
         super().add_command(cmd, name)
+        propagate_settings(self, cmd)
+        self._index_command(name, cmd, replaced)
+        TreeGroup.structure_version += 1
+        for alias in aliases:
+            self.add_alias(alias, name)
+
+    def add_alias(self, alias, name):
+        """Make ``alias`` another name of the command registered as ``name``."""
+        if name not in self.commands:
+            raise ValueError(f"Cannot alias unknown command {name!r}")
+        self.aliases[alias] = name
+        self.name_index.add(alias, name)
+
+    def get_command(self, ctx, cmd_name):
+        cmd = self.commands.get(cmd_name)
+        if cmd is None:
+            name = self.name_index.resolve(cmd_name, prefix_matching(ctx))
+            cmd = self.commands.get(name) if name is not None else None
+        return cmd
+
+    def resolve_command(self, ctx, args):
+        """Resolve the command named by ``args[0]``, an alias or a prefix.
+
+        The command's registered name is returned, so help paths and
+        ``ctx.info_name`` do not depend on how it was typed.
+        """
+        cmd_name = args[0]
+        cmd = self.get_command(ctx, cmd_name)
+        if cmd is None and ctx.token_normalize_func is not None:
+            cmd_name = ctx.token_normalize_func(cmd_name)
+            cmd = self.get_command(ctx, cmd_name)
+        if cmd is None:
+            if ctx.resilient_parsing:
+                return None, None, args[1:]
+            if cmd_name[:1] and not cmd_name[0].isalnum():
+                # Looks like an option: parse again to report it as one.
+                self.parse_args(ctx, args)
+            raise self.no_such_command(ctx, cmd_name)
+        if cmd_name not in self.commands:
+            cmd_name = self.name_index.resolve(cmd_name) or cmd_name
+        return cmd_name, cmd, args[1:]
+
+    def no_such_command(self, ctx, cmd_name):
+        """Error for an unknown or ambiguous name, with suggestions."""
+        matches = []
+        if cmd_name and prefix_matching(ctx):
+            matches = self.name_index.matches(cmd_name)
+        if len(matches) > 1:
+            message = f"Ambiguous command {cmd_name!r}."
+            suggestions = matches[:SUGGESTION_LIMIT]
+        else:
+            message = None
+            suggestions = self.name_index.suggest(cmd_name)
+        no_such_command = getattr(click.exceptions, "NoSuchCommand", None)
+        if no_such_command is not None:
+            error = no_such_command(cmd_name, message, ctx=ctx)
+            error.possibilities = suggestions or None
+            return error
+        # Click before 8.4 has no NoSuchCommand; format the same message.
+        message = message or f"No such command {cmd_name!r}."
+        if len(suggestions or ()) == 1:
+            message += f" Did you mean {suggestions[0]!r}?"
+        elif suggestions:
+            names = ", ".join(map(repr, sorted(suggestions)))
+            message += f" (Did you mean one of: {names}?)"
+        return click.UsageError(message, ctx=ctx)
+
+    def _index_command(self, name, cmd, replaced):
+        """Update the child index, subtree extents and counts for a new child."""
         if isinstance(cmd, (TreeGroup, TreeCommand)):
-            cmd.use_tree = self.use_tree
-            cmd.max_width = self.max_width
+            cmd._parents.append(self)
+        if replaced is None:
+            insort(self.child_names, name)
+        elif isinstance(replaced, (TreeGroup, TreeCommand)) and replaced is not cmd:
+            replaced._parents.remove(self)
+        if cmd.hidden:
+            self.name_index.remove(name)
+        else:
+            self.name_index.add(name, name)
+        cyclic = cmd is self or cmd in self._ancestors()
+        untracked = isinstance(cmd, click.Group) and not isinstance(cmd, TreeGroup)
+        if cyclic or untracked or getattr(cmd, "subtree_extents", ()) is None:
+            # Extents cannot be maintained bottom-up around a cycle or through
+            # a plain click group, which does not report commands added to it,
+            # so ``layout.subtree_extents`` measures these subtrees instead.
+            self._forget_extents()
+        elif replaced is None:
+            self._grow_extents(child_extents(name, cmd))
+            self._grow_counts(count_subtree(cmd))
+        else:
+            self._refresh_extents()
+            self._refresh_counts()
+
+    def _ancestors(self):
+        """Return every TreeGroup that has this group in its subtree."""
+        seen = set()
+        stack = list(self._parents)
+        while stack:
+            group = stack.pop()
+            if group not in seen:
+                seen.add(group)
+                stack.extend(group._parents)
+        return seen
+
+    def _forget_extents(self):
+        self.subtree_extents = self.subtree_counts = None
+        for group in self._ancestors():
+            group.subtree_extents = group.subtree_counts = None
+
+    def _grow_extents(self, extents):
+        pending = [(self, extents)]
+        while pending:
+            group, (commands, options) = pending.pop()
+            current = group.subtree_extents
+            if current is None:
+                continue
+            grown = (max(current[0], commands), max(current[1], options))
+            if grown != current:
+                group.subtree_extents = grown
+                below = (
+                    grown[0] + INDENT_SIZE,
+                    grown[1] + INDENT_SIZE if grown[1] else 0,
+                )
+                pending.extend((parent, below) for parent in group._parents)
+
+    def _refresh_extents(self):
+        """Recompute the extents from the children, which may have shrunk."""
+        pending = [self]
+        while pending:
+            group = pending.pop()
+            if group.subtree_extents is None:
+                continue
+            extents = [child_extents(name, cmd) for name, cmd in group.commands.items()]
+            refreshed = (
+                max((commands for commands, _ in extents), default=0),
+                max((options for _, options in extents), default=0),
+            )
+            if refreshed != group.subtree_extents:
+                group.subtree_extents = refreshed
+                pending.extend(group._parents)
+
+    def _grow_counts(self, counts):
+        """Add ``counts`` to this group and every place it appears below."""
+        pending = [self]
+        while pending:
+            group = pending.pop()
+            if group.subtree_counts is None:
+                continue
+            group.subtree_counts = (
+                group.subtree_counts[0] + counts[0],
+                group.subtree_counts[1] + counts[1],
+            )
+            pending.extend(group._parents)
+
+    def _refresh_counts(self):
+        """Recompute the counts from the children, whose options changed."""
+        pending = [self]
+        while pending:
+            group = pending.pop()
+            if group.subtree_counts is None:
+                continue
+            counts = [count_subtree(cmd) for cmd in group.commands.values()]
+            refreshed = (
+                sum(commands for commands, _ in counts),
+                sum(options for _, options in counts),
+            )
+            if refreshed != group.subtree_counts:
+                group.subtree_counts = refreshed
+                pending.extend(group._parents)
 
-    def command(self, *args, **kwargs):
+    def command(self, *args, aliases=(), **kwargs):
         parent_command = super().command
 
         def decorator(f):
             cmd = parent_command(*args, **kwargs)(f)
-            if isinstance(cmd, (TreeGroup, TreeCommand)):
-                cmd.use_tree = self.use_tree
-                cmd.max_width = self.max_width
+            propagate_settings(self, cmd)
+            for alias in aliases:
+                self.add_alias(alias, cmd.name)
             return cmd
 
         return decorator
 
+    def group(self, *args, aliases=(), **kwargs):
+        parent_group = super().group
 
-def format_tree_help(ctx, is_group, use_tree=True, max_width=None):
-    """Format the help in tree style or indented."""
-    out = StringIO()
-    term_width = max_width or ctx.terminal_width or 80
-    term_console = Console(
-        file=out, width=term_width, color_system="auto", force_terminal=True
-    )
+        def decorator(f):
+            cmd = parent_group(*args, **kwargs)(f)
+            for alias in aliases:
+                self.add_alias(alias, cmd.name)
+            return cmd
 
-    # Get path
-    path = []
-    current_ctx = ctx
-    while current_ctx:
-        path.append(current_ctx.command.name)
-        current_ctx = current_ctx.parent
-    path = path[::-1]
-    path_len = len(path)
-    is_top_level = path_len == 1
-
-    # Get root
-    root_ctx = ctx
-    while root_ctx.parent:
-        root_ctx = root_ctx.parent
-    root_command = root_ctx.command
-
-    # Collect effective lengths from root
-    indent_size = 4
-    command_effectives = []
-    option_effectives = []
-
-    # Manual collect for root command and options
-    root_left = f"[bold green]{path[0]}[/]"
-    root_left_len = term_console.measure(Text.from_markup(root_left)).maximum
-    command_effectives.append(root_left_len + 0 * indent_size)
-    for param in root_command.params:
-        if isinstance(param, click.Option) and param.name != "help":
-            opts = ", ".join(param.opts)
-            left = f"[bold yellow]{opts}[/bold yellow]"
-            left_len = term_console.measure(Text.from_markup(left)).maximum
-            option_effectives.append(left_len + 0 * indent_size)
-
-    collect_effective_lengths(
-        root_command.commands,
-        1,
-        command_effectives,
-        option_effectives,
-        term_console,
-        indent_size,
-    )
-    max_command_effective = max(command_effectives) if command_effectives else 0
-    max_option_effective = max(option_effectives) if option_effectives else 0
-    global_column = max(max_command_effective, max_option_effective - 4) + 1
+        return decorator
 
-    # Usage
-    if is_group:
-        usage_parts = "[OPTIONS] COMMAND [ARGS]..."
-    else:
-        args_part = " ".join(
-            f"[[orange1]{p.name.upper()}[/orange1]]"
-            for p in ctx.command.params
-            if isinstance(p, click.Argument)
-        )
-        usage_parts = "[OPTIONS]" + (f" {args_part}" if args_part else "")
-    term_console.print(
-        f"\n[bold]Usage:[/bold] {ctx.command_path} {Text.from_markup(usage_parts)}\n"
-    )
 
-    # Description
-    help_text_str = ctx.command.help or ""
-    desc_label = Text.from_markup("[bold]Description:[/bold] ")
-    term_console.print(desc_label, end="")
-    if help_text_str:
-        desc_start = term_console.measure(desc_label).maximum
-        available_width = term_width - desc_start
-        if available_width < 10:
-            available_width = term_width // 2
-        lines = textwrap.wrap(help_text_str, width=available_width)
-        term_console.print(Text(lines[0], style="bold"))
-        for line in lines[1:]:
-            term_console.print(Text(" " * desc_start + line, style="bold"))
+def iter_command_help(ctx, is_group, guides, max_width):
+    """Yield help for ``ctx`` from the help catalog or from live rendering."""
+    root = ctx.find_root().command
+    recorder = help_recorder(root)
+    if recorder.enabled:
+        recorder.start(context_path(ctx))
+    with recorder.phase("catalog"):
+        cached = lookup_help(ctx, guides, max_width)
+    if cached is not None:
+        recorder.emit("cache_hit", cache="catalog", count=1)
+        lines = [cached]
     else:
-        term_console.print()
-
-    # Current options
-    current_option_effectives = []
-    has_options = False
-    for param in ctx.command.params:
-        if isinstance(param, click.Option) and param.name != "help":
-            has_options = True
-            opts = ", ".join(param.opts)
-            left = f"[bold yellow]{opts}[/bold yellow]"
-            left_len = term_console.measure(Text.from_markup(left)).maximum
-            current_option_effectives.append(left_len)
-    if has_options:
-        term_console.print("[bold]Options:[/bold]")
-        for param in ctx.command.params:
-            if isinstance(param, click.Option) and param.name != "help":
-                opts = ", ".join(param.opts)
-                left_text = Text.from_markup(f"[bold yellow]{opts}[/bold yellow]")
-                left_len = term_console.measure(left_text).maximum
-                pad = global_column - left_len
-                pad_text = Text(" " * pad)
-                star = "[red]*[/red]" if param.required else ""
-                star_space = star + " "
-                star_space_len = term_console.measure(Text(star_space)).maximum
-                help_text_str = param.help or ""
-                help_start_relative = left_len + pad + star_space_len
-                help_start_absolute = help_start_relative  # level 0
-                available_width = term_console.width - help_start_absolute
-                if available_width < 10:
-                    available_width = term_console.width // 2
-                lines = textwrap.wrap(help_text_str, width=available_width)
-                option_label = left_text + pad_text + Text(star_space)
-                if lines:
-                    option_label.append(lines[0], style="italic yellow")
-                    for line in lines[1:]:
-                        option_label.append("\n")
-                        indent_text = Text(" " * help_start_relative)
-                        option_label.append_text(indent_text)
-                        option_label.append(line, style="italic yellow")
-                term_console.print(option_label)
-        term_console.print()
-
-    # Commands
-    term_console.print("[bold]Commands:[/bold]")
-
-    # Root name
-    root_name = path[0]
-    if sys.argv and sys.argv[0]:
-        root_name = os.path.basename(sys.argv[0])
-
-    # Build the tree
-    level = 0
-    color = "bold green"
-    left = f"[{color}]{root_name}[/]"
-    left_text = Text.from_markup(left)
-    left_len = term_console.measure(left_text).maximum
-    pad = global_column - level * indent_size - left_len
-    pad_text = Text(" " * pad)
-    help_text_str = root_command.help or ""
-    help_start_relative = left_len + pad
-    help_start_absolute = level * indent_size + help_start_relative
-    available_width = term_console.width - help_start_absolute
-    if available_width < 10:
-        available_width = term_console.width // 2
-    lines = textwrap.wrap(help_text_str, width=available_width)
-    label = Text()
-    if is_top_level:
-        label.append_text(left_text)
-        label.append_text(pad_text)
-        if lines:
-            label.append(lines[0], style="bold")
-            for line in lines[1:]:
-                label.append("\n")
-                indent_text = Text(" " * help_start_relative)
-                label.append_text(indent_text)
-                label.append(line, style="bold")
+        if getattr(root, "catalog", None) or os.environ.get(CATALOG_ENV):
+            recorder.emit("cache_miss", cache="catalog", count=1)
+        with recorder.phase("setup"):
+            lines = iter_tree_help(
+                ctx,
+                is_group,
+                max_width=max_width,
+                guides=guides,
+                budget=help_budget(root),
+                recorder=recorder,
+                renderer=getattr(root, "renderer", "auto"),
+            )
+    for line in lines:
+        recorder.count("output_chars", len(line))
+        yield line
+    recorder.finish()
+
+
+def help_budget(root):
+    """Return the help budget configured on ``root``, or None if unlimited."""
+    from .layout import Budget
+
+    settings = [
+        getattr(root, name, None)
+        for name in ("max_depth", "max_children", "max_options", "time_budget")
+    ]
+    commands_only = getattr(root, "commands_only", False)
+    if all(setting is None for setting in settings) and not commands_only:
+        return None
+    return Budget(*settings, commands_only=commands_only)
+
+
+def streamed_help_option(cmd, option):
+    """Make ``option`` stream help when ``cmd`` has streaming or a pager on."""
+    if option is not None and (cmd.streaming or cmd.pager):
+        option.callback = show_streamed_help
+    return option
+
+
+def show_streamed_help(ctx, param, value):
+    """Help option callback that writes help out while it is rendered."""
+    if not value or ctx.resilient_parsing:
+        return
+    lines = ctx.command.iter_help(ctx)
+    if ctx.command.pager:
+        click.echo_via_pager(lines, color=ctx.color)
     else:
-        dim_left = left_text.copy()
-        dim_left.stylize("dim")
-        label.append_text(dim_left)
-        label.append_text(pad_text)
-        if lines:
-            dim_help = Text(lines[0])
-            dim_help.stylize("dim")
-            label.append_text(dim_help)
-            for line in lines[1:]:
-                label.append("\n")
-                indent_text = Text(" " * help_start_relative)
-                indent_text.stylize("dim")
-                label.append_text(indent_text)
-                dim_line = Text(line)
-                dim_line.stylize("dim")
-                label.append_text(dim_line)
-
-    tree = Tree(label, guide_style="dim")
-
-    # Add options for root if not is_top_level
-    if not is_top_level:
-        for param in root_command.params:
-            if isinstance(param, click.Option) and param.name != "help":
-                add_option_branch(
-                    tree,
-                    param,
-                    level,
-                    global_column,
-                    indent_size,
-                    term_console,
-                    dim=True,
-                )
+        for line in lines:
+            click.echo(line, nl=False, color=ctx.color)
+        click.echo(color=ctx.color)
+    ctx.exit()
 
-    # Add to tree
-    add_to_tree(
-        tree,
-        root_command.commands,
-        level + 1,
-        path,
-        1,
-        global_column,
-        indent_size,
-        term_console,
-        is_top_level,
-        path_len,
-    )
 
-    if use_tree:
-        term_console.print(tree)
+def show_search_results(ctx, param, value):
+    """``--help-search`` callback that shows the matching commands."""
+    if value is None or ctx.resilient_parsing:
+        return
+    from .search import iter_search_help
+
+    for line in iter_search_help(ctx, value):
+        click.echo(line, nl=False, color=ctx.color)
+    ctx.exit()
+
+
+def show_json_export(ctx, param, value):
+    """``--help-json`` and ``--help-jsonl`` callback that prints the tree."""
+    if not value or ctx.resilient_parsing:
+        return
+    if value == "json":
+        click.echo(ctx.command.to_json())
     else:
-        temp_out = StringIO()
-        temp_console = Console(
-            file=temp_out, width=term_width, color_system="auto", force_terminal=True
-        )
-        temp_console.print(tree)
-        rendered = temp_out.getvalue()
-        stripped = strip_tree_guides(rendered)
-        term_console.print(Text.from_ansi(stripped), end="")
+        for line in ctx.command.iter_json_lines():
+            click.echo(line)
+    ctx.exit()
 
-    term_console.print()
-    return out.getvalue()
 
+def show_browser(ctx, param, value):
+    """``--help-browse`` callback that opens the interactive tree explorer.
 
-def collect_effective_lengths(
-    commands, level, command_effectives, option_effectives, console, indent_size
-):
-    for cmd_name, cmd in sorted(commands.items()):
-        color = "bold green" if isinstance(cmd, click.Group) else "cyan"
-        args = [
-            f"[[orange1]{param.name.upper()}[/orange1]]"
-            for param in cmd.params
-            if isinstance(param, click.Argument)
-        ]
-        arg_str = " ".join(args) if args else ""
-        left = f"[{color}]{cmd_name}[/] {arg_str}"
-        left_len = console.measure(Text.from_markup(left)).maximum
-        command_effectives.append(left_len + level * indent_size)
-        for param in cmd.params:
-            if isinstance(param, click.Option) and param.name != "help":
-                opts = ", ".join(param.opts)
-                left = f"[bold yellow]{opts}[/bold yellow]"
-                left_len = console.measure(Text.from_markup(left)).maximum
-                option_effectives.append(left_len + (level + 1) * indent_size)
-        if isinstance(cmd, click.Group) and cmd.commands:
-            collect_effective_lengths(
-                cmd.commands,
-                level + 1,
-                command_effectives,
-                option_effectives,
-                console,
-                indent_size,
-            )
+    Without a terminal to interact with, the help is printed instead.
+    """
+    if not value or ctx.resilient_parsing:
+        return
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        click.echo(ctx.get_help(), color=ctx.color)
+        ctx.exit()
+    from .browse import browse
+
+    root = ctx.command
+    browse(root, default_root_name(root.name), guide_style(root.use_tree, root.guides))
+    ctx.exit()
+
+
+def run_batch_file(ctx, param, value):
+    """``--batch`` callback that runs every command line of a file."""
+    if value is None or ctx.resilient_parsing:
+        return
+    from .batch import run_batch
+
+    ctx.exit(run_batch(ctx.command, value, ctx.info_name))
 
 
-def add_option_branch(
-    parent_branch, param, level, global_column, indent_size, console, dim=False
+def run_interactive_shell(ctx, param, value):
+    """``--shell`` callback that runs command lines read from a prompt."""
+    if not value or ctx.resilient_parsing:
+        return
+    from .batch import run_shell
+
+    ctx.exit(run_shell(ctx.command, ctx.info_name))
+
+
+def make_help_context(root, path=(), prog_name=None, terminal_width=None):
+    """Build the context chain for the command at ``path`` below ``root``."""
+    ctx = click.Context(
+        root, info_name=prog_name or root.name, terminal_width=terminal_width
+    )
+    for name in path:
+        cmd = ctx.command.get_command(ctx, name)
+        if cmd is None:
+            raise click.UsageError(f"No such command {name!r}.", ctx)
+        ctx = click.Context(cmd, info_name=name, parent=ctx)
+    return ctx
+
+
+def format_tree_help(
+    ctx,
+    is_group,
+    use_tree=True,
+    max_width=None,
+    root_name=None,
+    guides=None,
+    budget=None,
+    recorder=NULL_RECORDER,
+    renderer="auto",
 ):
-    opts = ", ".join(param.opts)
-    left = f"[bold yellow]{opts}[/bold yellow]"
-    left_text = Text.from_markup(left)
-    left_len = console.measure(left_text).maximum
-    pad = global_column + 4 - (level + 1) * indent_size - left_len
-    pad_text = Text(" " * pad)
-    star = "[red]*[/red]" if param.required else ""
-    star_space = star + " "
-    star_space_text = Text(star_space)
-    star_space_len = console.measure(star_space_text).maximum
-    help_text_str = param.help or ""
-    label_start = (level + 1) * indent_size
-    help_start_relative = left_len + pad + star_space_len
-    help_start_absolute = label_start + help_start_relative
-    available_width = console.width - help_start_absolute
-    if available_width < 10:
-        available_width = console.width // 2
-    lines = textwrap.wrap(help_text_str, width=available_width)
-    option_label = Text()
-    if dim:
-        dim_left = left_text.copy()
-        dim_left.stylize("dim")
-        option_label.append_text(dim_left)
-        dim_pad = pad_text.copy()
-        dim_pad.stylize("dim")
-        option_label.append_text(dim_pad)
-        dim_star = star_space_text.copy()
-        dim_star.stylize("dim")
-        option_label.append_text(dim_star)
-        if lines:
-            dim_help = Text(lines[0], style="italic yellow")
-            dim_help.stylize("dim")
-            option_label.append_text(dim_help)
-            for line in lines[1:]:
-                option_label.append("\n")
-                indent_text = Text(" " * help_start_relative)
-                indent_text.stylize("dim")
-                option_label.append_text(indent_text)
-                dim_line = Text(line, style="italic yellow")
-                dim_line.stylize("dim")
-                option_label.append_text(dim_line)
-    else:
-        option_label.append_text(left_text)
-        option_label.append_text(pad_text)
-        option_label.append(star_space)
-        if lines:
-            option_label.append(lines[0], style="italic yellow")
-            for line in lines[1:]:
-                option_label.append("\n")
-                indent_text = Text(" " * help_start_relative)
-                option_label.append_text(indent_text)
-                option_label.append(line, style="italic yellow")
-    parent_branch.add(option_label)
-
-
-def add_to_tree(
-    branch,
-    commands,
-    level,
-    path,
-    path_index,
-    global_column,
-    indent_size,
-    console,
-    is_top_level,
-    path_len,
+    """Format the help in tree style or indented.
+
+    Pass ``root_name`` to avoid reading ``sys.argv``; to render help from
+    several threads use ``treeclick.threadsafe.HelpRenderer``.
+    """
+    return "".join(
+        iter_tree_help(
+            ctx,
+            is_group,
+            use_tree,
+            max_width,
+            root_name,
+            guides,
+            budget,
+            recorder,
+            renderer,
+        )
+    )
+
+
+def iter_tree_help(
+    ctx,
+    is_group,
+    use_tree=True,
+    max_width=None,
+    root_name=None,
+    guides=None,
+    budget=None,
+    recorder=NULL_RECORDER,
+    renderer="auto",
 ):
-    if level > 5:
-        branch.add("[red]Recursion limit reached (max 5 levels)[/red]")
-        return
-    if is_top_level or path_index == path_len:
-        for cmd_name, cmd in sorted(commands.items()):
-            color = "bold green" if isinstance(cmd, click.Group) else "cyan"
-            args = [
-                f"[[orange1]{param.name.upper()}[/orange1]]"
-                for param in cmd.params
-                if isinstance(param, click.Argument)
-            ]
-            arg_str = " ".join(args) if args else ""
-            left = f"[{color}]{cmd_name}[/] {arg_str}"
-            left_text = Text.from_markup(left)
-            left_len = console.measure(left_text).maximum
-            pad = global_column - level * indent_size - left_len
-            pad_text = Text(" " * pad)
-            help_text_str = cmd.help or ""
-            help_start_relative = left_len + pad
-            help_start_absolute = level * indent_size + help_start_relative
-            available_width = console.width - help_start_absolute
-            if available_width < 10:
-                available_width = console.width // 2
-            lines = textwrap.wrap(help_text_str, width=available_width)
-            label = Text()
-            label.append_text(left_text)
-            label.append_text(pad_text)
-            if lines:
-                label.append(lines[0])
-                for line in lines[1:]:
-                    label.append("\n")
-                    indent_text = Text(" " * help_start_relative)
-                    label.append_text(indent_text)
-                    label.append(line)
-            cmd_branch = branch.add(label)
-            for param in cmd.params:
-                if isinstance(param, click.Option) and param.name != "help":
-                    add_option_branch(
-                        cmd_branch, param, level, global_column, indent_size, console
-                    )
-            if isinstance(cmd, click.Group) and cmd.commands:
-                add_to_tree(
-                    cmd_branch,
-                    cmd.commands,
-                    level + 1,
-                    path,
-                    path_index,
-                    global_column,
-                    indent_size,
-                    console,
-                    is_top_level,
-                    path_len,
-                )
+    """Yield the formatted help line by line, as it is rendered."""
+    if resolve_renderer(renderer) == "ansi":
+        from .ansi import iter_ansi_help as iter_help
     else:
-        next_cmd_name = path[path_index]
-        cmd = commands.get(next_cmd_name)
-        if cmd:
-            color = "bold green" if isinstance(cmd, click.Group) else "cyan"
-            args = [
-                f"[[orange1]{param.name.upper()}[/orange1]]"
-                for param in cmd.params
-                if isinstance(param, click.Argument)
-            ]
-            arg_str = " ".join(args) if args else ""
-            left = f"[{color}]{next_cmd_name}[/] {arg_str}"
-            left_text = Text.from_markup(left)
-            left_len = console.measure(left_text).maximum
-            pad = global_column - level * indent_size - left_len
-            pad_text = Text(" " * pad)
-            is_current = path_index + 1 == path_len
-            help_text_str = cmd.help or ""
-            help_start_relative = left_len + pad
-            help_start_absolute = level * indent_size + help_start_relative
-            available_width = console.width - help_start_absolute
-            if available_width < 10:
-                available_width = console.width // 2
-            lines = textwrap.wrap(help_text_str, width=available_width)
-            label = Text()
-            if is_current:
-                label.append_text(left_text)
-                label.append_text(pad_text)
-                if lines:
-                    label.append(lines[0], style="bold")
-                    for line in lines[1:]:
-                        label.append("\n")
-                        indent_text = Text(" " * help_start_relative)
-                        label.append_text(indent_text)
-                        label.append(line, style="bold")
-            else:
-                dim_left = left_text.copy()
-                dim_left.stylize("dim")
-                label.append_text(dim_left)
-                label.append_text(pad_text)
-                if lines:
-                    dim_help = Text(lines[0])
-                    dim_help.stylize("dim")
-                    label.append_text(dim_help)
-                    for line in lines[1:]:
-                        label.append("\n")
-                        indent_text = Text(" " * help_start_relative)
-                        indent_text.stylize("dim")
-                        label.append_text(indent_text)
-                        dim_line = Text(line)
-                        dim_line.stylize("dim")
-                        label.append_text(dim_line)
-            cmd_branch = branch.add(label)
-            for param in cmd.params:
-                if isinstance(param, click.Option) and param.name != "help":
-                    add_option_branch(
-                        cmd_branch,
-                        param,
-                        level,
-                        global_column,
-                        indent_size,
-                        console,
-                        dim=not is_current,
-                    )
-            if isinstance(cmd, click.Group) and cmd.commands:
-                add_to_tree(
-                    cmd_branch,
-                    cmd.commands,
-                    level + 1,
-                    path,
-                    path_index + 1,
-                    global_column,
-                    indent_size,
-                    console,
-                    is_top_level,
-                    path_len,
-                )
+        # rich is only imported once help is actually requested.
+        from .render import iter_rich_help as iter_help
+
+    return iter_help(
+        ctx,
+        is_group,
+        guides=guide_style(use_tree, guides),
+        max_width=max_width,
+        root_name=root_name,
+        budget=budget,
+        recorder=recorder,
+    )
+
+
+def resolve_renderer(renderer="auto"):
+    """Pick the help backend; "auto" avoids rich when stdout is not a TTY."""
+    if renderer != "auto":
+        return renderer
+    isatty = getattr(sys.stdout, "isatty", None)
+    return "rich" if isatty is not None and isatty() else "ansi"
+
+
+def help_layout(root_command, path=(), budget=None, recorder=NULL_RECORDER):
+    """Return the help layout for ``path``, reused while the tree is unchanged.
+
+    Layouts are only read by the renderers, so one process rendering help
+    many times compiles each once, and threads share them. Layouts with a
+    time budget depend on timing and are not cached. ``recorder`` is told
+    whether the layout was reused or compiled.
+    """
+    if budget is not None and budget.time_budget is not None:
+        layout = compile_layout(root_command, path, budget)
+        record_compile(recorder, layout)
+        return layout
+    key = (tuple(path), budget and budget.key())
+    cached = getattr(root_command, "_help_layouts", None)
+    if cached is not None and cached[0] == TreeGroup.structure_version:
+        layout = cached[1].get(key)
+        if layout is not None:
+            recorder.emit("cache_hit", cache="layout", count=1)
+            return layout
+    with _layout_lock:
+        cached = getattr(root_command, "_help_layouts", None)
+        if cached is None or cached[0] != TreeGroup.structure_version:
+            cached = (TreeGroup.structure_version, {})
+            root_command._help_layouts = cached
+        layouts = cached[1]
+        layout = layouts.get(key)
+        if layout is not None:
+            recorder.emit("cache_hit", cache="layout", count=1)
+            return layout
+        if len(layouts) >= LAYOUT_CACHE_SIZE:
+            layouts.clear()
+        layout = layouts[key] = compile_layout(root_command, path, budget)
+    recorder.emit("cache_miss", cache="layout", count=1)
+    record_compile(recorder, layout)
+    return layout
+
+
+def context_path(ctx):
+    """Names of the commands from below the root down to ``ctx``."""
+    path = []
+    while ctx.parent:
+        path.append(ctx.info_name)
+        ctx = ctx.parent
+    return path[::-1]
+
+
+def default_root_name(fallback):
+    """Name shown at the root of the tree: the invoked program, if known."""
+    if sys.argv and sys.argv[0]:
+        return os.path.basename(sys.argv[0])
+    return fallback
@@ -0,0 +1,142 @@
+"""Trie of the command names and aliases of a group, used to dispatch.
+
+Exact names and aliases, and unique prefixes, resolve in time linear in
+the length of the typed name. Unknown names get "did you mean"
+suggestions from an edit-distance search that only follows branches of the
+trie that can still be close enough, so groups with thousands of children
+never compare against every name.
+"""
+
+# Largest edit distance of a suggestion, and the most suggestions shown.
+MAX_DISTANCE = 2
+SUGGESTION_LIMIT = 3
+
+
+class TrieNode:
+    """A node of the name trie.
+
+    ``key`` is the name or alias ending here, if any, and ``target`` the
+    command name it stands for. ``targets`` counts the keys below this node
+    per target, so a prefix is unique when it holds a single target.
+    """
+
+    __slots__ = ("children", "key", "target", "targets")
+
+    def __init__(self):
+        self.children = {}
+        self.key = None
+        self.target = None
+        self.targets = {}
+
+
+class NameIndex:
+    """Command names and aliases of a group, each mapped to a command name."""
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.keys = {}
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, target):
+        """Map ``key`` to ``target``, replacing what it mapped to before."""
+        if key in self.keys:
+            self.remove(key)
+        self.keys[key] = target
+        node = self.root
+        node.targets[target] = node.targets.get(target, 0) + 1
+        for char in key:
+            node = node.children.setdefault(char, TrieNode())
+            node.targets[target] = node.targets.get(target, 0) + 1
+        node.key = key
+        node.target = target
+
+    def remove(self, key):
+        target = self.keys.pop(key, None)
+        if target is None:
+            return
+        path = [self.root]
+        for char in key:
+            path.append(path[-1].children[char])
+        path[-1].key = path[-1].target = None
+        for index, node in enumerate(path):
+            node.targets[target] -= 1
+            if not node.targets[target]:
+                del node.targets[target]
+            if not node.targets and index:
+                # Nothing ends below this node any more.
+                del path[index - 1].children[key[index - 1]]
+                break
+
+    def find(self, prefix):
+        """Return the trie node reached by ``prefix``, or None."""
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def resolve(self, word, prefixes=True):
+        """Return the target ``word`` stands for, or None.
+
+        ``word`` is a key or, with ``prefixes``, a prefix of keys that all
+        map to the same target.
+        """
+        node = self.find(word) if word else None
+        if node is None:
+            return None
+        if node.key is not None:
+            return node.target
+        if prefixes and len(node.targets) == 1:
+            return next(iter(node.targets))
+        return None
+
+    def matches(self, prefix):
+        """Return the sorted targets of the keys starting with ``prefix``."""
+        node = self.find(prefix)
+        return sorted(node.targets) if node is not None else []
+
+    def suggest(self, word, limit=SUGGESTION_LIMIT, max_distance=None):
+        """Return up to ``limit`` keys close to ``word``, the closest first.
+
+        Keys are ranked by edit distance, where swapping two adjacent
+        characters is one edit, and then by name. The distance is at most
+        ``max_distance``, by default growing with the length of ``word`` up
+        to ``MAX_DISTANCE``. One key is returned per target.
+        """
+        if max_distance is None:
+            max_distance = min(MAX_DISTANCE, max(1, len(word) // 3))
+        found = []
+        # The edit-distance table rows of a trie node and its parent, with
+        # the node's character, are kept on the stack.
+        stack = [(self.root, range(len(word) + 1), None, None)]
+        while stack:
+            node, row, above, last = stack.pop()
+            for char, child in node.children.items():
+                next_row = [row[0] + 1]
+                for index, letter in enumerate(word, 1):
+                    cost = min(
+                        next_row[index - 1] + 1,
+                        row[index] + 1,
+                        row[index - 1] + (letter != char),
+                    )
+                    if index > 1 and letter == last and word[index - 2] == char:
+                        # Two swapped characters count as one edit.
+                        cost = min(cost, above[index - 2] + 1)
+                    next_row.append(cost)
+                if child.key is not None and next_row[-1] <= max_distance:
+                    found.append((next_row[-1], child.key, child.target))
+                if min(next_row) <= max_distance:
+                    stack.append((child, next_row, row, char))
+        suggestions = []
+        seen = set()
+        for _, key, target in sorted(found):
+            if target not in seen:
+                seen.add(target)
+                suggestions.append(key)
+        return suggestions[:limit]
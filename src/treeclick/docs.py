@@ -0,0 +1,227 @@
+"""Markdown, HTML and man page documentation for every command of a tree.
+
+The tree is walked once (see ``treeclick.export``), and its records and
+shared help column serve every page in every format. Each page is written
+to disk as soon as it is rendered.
+"""
+
+import html
+import os
+
+from .export import tree_export
+from .layout import GUIDES, INDENT_SIZE
+
+FORMATS = ("md", "html", "man")
+EXTENSIONS = {"md": ".md", "html": ".html", "man": ".1"}
+
+
+def paragraphs(text):
+    """The paragraphs of a help text, each on one line."""
+    return [" ".join(part.split()) for part in text.split("\n\n") if part.strip()]
+
+
+def short_help(text):
+    """The first paragraph of a help text, on one line."""
+    return " ".join(text.split("\n\n", 1)[0].split())
+
+
+def usage(prog_name, record):
+    parts = [prog_name, *record["path"], "[OPTIONS]"]
+    for argument in record["arguments"]:
+        metavar = argument["metavar"]
+        if argument["nargs"] == -1:
+            metavar += "..."
+        parts.append(metavar if argument["required"] else f"[{metavar}]")
+    if record["type"] == "group":
+        parts.append("COMMAND [ARGS]...")
+    return " ".join(parts)
+
+
+def option_flags(option):
+    flags = ", ".join(option["opts"] + option["secondary_opts"])
+    if option["is_flag"]:
+        return flags
+    if "choices" in option:
+        return f"{flags} [{'|'.join(option['choices'])}]"
+    return f"{flags} {option['type'].upper()}"
+
+
+def option_help(option):
+    text = short_help(option["help"])
+    if option["required"]:
+        text = f"{text} (required)" if text else "(required)"
+    return text
+
+
+class DocsTree:
+    """Command records of a tree in pre-order, with their tree guides.
+
+    ``flags[i]`` tells, for each command on the path to record ``i``,
+    whether it is the last child of its parent.
+    """
+
+    def __init__(self, root, prog_name=None):
+        export = tree_export(root)
+        self.records = export.nodes
+        self.global_column = export.header["global_column"]
+        self.prog_name = prog_name or root.name
+        self.index = {}
+        self.flags = []
+        for position, record in enumerate(self.records):
+            path = tuple(record["path"])
+            self.index[path] = position
+            flags = ()
+            if path:
+                parent = self.index[path[:-1]]
+                last = self.records[parent]["commands"][-1] == path[-1]
+                flags = self.flags[parent] + (last,)
+            self.flags.append(flags)
+
+    def page_name(self, path):
+        return "-".join([self.prog_name, *path])
+
+    def subtree(self, position):
+        """Yield the ``(prefix, record, padding)`` lines of the tree below a record.
+
+        Labels are aligned on the help column shared by the whole tree.
+        """
+        top = self.records[position]["depth"]
+        column = self.global_column - top * INDENT_SIZE
+        space, cont, fork, end = GUIDES["tree"]
+        for below in range(position + 1, len(self.records)):
+            record = self.records[below]
+            depth = record["depth"]
+            if depth <= top:
+                break
+            flags = self.flags[below][top:]
+            prefix = "".join(space if last else cont for last in flags[:-1])
+            prefix += end if flags[-1] else fork
+            width = (depth - top) * INDENT_SIZE + record["label_width"]
+            yield prefix, record, max(column - width, 1)
+
+
+def tree_line(prefix, label, padding, record):
+    return (prefix + label + " " * padding + short_help(record["help"])).rstrip()
+
+
+def render_markdown(tree, position):
+    record = tree.records[position]
+    lines = [f"# {' '.join([tree.prog_name, *record['path']])}", ""]
+    lines += ["```", usage(tree.prog_name, record), "```", ""]
+    for paragraph in paragraphs(record["help"]):
+        lines += [paragraph, ""]
+    if record["options"]:
+        lines += ["## Options", ""]
+        for option in record["options"]:
+            text = option_help(option)
+            lines.append(f"- `{option_flags(option)}`" + (f": {text}" if text else ""))
+        lines.append("")
+    below = list(tree.subtree(position))
+    if below:
+        lines += ["## Commands", "", "```"]
+        for prefix, child, padding in below:
+            lines.append(tree_line(prefix, child["label"], padding, child))
+        lines += ["```", ""]
+    return "\n".join(lines)
+
+
+def render_html(tree, position):
+    record = tree.records[position]
+    title = html.escape(" ".join([tree.prog_name, *record["path"]]))
+    lines = [
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8">',
+        f"<title>{title}</title></head>",
+        "<body>",
+        f"<h1>{title}</h1>",
+        f"<pre>{html.escape(usage(tree.prog_name, record))}</pre>",
+    ]
+    for paragraph in paragraphs(record["help"]):
+        lines.append(f"<p>{html.escape(paragraph)}</p>")
+    if record["options"]:
+        lines += ["<h2>Options</h2>", "<dl>"]
+        for option in record["options"]:
+            lines.append(f"<dt><code>{html.escape(option_flags(option))}</code></dt>")
+            lines.append(f"<dd>{html.escape(option_help(option))}</dd>")
+        lines.append("</dl>")
+    below = list(tree.subtree(position))
+    if below:
+        lines += ["<h2>Commands</h2>", "<pre>"]
+        for prefix, child, padding in below:
+            href = html.escape(tree.page_name(child["path"]) + EXTENSIONS["html"])
+            text = child["label"].rstrip()
+            padding += len(child["label"]) - len(text)
+            label = f'<a href="{href}">{html.escape(text)}</a>'
+            lines.append(tree_line(html.escape(prefix), label, padding, child))
+        lines.append("</pre>")
+    lines += ["</body></html>", ""]
+    return "\n".join(lines)
+
+
+def roff(text):
+    """Escape text for a man page line."""
+    text = text.replace("\\", "\\e").replace("-", "\\-")
+    if text.startswith((".", "'")):
+        text = "\\&" + text
+    return text
+
+
+def render_man(tree, position):
+    record = tree.records[position]
+    name = tree.page_name(record["path"])
+    summary = short_help(record["help"])
+    lines = [f'.TH "{name.upper()}" "1"', ".SH NAME"]
+    lines.append(roff(name) + (f" \\- {roff(summary)}" if summary else ""))
+    lines += [".SH SYNOPSIS", roff(usage(tree.prog_name, record))]
+    description = paragraphs(record["help"])
+    if description:
+        lines.append(".SH DESCRIPTION")
+        for index, paragraph in enumerate(description):
+            if index:
+                lines.append(".PP")
+            lines.append(roff(paragraph))
+    if record["options"]:
+        lines.append(".SH OPTIONS")
+        for option in record["options"]:
+            lines += [".TP", f"\\fB{roff(option_flags(option))}\\fR"]
+            text = option_help(option)
+            if text:
+                lines.append(roff(text))
+    below = list(tree.subtree(position))
+    if below:
+        lines += [".SH COMMANDS", ".nf"]
+        for prefix, child, padding in below:
+            lines.append(roff(tree_line(prefix, child["label"], padding, child)))
+        lines += [".fi", ".SH SEE ALSO"]
+        children = [
+            f"\\fB{roff(tree.page_name(record['path'] + [command]))}\\fR(1)"
+            for command in record["commands"]
+        ]
+        lines.append(",\n".join(children))
+    lines.append("")
+    return "\n".join(lines)
+
+
+RENDERERS = {"md": render_markdown, "html": render_html, "man": render_man}
+
+
+def write_docs(root, output, formats=FORMATS, prog_name=None):
+    """Write one page per command and format into the directory ``output``.
+
+    Returns the number of pages written.
+    """
+    for fmt in formats:
+        if fmt not in RENDERERS:
+            raise ValueError(f"Unknown docs format: {fmt!r}")
+    tree = DocsTree(root, prog_name)
+    os.makedirs(output, exist_ok=True)
+    count = 0
+    for position, record in enumerate(tree.records):
+        name = tree.page_name(record["path"])
+        for fmt in formats:
+            page = RENDERERS[fmt](tree, position)
+            filename = os.path.join(output, name + EXTENSIONS[fmt])
+            with open(filename, "w", encoding="utf-8", newline="\n") as handle:
+                handle.write(page)
+            count += 1
+    return count
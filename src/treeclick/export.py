@@ -0,0 +1,156 @@
+import json
+
+import click
+
+from .core import TreeGroup
+from .layout import (
+    Layout,
+    LayoutNode,
+    command_node,
+    measure_nodes,
+    option_nodes,
+    sorted_children,
+)
+
+SCHEMA = "treeclick.tree"
+SCHEMA_VERSION = 1
+
+
+class TreeExport:
+    """Machine-readable model of a command tree, built in one traversal.
+
+    ``header`` describes the tree as a whole and ``nodes`` holds one record
+    per group or command in pre-order, each with its ``path`` of command
+    names below the root. The JSON document is produced once and reused;
+    JSON Lines are produced while they are written.
+    """
+
+    def __init__(self, root):
+        root_node = LayoutNode("group", root.name, 0, root.name, root.help)
+        self._layout_nodes = []
+        self._pending = []
+        self._visit(root, root_node)
+        measure_nodes(self._layout_nodes)
+        layout = Layout(root_node, self._layout_nodes)
+        del self._layout_nodes
+        self.header = {
+            "schema": SCHEMA,
+            "version": SCHEMA_VERSION,
+            "name": root.name,
+            "global_column": layout.global_column,
+            "count": len(self._pending),
+        }
+        self._nodes = None
+        self._document = None
+
+    def _visit(self, root, root_node):
+        stack = [(root, (), root_node, frozenset())]
+        while stack:
+            cmd, path, node, ancestors = stack.pop()
+            options = option_nodes(cmd, node.depth + 1)
+            if not path:
+                # Root options are shown in the top-level "Options" section.
+                for option in options:
+                    option.offset = 0
+            self._layout_nodes.append(node)
+            self._layout_nodes.extend(options)
+            self._pending.append((cmd, path, node, options))
+            # A command below itself is exported once more, but not its subtree.
+            if isinstance(cmd, click.Group) and id(cmd) not in ancestors:
+                below = ancestors | {id(cmd)}
+                depth = node.depth + 1
+                children = [
+                    (child, path + (name,), command_node(name, child, depth), below)
+                    for name, child in sorted_children(cmd)
+                ]
+                stack.extend(reversed(children))
+
+    @property
+    def nodes(self):
+        """The node records, built on first use."""
+        if self._nodes is None:
+            self._nodes = [record(*pending) for pending in self._pending]
+        return self._nodes
+
+    def to_dict(self):
+        return {**self.header, "nodes": self.nodes}
+
+    def to_json(self):
+        """The whole tree as one JSON document."""
+        if self._document is None:
+            self._document = json.dumps(self.to_dict(), ensure_ascii=False)
+        return self._document
+
+    def json_lines(self):
+        """Yield the header and then every node, one JSON document per line.
+
+        Lines are serialized as they are yielded, so output starts at once
+        and large trees are never held in memory as text.
+        """
+        yield json.dumps(self.header, ensure_ascii=False)
+        if self._nodes is not None:
+            for node in self._nodes:
+                yield json.dumps(node, ensure_ascii=False)
+        else:
+            for pending in self._pending:
+                yield json.dumps(record(*pending), ensure_ascii=False)
+
+
+def record(cmd, path, node, options):
+    """JSON record of one command, with its measured layout."""
+    arguments = []
+    option_records = []
+    option_iter = iter(options)
+    for param in cmd.params:
+        if isinstance(param, click.Argument):
+            arguments.append(
+                {
+                    "name": param.name,
+                    "metavar": param.name.upper(),
+                    "required": param.required,
+                    "nargs": param.nargs,
+                    "type": param.type.name,
+                }
+            )
+        elif isinstance(param, click.Option) and param.name != "help":
+            option = next(option_iter)
+            option_record = {
+                "name": param.name,
+                "opts": list(param.opts),
+                "secondary_opts": list(param.secondary_opts),
+                "help": param.help or "",
+                "required": param.required,
+                "is_flag": param.is_flag,
+                "multiple": param.multiple,
+                "type": param.type.name,
+                "label": option.label,
+                "label_width": option.width,
+            }
+            choices = getattr(param.type, "choices", None)
+            if choices is not None:
+                option_record["choices"] = [str(choice) for choice in choices]
+            option_records.append(option_record)
+    commands = []
+    if isinstance(cmd, click.Group):
+        commands = [name for name, _ in sorted_children(cmd)]
+    return {
+        "path": list(path),
+        "name": path[-1] if path else cmd.name,
+        "type": "group" if isinstance(cmd, click.Group) else "command",
+        "help": cmd.help or "",
+        "depth": len(path),
+        "label": node.label,
+        "label_width": node.width,
+        "arguments": arguments,
+        "options": option_records,
+        "commands": commands,
+    }
+
+
+def tree_export(root):
+    """Return the export of ``root``, rebuilding it if the tree changed."""
+    cached = getattr(root, "_tree_export", None)
+    if cached is None or cached[0] != TreeGroup.structure_version:
+        cached = (TreeGroup.structure_version, TreeExport(root))
+        root._tree_export = cached
+    return cached[1]
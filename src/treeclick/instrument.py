@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+INSTRUMENT_ENV = "TREECLICK_INSTRUMENT"
+
+# Events passed to hooks, each with a dict of event data:
+#   render_start  {"path"}                     before anything is rendered
+#   node_visited  {"node"}                     for every node of a new layout
+#   cache_hit     {"cache", "count"}           "catalog", "layout" or "widths"
+#   cache_miss    {"cache", "count"}
+#   render_end    {"path", "seconds", "phases", "counters"}
+EVENTS = ("render_start", "node_visited", "cache_hit", "cache_miss", "render_end")
+
+
+class Recorder:
+    """Collects phase durations, counters and events of one help render.
+
+    Phase times are exclusive: time spent in a nested phase (e.g. "wrap"
+    inside "labels") is only counted for the nested phase. ``hooks`` are
+    called as ``hook(event, data)`` for every event.
+    """
+
+    enabled = True
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.phases = {}
+        self.counters = {}
+        self.path = ()
+        self._start = None
+        self._child_time = 0.0
+
+    def emit(self, event, **data):
+        for hook in self.hooks:
+            hook(event, data)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase ``name``."""
+        start = time.perf_counter()
+        outer_child_time = self._child_time
+        self._child_time = 0.0
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed - self._child_time
+            self._child_time = outer_child_time + elapsed
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def start(self, path):
+        self.path = tuple(path)
+        self._start = time.perf_counter()
+        self.emit("render_start", path=self.path)
+
+    def finish(self):
+        seconds = time.perf_counter() - self._start
+        self.emit(
+            "render_end",
+            path=self.path,
+            seconds=seconds,
+            phases=dict(self.phases),
+            counters=dict(self.counters),
+        )
+
+
+class NullRecorder:
+    """Recorder used when instrumentation is off; every call does nothing."""
+
+    enabled = False
+    _phase = nullcontext()
+
+    def emit(self, event, **data):
+        pass
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, amount=1):
+        pass
+
+    def start(self, path):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_RECORDER = NullRecorder()
+
+
+def record_compile(recorder, layout):
+    """Report the nodes of a newly compiled and measured ``layout``."""
+    recorder.count("measured", len(layout.nodes))
+    for node in layout.nodes:
+        recorder.emit("node_visited", node=node)
+
+
+def record_layout(recorder, layout, before, after):
+    """Report the layout's nodes and label width cache use to ``recorder``."""
+    recorder.count("nodes", len(layout.nodes))
+    hits = after.hits - before.hits
+    misses = after.misses - before.misses
+    if hits:
+        recorder.emit("cache_hit", cache="widths", count=hits)
+    if misses:
+        recorder.emit("cache_miss", cache="widths", count=misses)
+
+
+def report_hook(event, data, file=None):
+    """Hook that writes a one-line summary of every render to stderr."""
+    if event != "render_end":
+        return
+    counters = data["counters"]
+    phases = ", ".join(
+        f"{name} {seconds * 1000:.2f} ms" for name, seconds in data["phases"].items()
+    )
+    label = " ".join(("treeclick help", *data["path"]))
+    print(
+        f"{label}: {data['seconds'] * 1000:.2f} ms, "
+        f"{counters.get('nodes', 0)} nodes, {counters.get('wraps', 0)} wraps, "
+        f"{counters.get('output_chars', 0)} chars ({phases})",
+        file=file or sys.stderr,
+        flush=True,
+    )
+
+
+def help_recorder(root):
+    """Return a recorder for the ``instrument`` setting of ``root``.
+
+    The setting is a hook, a list of hooks or True for the stderr report;
+    setting the ``TREECLICK_INSTRUMENT`` environment variable also enables
+    the report.
+    """
+    setting = getattr(root, "instrument", None)
+    if not setting and not os.environ.get(INSTRUMENT_ENV):
+        return NULL_RECORDER
+    if callable(setting):
+        hooks = [setting]
+    elif setting and setting is not True:
+        hooks = list(setting)
+    else:
+        hooks = []
+    if setting is True or os.environ.get(INSTRUMENT_ENV):
+        hooks.append(report_hook)
+    return Recorder(hooks)
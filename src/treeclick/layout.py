@@ -0,0 +1,674 @@
+import sys
+import time
+
+import click
+
+from .instrument import NULL_RECORDER
+from .providers import deferred_help
+from .widths import cell_width, cell_widths
+from .wrapping import wrap
+
+INDENT_SIZE = 4
+# Number of tree rows rendered between two flushes of streamed output.
+STREAM_BATCH = 32
+DESCRIPTION_LABEL = "Description: "
+GROUP_USAGE = "[OPTIONS] COMMAND [ARGS]..."
+CYCLE_TEXT = "Cycle: {name} is its own ancestor, not expanded again"
+
+
+class LayoutNode:
+    """A command, group or option of the help tree with its measured label.
+
+    ``label`` is the plain text of the label (name and arguments, or option
+    flags) and ``width`` its cell width. ``offset`` is the indentation the
+    label is measured at when computing the shared help column.
+
+    Nodes use ``__slots__`` since there is one per option of the tree.
+    ``options`` is replaced by a list when a command's options are attached,
+    and option nodes share an empty tuple as ``commands``.
+
+    ``help`` may be given as a callable, which is called the first time the
+    help is read, so help text is only produced for the rows rendered.
+    """
+
+    __slots__ = (
+        "_help",
+        "args",
+        "commands",
+        "depth",
+        "hidden_commands",
+        "hidden_options",
+        "kind",
+        "label",
+        "name",
+        "offset",
+        "options",
+        "required",
+        "width",
+    )
+
+    def __init__(self, kind, name, depth, label, help=None, required=False, args=()):
+        self.kind = kind
+        self.name = name
+        self.depth = depth
+        self.label = label
+        self._help = help or ""
+        self.required = required
+        self.args = args
+        self.width = 0
+        self.offset = depth * INDENT_SIZE
+        self.options = ()
+        self.commands = () if kind == "option" else []
+        self.hidden_commands = 0
+        self.hidden_options = 0
+
+    @property
+    def help(self):
+        if callable(self._help):
+            self._help = self._help() or ""
+        return self._help
+
+    @property
+    def effective(self):
+        return self.width + self.offset
+
+    def find(self, name):
+        """Return the child command node called ``name``, if any."""
+        for child in self.commands:
+            if child.name == name:
+                return child
+        return None
+
+
+class Layout:
+    """Flat model of a whole command tree, built in a single walk."""
+
+    def __init__(self, root, nodes, commands_only=False, extents=(0, 0)):
+        self.root = root
+        self.nodes = nodes
+        self.commands_only = commands_only
+        # ``extents`` accounts for commands and options that are not in
+        # ``nodes`` (see ``subtree_extents``).
+        command_effectives = [n.effective for n in nodes if n.kind != "option"]
+        option_effectives = [n.effective for n in nodes if n.kind == "option"]
+        max_command_effective = max([extents[0], *command_effectives])
+        max_option_effective = max([extents[1], *option_effectives])
+        self.global_column = max(max_command_effective, max_option_effective - 4) + 1
+
+    def lookup(self, path):
+        """Return the node for a path of command names below the root."""
+        node = self.root
+        for name in path:
+            node = node.find(name)
+            if node is None:
+                return None
+        return node
+
+
+def measure_nodes(nodes):
+    """Set the width of every node, measuring the labels in one batch."""
+    for node, width in zip(nodes, cell_widths([node.label for node in nodes])):
+        node.width = width
+
+
+def command_node(name, cmd, depth):
+    args = tuple(
+        param.name.upper() for param in cmd.params if isinstance(param, click.Argument)
+    )
+    label = name + " " + " ".join(f"[{arg}]" for arg in args)
+    kind = "group" if isinstance(cmd, click.Group) else "command"
+    return LayoutNode(kind, name, depth, label, deferred_help(cmd), args=args)
+
+
+def option_nodes(cmd, depth, params=None):
+    """Return a node for every option of ``cmd`` except ``--help``.
+
+    Labels are interned, since the same flags recur across many commands.
+    Options with a ``help_text`` method, like ``TreeOption``, are shown
+    with the help it returns. ``params`` replaces ``cmd.params``.
+    """
+    nodes = []
+    for param in cmd.params if params is None else params:
+        if isinstance(param, click.Option) and param.name != "help":
+            opts = sys.intern(", ".join(param.opts))
+            help = getattr(param, "help_text", None) or deferred_help(param)
+            nodes.append(LayoutNode("option", opts, depth, opts, help, param.required))
+    return nodes
+
+
+def root_option_nodes(root_command, depth):
+    """Option nodes of the root command, including those only the root accepts."""
+    params = list(root_command.params)
+    if hasattr(root_command, "root_options"):
+        params.extend(root_command.root_options())
+    return option_nodes(root_command, depth, params)
+
+
+def sorted_children(group):
+    """Return the ``(name, command)`` pairs of ``group`` in name order.
+
+    TreeGroups keep their child names sorted as commands are added, so
+    only other groups are sorted here.
+    """
+    names = getattr(group, "child_names", None)
+    if names is None:
+        names = sorted(group.commands)
+    return [(name, group.commands[name]) for name in names]
+
+
+def option_extent(cmd):
+    """Return the cell width of the widest option label of ``cmd``, or 0."""
+    return max(cell_widths([node.label for node in option_nodes(cmd, 0)]), default=0)
+
+
+def child_extents(name, cmd):
+    """Return the extents a child ``cmd`` called ``name`` adds to its parent.
+
+    The child is one indent in from its parent and its options two.
+    """
+    commands = cell_width(command_node(name, cmd, 0).label) + INDENT_SIZE
+    options = option_extent(cmd)
+    if options:
+        options += 2 * INDENT_SIZE
+    below_commands, below_options = subtree_extents(cmd)
+    if below_commands:
+        commands = max(commands, below_commands + INDENT_SIZE)
+    if below_options:
+        options = max(options, below_options + INDENT_SIZE)
+    return commands, options
+
+
+def subtree_extents(cmd):
+    """Return the widest command and option labels below ``cmd``.
+
+    Each is the largest label width plus indentation relative to ``cmd``,
+    or 0. TreeGroups maintain these as commands are added, unless their
+    subtree has a cycle; otherwise the subtree is compiled and measured.
+    """
+    extents = getattr(cmd, "subtree_extents", None)
+    if extents is not None:
+        return extents
+    nodes = []
+    if isinstance(cmd, click.Group):
+        collect_effective_lengths(cmd, 1, LayoutNode("group", cmd.name, 0, ""), nodes)
+    measure_nodes(nodes)
+    commands = max((n.effective for n in nodes if n.kind != "option"), default=0)
+    options = max((n.effective for n in nodes if n.kind == "option"), default=0)
+    return commands, options
+
+
+def cycle_node(name, depth):
+    """Row shown instead of the subtree of a command that is its own ancestor."""
+    return LayoutNode("notice", "", depth, "", CYCLE_TEXT.format(name=name))
+
+
+def collect_effective_lengths(group, level, parent, nodes, ancestors=()):
+    """Compile the commands below ``group``, adding a node per command and option.
+
+    The walk keeps an explicit stack, so trees of any depth can be
+    compiled. ``ancestors`` holds the ids of the commands above ``group``;
+    a command met again below itself gets a cycle notice instead of its
+    subtree. A command registered under several groups is compiled once
+    per name and depth, and its nodes are shared by every parent.
+    """
+    shared = {}
+    on_path = set(ancestors)
+    on_path.add(id(group))
+    # Frames: parent node, its remaining children, the command id it adds to
+    # ``on_path``, its memo key and whether a cycle was cut below it.
+    stack = [[parent, iter(sorted_children(group)), None, None, False]]
+    while stack:
+        frame = stack[-1]
+        node = frame[0]
+        for name, cmd in frame[1]:
+            key = (id(cmd), name, level + len(stack) - 1)
+            child = shared.get(key)
+            if child is not None:
+                node.commands.append(child)
+                continue
+            child = command_node(name, cmd, key[2])
+            node.commands.append(child)
+            nodes.append(child)
+            if id(cmd) in on_path:
+                child.commands.append(cycle_node(name, key[2] + 1))
+                frame[4] = True
+                continue
+            child.options = option_nodes(cmd, key[2] + 1)
+            nodes.extend(child.options)
+            if isinstance(cmd, click.Group) and cmd.commands:
+                on_path.add(id(cmd))
+                stack.append([child, iter(sorted_children(cmd)), id(cmd), key, False])
+                break
+            shared[key] = child
+        else:
+            stack.pop()
+            on_path.discard(frame[2])
+            if frame[4]:
+                # Below a cycle the rows depend on the path taken.
+                if stack:
+                    stack[-1][4] = True
+            elif frame[3] is not None:
+                shared[frame[3]] = node
+
+
+class Budget:
+    """Limits on how much of the command tree help renders.
+
+    ``max_depth`` counts levels below the command whose help is shown,
+    ``max_children`` limits the commands shown per group and ``max_options``
+    the options shown per command. Once ``time_budget`` seconds have been
+    spent, groups that have not been expanded yet are collapsed. With
+    ``commands_only`` no option branches are shown in the tree.
+    """
+
+    def __init__(
+        self,
+        max_depth=None,
+        max_children=None,
+        max_options=None,
+        time_budget=None,
+        commands_only=False,
+    ):
+        self.max_depth = max_depth
+        self.max_children = max_children
+        self.max_options = max_options
+        self.time_budget = time_budget
+        self.commands_only = commands_only
+        self.deadline = None
+
+    def key(self):
+        return (
+            self.max_depth,
+            self.max_children,
+            self.max_options,
+            self.time_budget,
+            self.commands_only,
+        )
+
+    def start(self):
+        if self.time_budget is not None:
+            self.deadline = time.perf_counter() + self.time_budget
+
+    def expired(self):
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+
+def option_count(cmd):
+    """Return the number of options of ``cmd``, not counting ``--help``."""
+    return sum(
+        1
+        for param in cmd.params
+        if isinstance(param, click.Option) and param.name != "help"
+    )
+
+
+def count_subtree(cmd):
+    """Return the number of commands and options below ``cmd``, itself included.
+
+    Shared subtrees count once per place they appear; a command below
+    itself counts as one command. TreeGroups keep the counts below them in
+    ``subtree_counts``, so only other groups are walked.
+    """
+    commands = options = 0
+    stack = [(cmd, frozenset())]
+    while stack:
+        cmd, ancestors = stack.pop()
+        commands += 1
+        if id(cmd) in ancestors:
+            continue
+        options += option_count(cmd)
+        counts = getattr(cmd, "subtree_counts", None)
+        if counts is not None:
+            commands += counts[0]
+            options += counts[1]
+        elif isinstance(cmd, click.Group):
+            below = ancestors | {id(cmd)}
+            stack.extend((child, below) for child in cmd.commands.values())
+    return commands, options
+
+
+def hide_children(node, cmd, shown=()):
+    """Account for the children of ``cmd`` not in ``shown`` in ``node``'s summary.
+
+    ``shown`` holds the names of the children that are shown. With the
+    ``subtree_counts`` of a TreeGroup this takes time proportional to the
+    shown children only.
+    """
+    counts = getattr(cmd, "subtree_counts", None)
+    if counts is not None:
+        commands, options = counts
+        for name in shown:
+            shown_commands, shown_options = count_subtree(cmd.commands[name])
+            commands -= shown_commands
+            options -= shown_options
+    else:
+        commands = options = 0
+        shown = set(shown)
+        for name, child in cmd.commands.items():
+            if name not in shown:
+                hidden_commands, hidden_options = count_subtree(child)
+                commands += hidden_commands
+                options += hidden_options
+    node.hidden_commands += commands
+    node.hidden_options += options
+
+
+def budgeted_options(node, cmd, budget):
+    """Attach the option nodes of ``cmd`` that fit in ``budget`` to ``node``."""
+    if budget.commands_only:
+        return []
+    options = option_nodes(cmd, node.depth + 1)
+    if budget.max_options is not None and len(options) > budget.max_options:
+        node.hidden_options += len(options) - budget.max_options
+        options = options[: budget.max_options]
+    node.options = options
+    return options
+
+
+def expand_budgeted(node, cmd, nodes, budget, ancestors=()):
+    """Compile the subtree of ``node`` that fits in ``budget``."""
+    base_depth = node.depth
+    stack = [(node, cmd, frozenset(ancestors))]
+    while stack:
+        node, cmd, ancestors = stack.pop()
+        if not isinstance(cmd, click.Group) or not cmd.commands:
+            continue
+        if id(cmd) in ancestors:
+            node.commands.append(cycle_node(node.name, node.depth + 1))
+            continue
+        too_deep = (
+            budget.max_depth is not None
+            and node.depth + 1 > base_depth + budget.max_depth
+        )
+        if too_deep or budget.expired():
+            hide_children(node, cmd)
+            continue
+        children = sorted_children(cmd)
+        shown = children
+        if budget.max_children is not None:
+            shown = children[: budget.max_children]
+        below = ancestors | {id(cmd)}
+        expanded = []
+        for name, child in shown:
+            child_node = command_node(name, child, node.depth + 1)
+            node.commands.append(child_node)
+            nodes.append(child_node)
+            nodes.extend(budgeted_options(child_node, child, budget))
+            expanded.append((child_node, child, below))
+        if len(shown) < len(children):
+            hide_children(node, cmd, [name for name, _ in shown])
+        # Expand depth first in name order, as the rows are shown.
+        stack.extend(reversed(expanded))
+
+
+def walk_path(root, root_command, path, nodes, options):
+    """Compile the commands along ``path``; return the last node and command.
+
+    ``options(node, cmd)`` attaches and returns the option nodes of each
+    command. Returns None if ``path`` does not exist.
+    """
+    node, cmd = root, root_command
+    for name in path:
+        child = cmd.commands.get(name) if isinstance(cmd, click.Group) else None
+        if child is None:
+            return None
+        child_node = command_node(name, child, node.depth + 1)
+        node.commands.append(child_node)
+        nodes.append(child_node)
+        nodes.extend(options(child_node, child))
+        node, cmd = child_node, child
+    return node, cmd
+
+
+def path_ancestors(root_command, path):
+    """Ids of the commands above the last one of ``path``."""
+    ids = [id(root_command)]
+    cmd = root_command
+    for name in path[:-1]:
+        cmd = cmd.commands[name]
+        ids.append(id(cmd))
+    return ids
+
+
+def collect_budgeted(root, root_command, path, nodes, budget):
+    """Compile only the rows shown for ``path``, within ``budget``."""
+    budget.start()
+    found = walk_path(
+        root,
+        root_command,
+        path,
+        nodes,
+        lambda node, cmd: budgeted_options(node, cmd, budget),
+    )
+    if found is not None:
+        node, cmd = found
+        ancestors = path_ancestors(root_command, path) if path else ()
+        expand_budgeted(node, cmd, nodes, budget, ancestors)
+
+
+def attach_options(node, cmd):
+    node.options = option_nodes(cmd, node.depth + 1)
+    return node.options
+
+
+def collect_path(root, root_command, path, nodes):
+    """Compile the commands along ``path`` and the whole subtree of the last."""
+    found = walk_path(root, root_command, path, nodes, attach_options)
+    if found is None:
+        return
+    node, cmd = found
+    if isinstance(cmd, click.Group) and cmd.commands:
+        ancestors = path_ancestors(root_command, path)
+        if id(cmd) in ancestors:
+            node.commands.append(cycle_node(node.name, node.depth + 1))
+        else:
+            collect_effective_lengths(cmd, node.depth + 1, node, nodes, ancestors)
+
+
+def compile_layout(root_command, path=(), budget=None):
+    """Build the layout model for the tree below ``root_command``.
+
+    Without a budget the help column is shared by the whole tree. The root
+    help compiles every command and option; below the root only the rows
+    shown for ``path`` are compiled and the widest labels of the tree come
+    from ``subtree_extents``, which TreeGroups maintain. With a budget only
+    the rows shown are compiled too, and the column is computed from them.
+    """
+    root = LayoutNode(
+        "group", root_command.name, 0, root_command.name, root_command.help
+    )
+    root.options = root_option_nodes(root_command, 1)
+    for option in root.options:
+        # Root options are shown in the top-level "Options" section, so they
+        # count towards the help column without tree indentation.
+        option.offset = 0
+    nodes = [root] + root.options
+    extents = (0, 0)
+    if budget is not None:
+        collect_budgeted(root, root_command, path, nodes, budget)
+    elif path:
+        collect_path(root, root_command, path, nodes)
+        extents = subtree_extents(root_command)
+    else:
+        collect_effective_lengths(root_command, 1, root, nodes)
+    measure_nodes(nodes)
+    return Layout(root, nodes, budget is not None and budget.commands_only, extents)
+
+
+def summary_node(node):
+    """Row summarizing the commands and options collapsed below ``node``."""
+    parts = []
+    for count, noun in (
+        (node.hidden_commands, "command"),
+        (node.hidden_options, "option"),
+    ):
+        if count:
+            parts.append(f"{count} {noun}{'' if count == 1 else 's'}")
+    return LayoutNode("summary", "", node.depth + 1, "+ " + ", ".join(parts))
+
+
+def child_rows(node, with_options=True):
+    """Return the ``(node, style, last)`` rows directly below ``node``."""
+    options = node.options if with_options else ()
+    commands = node.commands
+    if node.hidden_commands or node.hidden_options:
+        commands = [*commands, summary_node(node)]
+    count = len(options) + len(commands)
+    rows = [(option, None, index == count - 1) for index, option in enumerate(options)]
+    rows.extend(
+        (child, None, index == count - 1)
+        for index, child in enumerate(commands, len(options))
+    )
+    return rows
+
+
+def expand_rows(node, with_options=True):
+    """Yield the options and full command subtree of ``node`` as rows.
+
+    The subtree is walked with an explicit stack, so any depth works.
+    """
+    stack = [iter(child_rows(node, with_options))]
+    while stack:
+        for row in stack[-1]:
+            yield row
+            if row[0].kind in ("group", "command"):
+                stack.append(iter(child_rows(row[0])))
+                break
+        else:
+            stack.pop()
+
+
+def select_rows(layout, path):
+    """Yield the ``(node, style, last)`` rows shown in the tree for ``path``.
+
+    ``path`` holds the command names below the root. At the top level the
+    whole tree is shown; otherwise the ancestors of the current command are
+    dimmed and only the current command's subtree is expanded. Styles are
+    ``"current"``, ``"dim"`` or None, and ``last`` tells whether the row is
+    the last child of its parent. Rows are produced lazily so huge trees can
+    be streamed.
+    """
+    root = layout.root
+    if not path:
+        yield root, "current", True
+        yield from expand_rows(root, with_options=False)
+        return
+
+    yield root, "dim", True
+    node = root
+    for index, name in enumerate(path):
+        child = node.find(name)
+        options = [] if layout.commands_only else node.options
+        for option_index, option in enumerate(options):
+            last = child is None and option_index == len(options) - 1
+            yield option, "dim", last
+        if child is None:
+            return
+        if index == len(path) - 1:
+            yield child, "current", True
+            yield from expand_rows(child)
+            return
+        yield child, "dim", True
+        node = child
+
+
+SPACE, CONTINUE, FORK, END = range(4)
+GUIDES = {
+    "tree": ("    ", "│   ", "├── ", "└── "),
+    "ascii": ("    ", "|   ", "+-- ", "`-- "),
+    "indent": ("    ", "    ", "    ", "    "),
+}
+
+
+def guide_levels(rows):
+    """Yield each row with the guide indexes in front of its lines.
+
+    Yields ``(node, style, (first, rest))`` where ``first`` and ``rest`` are
+    tuples holding one of ``SPACE``, ``CONTINUE``, ``FORK`` or ``END`` per
+    tree level, for the row's first and following lines. Any guide style
+    from ``GUIDES`` can then be applied in a single pass.
+    """
+    ancestors = []
+    for node, style, last in rows:
+        if node.depth == 0:
+            del ancestors[:]
+            yield node, style, ((), ())
+            continue
+        del ancestors[node.depth - 1 :]
+        above = tuple(SPACE if done else CONTINUE for done in ancestors)
+        first = above + (END if last else FORK,)
+        rest = above + (SPACE if last else CONTINUE,)
+        yield node, style, (first, rest)
+        ancestors.append(last)
+
+
+def wrap_text(text, width, recorder=NULL_RECORDER):
+    """Wrap ``text`` into lines of at most ``width`` cells."""
+    if not recorder.enabled:
+        return wrap(text, width)
+    recorder.count("wraps")
+    with recorder.phase("wrap"):
+        return wrap(text, width)
+
+
+def help_width(width, start):
+    """Cells left for help text starting at ``start``, at least a few."""
+    available = width - start
+    return available if available >= 10 else width // 2
+
+
+class HeaderOption:
+    """An option of the header's "Options:" section, placed and wrapped.
+
+    ``pad`` is the space after the flags and ``indent`` the column the
+    ``lines`` of help start at.
+    """
+
+    def __init__(self, node, pad, indent, lines):
+        self.node = node
+        self.pad = pad
+        self.indent = indent
+        self.lines = lines
+
+
+class Header:
+    """The usage, description and options above the tree, without styles.
+
+    ``arguments`` holds the argument names of a command's usage, and is
+    None for groups, whose usage is ``GROUP_USAGE``. ``description`` holds
+    the wrapped help lines, which start after ``DESCRIPTION_LABEL``, and
+    ``options`` a ``HeaderOption`` for each option of the current command.
+    """
+
+    def __init__(self, ctx, is_group, layout, path, budget, width, recorder):
+        if is_group:
+            self.arguments = None
+        else:
+            self.arguments = [
+                param.name.upper()
+                for param in ctx.command.params
+                if isinstance(param, click.Argument)
+            ]
+        self.description_indent = cell_width(DESCRIPTION_LABEL)
+        help_text = ctx.command.help or ""
+        self.description = []
+        if help_text:
+            available = help_width(width, self.description_indent)
+            self.description = wrap_text(help_text, available, recorder)
+
+        current = layout.lookup(path)
+        if current is not None and budget is None:
+            nodes = current.options
+        else:
+            if ctx.parent is None:
+                nodes = root_option_nodes(ctx.command, 0)
+            else:
+                nodes = option_nodes(ctx.command, 0)
+            measure_nodes(nodes)
+        self.options = []
+        for node in nodes:
+            pad = layout.global_column - node.width
+            # The help follows "* " for required options and " " otherwise.
+            indent = node.width + pad + (2 if node.required else 1)
+            lines = wrap_text(node.help, help_width(width, indent), recorder)
+            self.options.append(HeaderOption(node, pad, indent, lines))
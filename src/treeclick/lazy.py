@@ -0,0 +1,154 @@
+import importlib
+import json
+
+import click
+
+from .core import TreeCommand, TreeGroup, propagate_settings
+
+
+def load_object(import_path):
+    """Import ``package.module:attr`` and return the attribute."""
+    module_name, sep, attr = import_path.partition(":")
+    if not sep:
+        module_name, _, attr = import_path.rpartition(".")
+    if not module_name or not attr:
+        raise ValueError(f"Invalid import path: {import_path!r}")
+    obj = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def make_params(arguments=(), options=()):
+    """Build click parameters from manifest metadata.
+
+    Arguments are names or dicts with ``name`` and ``required``; options are
+    dicts with ``opts`` and optionally ``help``, ``required`` and ``is_flag``.
+    """
+    params = []
+    for arg in arguments:
+        spec = {"name": arg} if isinstance(arg, str) else arg
+        params.append(
+            click.Argument([spec["name"]], required=spec.get("required", True))
+        )
+    for opt in options:
+        params.append(
+            click.Option(
+                list(opt["opts"]),
+                help=opt.get("help"),
+                required=opt.get("required", False),
+                is_flag=opt.get("is_flag", False),
+            )
+        )
+    return params
+
+
+class LazyCommand(TreeCommand):
+    """Placeholder command described by metadata, imported when it runs."""
+
+    def __init__(
+        self, name, import_path, help=None, arguments=(), options=(), **kwargs
+    ):
+        super().__init__(
+            name, help=help, params=make_params(arguments, options), **kwargs
+        )
+        self.import_path = import_path
+        self._target = None
+
+    def load(self):
+        """Import the real command, propagating tree configuration to it."""
+        if self._target is None:
+            target = load_object(self.import_path)
+            propagate_settings(self, target)
+            self._target = target
+        return self._target
+
+    def parse_args(self, ctx, args):
+        # Help is rendered from the metadata; anything else is parsed by the
+        # real command once it has been imported.
+        if self.help_requested(ctx, args):
+            return super().parse_args(ctx, ctx.help_option_names[:1])
+        ctx.args = list(args)
+        return ctx.args
+
+    def help_requested(self, ctx, args):
+        """Whether ``args`` ask for this command's own help.
+
+        That is the case only if a help flag comes before any positional
+        argument, which may name a subcommand of a lazily loaded group, and
+        is not the value of an option. Unknown options are left to the real
+        command.
+        """
+        values = {}
+        for param in self.params:
+            if isinstance(param, click.Option):
+                count = 0 if param.is_flag or param.count else param.nargs
+                for opt in (*param.opts, *param.secondary_opts):
+                    values[opt] = count
+        tokens = iter(args)
+        for arg in tokens:
+            if arg in ctx.help_option_names:
+                return True
+            name = arg.partition("=")[0]
+            if arg == "--" or not arg.startswith("-") or name not in values:
+                return False
+            if "=" not in arg:
+                for _ in range(values[name]):
+                    next(tokens, None)
+        return False
+
+    def invoke(self, ctx):
+        target = self.load()
+        sub_ctx = target.make_context(ctx.info_name, list(ctx.args), parent=ctx.parent)
+        with sub_ctx:
+            return target.invoke(sub_ctx)
+
+
+class LazyTreeGroup(TreeGroup):
+    """TreeGroup whose subcommands are registered by import path and metadata.
+
+    The help tree is rendered from the metadata alone; a subcommand's module
+    is only imported when that subcommand is run.
+    """
+
+    def __init__(self, *args, lazy_subcommands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, spec in (lazy_subcommands or {}).items():
+            self.add_lazy_command(name, **spec)
+
+    def add_lazy_command(
+        self,
+        name,
+        import_path=None,
+        help=None,
+        arguments=(),
+        options=(),
+        commands=None,
+    ):
+        """Register a lazy command, or a group of them when ``commands`` is given."""
+        if commands is not None:
+            group = LazyTreeGroup(
+                name=name, help=help, params=make_params(options=options)
+            )
+            self.add_command(group)
+            for child_name, spec in commands.items():
+                group.add_lazy_command(child_name, **spec)
+            return group
+        if import_path is None:
+            raise ValueError(f"Lazy command {name!r} needs an import_path")
+        cmd = LazyCommand(
+            name, import_path, help=help, arguments=arguments, options=options
+        )
+        self.add_command(cmd)
+        return cmd
+
+    @classmethod
+    def from_manifest(cls, manifest, **kwargs):
+        """Create a group from a manifest dict or the path of a JSON manifest."""
+        if not isinstance(manifest, dict):
+            with open(manifest, encoding="utf-8") as f:
+                manifest = json.load(f)
+        kwargs.setdefault("name", manifest.get("name"))
+        kwargs.setdefault("help", manifest.get("help"))
+        kwargs.setdefault("params", make_params(options=manifest.get("options", ())))
+        return cls(lazy_subcommands=manifest.get("commands", {}), **kwargs)
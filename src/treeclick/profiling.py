@@ -0,0 +1,214 @@
+"""Measure what help costs for every command of a CLI.
+
+Used by ``python -m treeclick profile module:cli``. Each command path is
+rendered cold (layout and text caches cleared) and warm, and its compiled
+node count, render times, render phases, peak memory and output size are
+reported. A separate profiled pass finds the treeclick functions that help
+rendering spends the most time in.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import click
+
+from .catalog import iter_command_paths
+from .core import format_tree_help, help_budget, make_help_context
+from .instrument import NULL_RECORDER, Recorder
+from .widths import _unicode_cell_width
+from .wrapping import wrap
+
+SORT_KEYS = {
+    "path": lambda row: row["path"],
+    "nodes": lambda row: -row["nodes"],
+    "cold": lambda row: -row["cold_ms"],
+    "warm": lambda row: -row["warm_ms"],
+    "memory": lambda row: -row["peak_kib"],
+    "size": lambda row: -row["chars"],
+}
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def module_import_time(target):
+    """Milliseconds a fresh interpreter takes to import the module of ``target``.
+
+    Returns None if the module cannot be imported on its own.
+    """
+    module = target.partition(":")[0] if ":" in target else target.rpartition(".")[0]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(path for path in sys.path if path)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    if result.returncode:
+        return None
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    return None
+
+
+def clear_caches(root):
+    """Forget the compiled layouts of ``root`` and the label and wrap caches."""
+    root.__dict__.pop("_help_layouts", None)
+    wrap.cache_clear()
+    _unicode_cell_width.cache_clear()
+
+
+class Profiler:
+    """Renders help for the paths of ``root`` and collects measurements."""
+
+    def __init__(self, root, prog_name=None, width=80, renderer="ansi", repeat=3):
+        self.root = root
+        self.prog_name = prog_name or root.name
+        self.width = width
+        self.renderer = renderer
+        self.repeat = repeat
+
+    def render(self, path, recorder=NULL_RECORDER):
+        ctx = make_help_context(self.root, path, self.prog_name, self.width)
+        return format_tree_help(
+            ctx,
+            isinstance(ctx.command, click.Group),
+            use_tree=getattr(self.root, "use_tree", True),
+            max_width=self.width,
+            root_name=self.prog_name,
+            guides=getattr(self.root, "guides", None),
+            budget=help_budget(self.root),
+            recorder=recorder,
+            renderer=self.renderer,
+        )
+
+    def measure(self, path):
+        """Measurements of the help of ``path``."""
+        clear_caches(self.root)
+        recorder = Recorder()
+        recorder.start(path)
+        start = time.perf_counter()
+        output = self.render(path, recorder)
+        cold = time.perf_counter() - start
+        warm = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            self.render(path)
+            warm.append(time.perf_counter() - start)
+        clear_caches(self.root)
+        tracemalloc.start()
+        try:
+            self.render(path)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            "path": list(path),
+            "nodes": recorder.counters.get("nodes", 0),
+            "cold_ms": cold * 1000,
+            "warm_ms": min(warm, default=cold) * 1000,
+            "phases_ms": {
+                name: seconds * 1000 for name, seconds in recorder.phases.items()
+            },
+            "peak_kib": peak / 1024,
+            "chars": len(output),
+            "lines": output.count("\n"),
+        }
+
+    def hot_functions(self, paths, limit):
+        """The ``limit`` treeclick functions with most own time in cold renders."""
+        profiler = cProfile.Profile()
+        for path in paths:
+            clear_caches(self.root)
+            profiler.enable()
+            self.render(path)
+            profiler.disable()
+        functions = []
+        for (filename, line, name), row in pstats.Stats(profiler).stats.items():
+            if not os.path.abspath(filename).startswith(PACKAGE_DIR):
+                continue
+            calls, own, cumulative = row[1], row[2], row[3]
+            module = os.path.splitext(os.path.relpath(filename, PACKAGE_DIR))[0]
+            functions.append(
+                {
+                    "function": f"treeclick.{module}.{name}:{line}",
+                    "calls": calls,
+                    "own_ms": own * 1000,
+                    "cumulative_ms": cumulative * 1000,
+                }
+            )
+        functions.sort(key=lambda function: -function["own_ms"])
+        return functions[:limit]
+
+
+def profile_cli(
+    root,
+    prog_name=None,
+    width=80,
+    renderer="ansi",
+    repeat=3,
+    max_depth=None,
+    functions=10,
+):
+    """Profile help for every command path of ``root`` (up to ``max_depth``).
+
+    Returns a dict with a row per path under ``"paths"`` and the hottest
+    treeclick functions under ``"functions"``.
+    """
+    profiler = Profiler(root, prog_name, width, renderer, repeat)
+    paths = [
+        path
+        for path in iter_command_paths(root)
+        if max_depth is None or len(path) <= max_depth
+    ]
+    # The first render imports the renderer; keep that out of the timings.
+    profiler.render(())
+    rows = [profiler.measure(path) for path in paths]
+    report = {
+        "name": profiler.prog_name,
+        "width": width,
+        "renderer": renderer,
+        "paths": rows,
+        "functions": profiler.hot_functions(paths, functions) if functions else [],
+    }
+    clear_caches(root)
+    return report
+
+
+def format_report(report, sort="path", limit=None):
+    """Lines of a text table of ``report``."""
+    rows = sorted(report["paths"], key=SORT_KEYS[sort])[:limit]
+    import_ms = report.get("import_ms")
+    lines = [
+        f"{report['name']}: {len(report['paths'])} paths, width {report['width']}, "
+        f"{report['renderer']} renderer"
+        + (f", import {import_ms:.1f} ms" if import_ms is not None else "")
+    ]
+    lines.append(
+        f"{'nodes':>7} {'cold ms':>9} {'warm ms':>9} {'peak KiB':>9} "
+        f"{'chars':>8}  path"
+    )
+    for row in rows:
+        lines.append(
+            f"{row['nodes']:>7} {row['cold_ms']:>9.2f} {row['warm_ms']:>9.2f} "
+            f"{row['peak_kib']:>9.0f} {row['chars']:>8}  "
+            + " ".join([report["name"], *row["path"]])
+        )
+    if report["functions"]:
+        lines.append("")
+        lines.append(f"{'calls':>9} {'own ms':>9} {'cum ms':>9}  function")
+        for function in report["functions"]:
+            lines.append(
+                f"{function['calls']:>9} {function['own_ms']:>9.2f} "
+                f"{function['cumulative_ms']:>9.2f}  {function['function']}"
+            )
+    return lines
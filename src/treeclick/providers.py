@@ -0,0 +1,180 @@
+"""Help text, shown defaults and choices produced only when they are needed.
+
+Expensive help strings, say from translation catalogs or config files, can
+be given as callables. They are called the first time help that shows them
+is rendered, and never while commands are dispatched.
+"""
+
+import _thread
+import inspect
+
+import click
+
+# Held while a provider runs, so each is called once even across threads.
+# Re-entrant, since a provider may read another deferred attribute.
+_provider_lock = _thread.RLock()
+
+
+class Deferred:
+    """Attribute that may be set to a callable, called on first read.
+
+    The result, passed through ``convert``, replaces the callable, so each
+    provider is called at most once per object, also when several threads
+    read the attribute at once.
+    """
+
+    def __init__(self, convert=None):
+        self.convert = convert
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.slot = "_deferred_" + name
+        self.provider_slot = "_provider_" + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.slot)
+        if callable(value):
+            with _provider_lock:
+                value = obj.__dict__.get(self.slot)
+                if callable(value):
+                    value = value()
+                    if self.convert is not None:
+                        value = self.convert(value)
+                    obj.__dict__[self.slot] = value
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.slot] = value
+        if callable(value):
+            obj.__dict__[self.provider_slot] = provider_name(value)
+        else:
+            obj.__dict__.pop(self.provider_slot, None)
+
+    def pending(self, obj):
+        """Whether the provider of ``obj`` has not been called yet."""
+        return callable(obj.__dict__.get(self.slot))
+
+
+def provider_name(provider):
+    """Name of ``provider`` that is the same in every process."""
+    name = getattr(provider, "__qualname__", None) or type(provider).__qualname__
+    return f"{getattr(provider, '__module__', None)}.{name}"
+
+
+def stable_value(obj, attribute):
+    """``obj.<attribute>``, or the name of its provider if it was given one.
+
+    Never calls a provider, so whole trees can be fingerprinted without
+    producing their help or choices.
+    """
+    deferred = getattr(type(obj), attribute, None)
+    if isinstance(deferred, Deferred):
+        name = obj.__dict__.get(deferred.provider_slot)
+        if name is not None:
+            return "provider:" + name
+    return getattr(obj, attribute, None)
+
+
+def has_provider(obj, attribute):
+    """Whether ``obj.<attribute>`` was given a provider, called or not."""
+    deferred = getattr(type(obj), attribute, None)
+    return isinstance(deferred, Deferred) and deferred.provider_slot in obj.__dict__
+
+
+def clean_help(text):
+    return inspect.cleandoc(text) if text else text
+
+
+def pop_provider(kwargs, name):
+    """Remove a callable ``kwargs[name]`` and return it, or return None.
+
+    Click cleans help strings in its constructors, so providers are set
+    only once the object is built.
+    """
+    if callable(kwargs.get(name)):
+        return kwargs.pop(name)
+    return None
+
+
+def deferred_help(obj, attribute="help"):
+    """``obj.help``, or a callable returning it if it has not been produced yet.
+
+    Layout nodes store the callable and call it only if they are rendered.
+    """
+    deferred = getattr(type(obj), attribute, None)
+    if isinstance(deferred, Deferred) and deferred.pending(obj):
+        return lambda: getattr(obj, attribute)
+    return getattr(obj, attribute)
+
+
+class LazyChoice(click.Choice):
+    """A ``click.Choice`` whose choices come from ``provider``.
+
+    ``provider`` is called the first time the choices are needed: when a
+    value, or the option's default, is converted, or when help, completion
+    or export shows them. Signatures of the tree use the provider's name.
+    """
+
+    choices = Deferred(convert=tuple)
+
+    def __init__(self, provider, case_sensitive=True):
+        super().__init__((), case_sensitive)
+        self.choices = provider
+
+
+# Marks an option without a default in click versions that have it.
+UNSET = getattr(click.core, "UNSET", None)
+
+
+class TreeOption(click.Option):
+    """Option whose help and shown default may be produced lazily.
+
+    ``help`` and ``show_default`` may be callables returning the text, and
+    ``type`` may be a ``LazyChoice``. In tree help the option's help is
+    followed by its choices (with ``show_choices``) and its default (with
+    ``show_default``); all of it is produced only when the option is shown.
+    """
+
+    help = Deferred(convert=clean_help)
+    show_default = Deferred()
+
+    def __init__(self, *args, **kwargs):
+        help = pop_provider(kwargs, "help")
+        show_default = pop_provider(kwargs, "show_default")
+        super().__init__(*args, **kwargs)
+        if help is not None:
+            self.help = help
+        if show_default is not None:
+            self.show_default = show_default
+
+    def help_text(self):
+        """The help shown for the option, with its choices and default."""
+        extras = []
+        if self.show_choices and isinstance(self.type, click.Choice):
+            extras.append("choices: " + ", ".join(map(str, self.type.choices)))
+        default = self.default_text()
+        if default:
+            extras.append(f"default: {default}")
+        help = self.help or ""
+        if not extras:
+            return help
+        extra = "[" + "; ".join(extras) + "]"
+        return f"{help} {extra}" if help else extra
+
+    def default_text(self):
+        """The default as shown in help, or None if it is not shown."""
+        show = self.show_default
+        if isinstance(show, str):
+            return show
+        default = self.default
+        if not show or default is None or default is UNSET:
+            return None
+        if callable(default):
+            return "(dynamic)"
+        if isinstance(default, (list, tuple)):
+            return ", ".join(map(str, default))
+        if self.is_bool_flag and not default:
+            return None
+        return str(default)
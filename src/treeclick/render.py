@@ -0,0 +1,384 @@
+from io import StringIO
+from itertools import islice
+
+from rich.console import Console
+from rich.text import Text
+
+from .core import context_path, default_root_name, help_layout
+from .instrument import NULL_RECORDER, record_layout
+from .layout import (
+    DESCRIPTION_LABEL,
+    GROUP_USAGE,
+    GUIDES,
+    INDENT_SIZE,
+    STREAM_BATCH,
+    Header,
+    guide_levels,
+    help_width,
+    select_rows,
+    wrap_text,
+)
+from .widths import cache_info, cell_width
+from .wrapping import divide_line, fit_line
+
+
+def drain(out):
+    """Yield the lines written to ``out`` so far and empty it."""
+    text = out.getvalue()
+    out.seek(0)
+    out.truncate()
+    yield from text.splitlines(keepends=True)
+
+
+def wrap_line(line, width):
+    """Word wrap one line of ``Text`` to ``width`` cells.
+
+    Lines are measured with treeclick's width table rather than rich's, and
+    broken like ``ansi.wrap_runs`` breaks them, so both renderers agree.
+    """
+    text = line.plain
+    if len(text) <= width and cell_width(text) <= width:
+        return [line]
+    lines = []
+    for piece in line.divide(divide_line(text, width)):
+        keep = fit_line(piece.plain, width)
+        if keep < len(piece):
+            piece.right_crop(len(piece) - keep)
+        lines.append(piece)
+    return lines
+
+
+def print_wrapped(console, text, end="\n"):
+    """Print ``text``, markup or ``Text``, wrapped by ``wrap_line``.
+
+    Rich's own wrapping is turned off with ``soft_wrap``.
+    """
+    if isinstance(text, str):
+        text = console.render_str(text)
+    lines = [
+        piece
+        for line in text.split("\n", allow_blank=True)
+        for piece in wrap_line(line, console.width)
+    ]
+    console.print(Text("\n").join(lines), end=end, soft_wrap=True)
+
+
+def iter_rich_help(
+    ctx,
+    is_group,
+    guides="tree",
+    max_width=None,
+    root_name=None,
+    budget=None,
+    recorder=NULL_RECORDER,
+):
+    """Yield help for ``ctx`` line by line, rendering the tree in batches."""
+    out = StringIO()
+    term_width = max_width or ctx.terminal_width or 80
+    with recorder.phase("setup"):
+        term_console = Console(
+            file=out, width=term_width, color_system="auto", force_terminal=True
+        )
+
+    # Get path: names as invoked, since a command may be registered under
+    # other names.
+    path = [ctx.find_root().command.name, *context_path(ctx)]
+
+    # Get root
+    root_ctx = ctx
+    while root_ctx.parent:
+        root_ctx = root_ctx.parent
+    root_command = root_ctx.command
+
+    # Measure every label once, in a single walk from the root
+    if recorder.enabled:
+        before = cache_info()
+    with recorder.phase("layout"):
+        layout = help_layout(root_command, path[1:], budget, recorder)
+    if recorder.enabled:
+        record_layout(recorder, layout, before, cache_info())
+
+    with recorder.phase("header"):
+        print_header(term_console, ctx, is_group, layout, path[1:], budget, recorder)
+    yield from drain(out)
+
+    # Root name
+    if root_name is None:
+        root_name = default_root_name(path[0])
+
+    # Build the tree, a batch of rows at a time
+    rows = select_rows(layout, path[1:])
+    yield from iter_tree_rows(
+        rows, root_name, layout.global_column, term_console, guides, recorder
+    )
+
+    term_console.print()
+    yield from drain(out)
+
+
+def print_header(console, ctx, is_group, layout, path, budget, recorder=NULL_RECORDER):
+    """Print the usage, description, options and "Commands:" heading."""
+    header = Header(ctx, is_group, layout, path, budget, console.width, recorder)
+
+    # Usage
+    if header.arguments is None:
+        usage_parts = GROUP_USAGE
+    else:
+        args_part = " ".join(
+            f"[[orange1]{name}[/orange1]]" for name in header.arguments
+        )
+        usage_parts = "[OPTIONS]" + (f" {args_part}" if args_part else "")
+    print_wrapped(
+        console,
+        f"\n[bold]Usage:[/bold] {ctx.command_path} {Text.from_markup(usage_parts)}\n",
+    )
+
+    # Description
+    print_wrapped(
+        console, Text.assemble((DESCRIPTION_LABEL.rstrip(), "bold"), " "), end=""
+    )
+    if header.description:
+        print_wrapped(console, Text(header.description[0], style="bold"))
+        indent = " " * header.description_indent
+        for line in header.description[1:]:
+            print_wrapped(console, Text(indent + line, style="bold"))
+    else:
+        console.print()
+
+    # Current options
+    if header.options:
+        print_wrapped(console, "[bold]Options:[/bold]")
+        for option in header.options:
+            option_label = (
+                option_text(option.node)
+                + Text(" " * option.pad)
+                + star_text(option.node)
+            )
+            if option.lines:
+                option_label.append(option.lines[0], style="italic yellow")
+                for line in option.lines[1:]:
+                    option_label.append("\n")
+                    option_label.append(" " * option.indent)
+                    option_label.append(line, style="italic yellow")
+            print_wrapped(console, option_label)
+        console.print()
+
+    # Commands
+    print_wrapped(console, "[bold]Commands:[/bold]")
+
+
+def iter_tree_rows(
+    rows, root_name, global_column, console, guides="tree", recorder=NULL_RECORDER
+):
+    """Print ``rows`` to ``console`` in batches, yielding each batch's lines."""
+    rows = guide_levels(rows)
+    while True:
+        batch = list(islice(rows, STREAM_BATCH))
+        if not batch:
+            break
+        recorder.count("rows", len(batch))
+        tree = Text()
+        with recorder.phase("labels"):
+            add_to_tree(
+                tree, batch, root_name, global_column, console, guides, recorder
+            )
+        with recorder.phase("render"):
+            console.print(tree, end="", soft_wrap=True)
+        yield from drain(console.file)
+
+
+def iter_rich_search(
+    query, layout, rows, shown, total, width, root_name, guides="tree"
+):
+    """Yield ``shown`` of the ``total`` matches for ``query`` as a pruned tree."""
+    out = StringIO()
+    console = Console(file=out, width=width, color_system="auto", force_terminal=True)
+    console.print()
+    if not total:
+        print_wrapped(
+            console, Text.assemble("No commands match ", (query, "bold"), ".")
+        )
+        console.print()
+        yield from drain(out)
+        return
+    print_wrapped(
+        console,
+        Text.assemble(
+            ("Search:", "bold"),
+            f" {total} match{'' if total == 1 else 'es'} for ",
+            (query, "bold"),
+            f" (showing {shown})" if shown < total else "",
+        ),
+    )
+    console.print()
+    yield from drain(out)
+    yield from iter_tree_rows(rows, root_name, layout.global_column, console, guides)
+    console.print()
+    yield from drain(out)
+
+
+def command_text(node):
+    """Styled label for a command node: its name and arguments."""
+    text = Text.assemble((node.name, "bold green" if node.kind == "group" else "cyan"))
+    text.append(" ")
+    for index, arg in enumerate(node.args):
+        if index:
+            text.append(" ")
+        text.append("[")
+        text.append(arg, style="orange1")
+        text.append("]")
+    return text
+
+
+def option_text(node):
+    """Styled label for an option node: its flags."""
+    return Text.assemble((node.label, "bold yellow"))
+
+
+def star_text(option):
+    """Required marker plus the space that separates it from the help."""
+    if option.required:
+        return Text.assemble(("*", "red"), " ")
+    return Text(" ")
+
+
+def command_label(
+    left_text,
+    left_len,
+    level,
+    help,
+    global_column,
+    console,
+    style,
+    recorder=NULL_RECORDER,
+):
+    """Label for a command row; ``style`` is "current", "dim" or None."""
+    pad = global_column - level * INDENT_SIZE - left_len
+    help_start_relative = left_len + pad
+    help_start_absolute = level * INDENT_SIZE + help_start_relative
+    available_width = help_width(console.width, help_start_absolute)
+    lines = wrap_text(help or "", available_width, recorder)
+    # Labels are built by appending plain strings with a style, and the
+    # fresh ``left_text`` is dimmed in place, so no intermediate Text
+    # objects are created per row.
+    label = Text()
+    if style == "dim":
+        left_text.stylize("dim")
+        label.append_text(left_text)
+        label.append(" " * pad)
+        if lines:
+            label.append(lines[0], style="dim")
+            for line in lines[1:]:
+                label.append("\n")
+                label.append(" " * help_start_relative, style="dim")
+                label.append(line, style="dim")
+    else:
+        help_style = "bold" if style == "current" else None
+        label.append_text(left_text)
+        label.append(" " * pad)
+        if lines:
+            label.append(lines[0], style=help_style)
+            for line in lines[1:]:
+                label.append("\n")
+                label.append(" " * help_start_relative)
+                label.append(line, style=help_style)
+    return label
+
+
+def add_option_branch(
+    option, global_column, console, dim=False, recorder=NULL_RECORDER
+):
+    """Build the label of an option branch."""
+    left_text = option_text(option)
+    left_len = option.width
+    pad = global_column + 4 - option.depth * INDENT_SIZE - left_len
+    star_space_text = star_text(option)
+    star_space_len = cell_width(star_space_text.plain)
+    label_start = option.depth * INDENT_SIZE
+    help_start_relative = left_len + pad + star_space_len
+    help_start_absolute = label_start + help_start_relative
+    available_width = help_width(console.width, help_start_absolute)
+    lines = wrap_text(option.help, available_width, recorder)
+    option_label = left_text
+    if dim:
+        option_label.stylize("dim")
+        option_label.append(" " * pad, style="dim")
+        star_space_text.stylize("dim")
+        option_label.append_text(star_space_text)
+        if lines:
+            start = len(option_label)
+            option_label.append(lines[0], style="italic yellow")
+            option_label.stylize("dim", start)
+            for line in lines[1:]:
+                option_label.append("\n")
+                option_label.append(" " * help_start_relative, style="dim")
+                start = len(option_label)
+                option_label.append(line, style="italic yellow")
+                option_label.stylize("dim", start)
+    else:
+        option_label.append(" " * pad)
+        option_label.append_text(star_space_text)
+        if lines:
+            option_label.append(lines[0], style="italic yellow")
+            for line in lines[1:]:
+                option_label.append("\n")
+                option_label.append(" " * help_start_relative)
+                option_label.append(line, style="italic yellow")
+    return option_label
+
+
+def add_to_tree(
+    tree,
+    rows,
+    root_name,
+    global_column,
+    console,
+    guides="tree",
+    recorder=NULL_RECORDER,
+):
+    """Append rows from ``guide_levels``, with their guides, to the ``tree`` text."""
+    guide_chars = GUIDES[guides]
+    for node, style, levels in rows:
+        if node.depth == 0:
+            label = command_label(
+                Text.assemble((root_name, "bold green")),
+                cell_width(root_name),
+                0,
+                node.help,
+                global_column,
+                console,
+                style,
+                recorder,
+            )
+        elif node.kind == "notice":
+            label = Text(node.help, style="red")
+        elif node.kind == "summary":
+            label = Text(node.label, style="dim")
+        elif node.kind == "option":
+            label = add_option_branch(
+                node, global_column, console, style == "dim", recorder
+            )
+        else:
+            label = command_label(
+                command_text(node),
+                node.width,
+                node.depth,
+                node.help,
+                global_column,
+                console,
+                style,
+                recorder,
+            )
+        guide_width = node.depth * INDENT_SIZE
+        prefix = levels[0]
+        for line in label.split("\n"):
+            if cell_width(line.plain) > console.width - guide_width > 0:
+                wrapped = wrap_line(line, console.width - guide_width)
+            else:
+                wrapped = [line]
+            for piece in wrapped:
+                for level in prefix:
+                    tree.append(guide_chars[level], style="dim")
+                tree.append_text(piece)
+                tree.append("\n")
+                prefix = levels[1]
@@ -0,0 +1,231 @@
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+import click
+
+from .catalog import lookup_search_data
+from .core import TreeGroup, default_root_name, guide_style, resolve_renderer
+from .layout import (
+    Layout,
+    LayoutNode,
+    command_node,
+    measure_nodes,
+    option_nodes,
+    sorted_children,
+)
+
+# Most matches shown as a tree; the rest are only counted.
+SEARCH_LIMIT = 25
+
+# Score of a token by the field it was found in; prefix matches score half.
+NAME_WEIGHT = 8
+ARGUMENT_WEIGHT = 4
+OPTION_WEIGHT = 4
+HELP_WEIGHT = 1
+
+WORD_RE = re.compile(r"\w+(?:[-_]\w+)*")
+PART_RE = re.compile(r"[-_]")
+TOKEN_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def tokenize(text):
+    """Return the lowercase search tokens of ``text`` as a frozenset.
+
+    Hyphenated and underscored words count as a whole and as their parts,
+    so ``--set-role`` is found by "set-role", "set" and "role". Help
+    strings repeat across large trees, so results are memoized.
+    """
+    tokens = set()
+    for word in WORD_RE.findall(text.lower()):
+        tokens.add(word)
+        tokens.update(part for part in PART_RE.split(word) if part)
+    return frozenset(tokens)
+
+
+class SearchIndex:
+    """Inverted index from tokens to the commands of a tree.
+
+    Command names, argument names, option flags and help strings are
+    indexed in one walk. ``postings`` maps each token to the best weight it
+    has per command, and ``tokens`` keeps them sorted for prefix lookups.
+    An index can be stored with ``to_data`` and loaded with ``from_data``;
+    help catalogs carry one (see ``treeclick.catalog``).
+    """
+
+    def __init__(self, root):
+        self.paths = []
+        self.postings = {}
+        self._add(root)
+        self.tokens = sorted(self.postings)
+
+    @classmethod
+    def from_data(cls, data):
+        """Return the index stored by ``to_data``."""
+        index = cls.__new__(cls)
+        index.paths = [tuple(path) for path in data["paths"]]
+        index.postings = {
+            token: dict(postings) for token, postings in data["postings"].items()
+        }
+        index.tokens = sorted(index.postings)
+        return index
+
+    def to_data(self):
+        """Return the index as JSON-compatible data."""
+        return {
+            "paths": self.paths,
+            "postings": {
+                token: list(postings.items())
+                for token, postings in self.postings.items()
+            },
+        }
+
+    def _add(self, root):
+        # Commands are indexed depth first in name order.
+        stack = [(root, (), frozenset())]
+        while stack:
+            cmd, path, ancestors = stack.pop()
+            entry = len(self.paths)
+            self.paths.append(path)
+            fields = [(path[-1] if path else "", NAME_WEIGHT), (cmd.help, HELP_WEIGHT)]
+            for param in cmd.params:
+                if isinstance(param, click.Argument):
+                    fields.append((param.name, ARGUMENT_WEIGHT))
+                elif isinstance(param, click.Option) and param.name != "help":
+                    fields.extend((opt, OPTION_WEIGHT) for opt in param.opts)
+                    fields.append((param.help, HELP_WEIGHT))
+            for text, weight in fields:
+                for token in tokenize(text or ""):
+                    postings = self.postings.setdefault(token, {})
+                    if postings.get(entry, 0) < weight:
+                        postings[entry] = weight
+            # A command below itself is indexed once more, but not its subtree.
+            if isinstance(cmd, click.Group) and id(cmd) not in ancestors:
+                below = ancestors | {id(cmd)}
+                children = [
+                    (child, path + (name,), below)
+                    for name, child in sorted_children(cmd)
+                ]
+                stack.extend(reversed(children))
+
+    def _term_scores(self, term):
+        scores = {}
+        index = bisect_left(self.tokens, term)
+        while index < len(self.tokens) and self.tokens[index].startswith(term):
+            token = self.tokens[index]
+            factor = 1 if token == term else 0.5
+            for entry, weight in self.postings[token].items():
+                if weight * factor > scores.get(entry, 0):
+                    scores[entry] = weight * factor
+            index += 1
+        return scores
+
+    def search(self, query):
+        """Return ``(path, score)`` for commands matching every query token.
+
+        Results are ranked by score, then shallower and alphabetical first.
+        """
+        scores = None
+        for term in sorted(tokenize(query)):
+            term_scores = self._term_scores(term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    entry: score + term_scores[entry]
+                    for entry, score in scores.items()
+                    if entry in term_scores
+                }
+            if not scores:
+                return []
+        if scores is None:
+            return []
+        ranked = sorted(
+            scores, key=lambda e: (-scores[e], len(self.paths[e]), self.paths[e])
+        )
+        return [(self.paths[entry], scores[entry]) for entry in ranked]
+
+
+def search_index(root):
+    """Return the search index of ``root``, rebuilding it if the tree changed.
+
+    The index is loaded from the root's help catalog when the catalog
+    matches the tree, and built by walking the tree otherwise.
+    """
+    cached = getattr(root, "_search_index", None)
+    if cached is None or cached[0] != TreeGroup.structure_version:
+        data = lookup_search_data(root)
+        index = SearchIndex(root) if data is None else SearchIndex.from_data(data)
+        cached = (TreeGroup.structure_version, index)
+        root._search_index = cached
+    return cached[1]
+
+
+def compile_search_layout(root_command, paths):
+    """Build a layout with only ``paths``, their ancestors and their options.
+
+    Returns the layout and the set of nodes of the matched paths.
+    """
+    root = LayoutNode(
+        "group", root_command.name, 0, root_command.name, root_command.help
+    )
+    nodes = [root]
+    matched = set()
+    for path in paths:
+        node, cmd = root, root_command
+        for name in path:
+            cmd = cmd.commands[name]
+            child = node.find(name)
+            if child is None:
+                child = command_node(name, cmd, node.depth + 1)
+                node.commands.append(child)
+                nodes.append(child)
+            node = child
+        node.options = option_nodes(cmd, node.depth + 1)
+        nodes.extend(node.options)
+        matched.add(node)
+    for node in nodes:
+        if node.kind != "option":
+            node.commands.sort(key=lambda child: child.name)
+    measure_nodes(nodes)
+    return Layout(root, nodes), matched
+
+
+def search_rows(layout, matched):
+    """Yield the rows of a search layout, dimming the ancestor context."""
+    root = layout.root
+    yield root, "current" if root in matched else "dim", True
+    yield from _search_subtree(root, matched)
+
+
+def _search_subtree(node, matched):
+    count = len(node.options) + len(node.commands)
+    for index, option in enumerate(node.options):
+        yield option, None, index == count - 1
+    for index, child in enumerate(node.commands, len(node.options)):
+        yield child, "current" if child in matched else "dim", index == count - 1
+        yield from _search_subtree(child, matched)
+
+
+def iter_search_help(ctx, query, limit=SEARCH_LIMIT, root_name=None):
+    """Yield the search results for ``query`` in the tree of ``ctx``."""
+    root = ctx.find_root().command
+    if resolve_renderer(root.renderer) == "ansi":
+        from .ansi import iter_ansi_search as iter_search
+    else:
+        from .render import iter_rich_search as iter_search
+
+    matches = search_index(root).search(query)
+    layout, matched = compile_search_layout(root, [path for path, _ in matches[:limit]])
+    width = root.max_width or ctx.terminal_width or 80
+    return iter_search(
+        query,
+        layout,
+        search_rows(layout, matched),
+        len(matched),
+        len(matches),
+        width,
+        root_name or default_root_name(root.name),
+        guide_style(root.use_tree, root.guides),
+    )
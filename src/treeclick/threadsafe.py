@@ -0,0 +1,85 @@
+"""Help rendering that is safe to use from many threads at once.
+
+``HelpRenderer`` fixes every setting when it is created and reads nothing
+from ``sys.argv``, ``ctx.obj`` or the terminal, so any thread can render
+help for any command of the tree::
+
+    renderer = HelpRenderer(cli, root_name="mycli")
+    text = renderer.render(["deploy"], width=100)
+    text = await renderer.render_async(["deploy"], width=100)
+
+Each call builds its own click contexts and output buffer. The layouts are
+compiled once per path and shared by all threads (see
+``core.help_layout``); renderers only read them. Help text providers (see
+``treeclick.providers``) are called once, under a lock.
+"""
+
+import asyncio
+import copy
+import functools
+
+import click
+
+from .core import (
+    guide_style,
+    help_budget,
+    help_layout,
+    iter_tree_help,
+    make_help_context,
+)
+
+
+class HelpRenderer:
+    """Renders help for the commands of ``root`` from any thread.
+
+    ``root_name`` is the name shown for the root command (by default its
+    ``name``), ``guides`` the tree guide style (by default from the root's
+    ``use_tree`` and ``guides``) and ``renderer`` the help backend, "ansi"
+    or "rich". The budget is read from ``root`` as for ``--help``, once,
+    when the renderer is created.
+    """
+
+    def __init__(self, root, root_name=None, guides=None, renderer="ansi"):
+        if renderer not in ("ansi", "rich"):
+            raise ValueError(f"Unknown renderer {renderer!r}")
+        self.root = root
+        self.root_name = root_name or root.name
+        self.guides = guides or guide_style(
+            getattr(root, "use_tree", True), getattr(root, "guides", None)
+        )
+        self.renderer = renderer
+        self.budget = help_budget(root)
+
+    def _budget(self):
+        # A time budget's deadline is set per render, so each call gets its own.
+        return copy.copy(self.budget)
+
+    def layout(self, path=()):
+        """The shared layout of the help for ``path``."""
+        return help_layout(self.root, path, self._budget())
+
+    def iter_render(self, path=(), width=80):
+        """Yield the help of the command at ``path`` line by line.
+
+        Raises ``click.UsageError`` if ``path`` names no command.
+        """
+        ctx = make_help_context(self.root, path, self.root_name, width)
+        return iter_tree_help(
+            ctx,
+            isinstance(ctx.command, click.Group),
+            max_width=width,
+            root_name=self.root_name,
+            guides=self.guides,
+            budget=self._budget(),
+            renderer=self.renderer,
+        )
+
+    def render(self, path=(), width=80):
+        """The help of the command at ``path``, rendered ``width`` cells wide."""
+        return "".join(self.iter_render(path, width))
+
+    async def render_async(self, path=(), width=80, executor=None):
+        """Render in ``executor`` (by default the loop's) and await the help."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self.render, tuple(path), width)
+        return await loop.run_in_executor(executor, call)
@@ -0,0 +1,46 @@
+import unicodedata
+from functools import lru_cache
+
+CACHE_SIZE = 8192
+
+
+def char_width(char):
+    """Return the number of terminal cells a single character occupies."""
+    if unicodedata.combining(char):
+        return 0
+    if unicodedata.category(char) in ("Cc", "Cf", "Me", "Mn"):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ("F", "W") else 1
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _unicode_cell_width(text):
+    return sum(char_width(char) for char in text)
+
+
+def cell_width(text):
+    """Return the number of terminal cells ``text`` occupies.
+
+    Pure-ASCII text is one cell per character; anything else is measured
+    per character and memoized in a bounded LRU cache.
+    """
+    if text.isascii():
+        return len(text)
+    return _unicode_cell_width(text)
+
+
+def cell_widths(texts):
+    """Measure a batch of labels, measuring each distinct string once."""
+    seen = {}
+    widths = []
+    for text in texts:
+        width = seen.get(text)
+        if width is None:
+            width = seen[text] = cell_width(text)
+        widths.append(width)
+    return widths
+
+
+def cache_info():
+    """Statistics of the cache used for non-ASCII text."""
+    return _unicode_cell_width.cache_info()
@@ -0,0 +1,157 @@
+import re
+import textwrap
+from functools import lru_cache
+
+from .widths import cell_width, char_width
+
+WRAP_CACHE_SIZE = 32768
+
+# Whitespace textwrap replaces by spaces; text without it can take the
+# single-line fast path.
+SPECIAL_SPACE_RE = re.compile(r"[\t\n\x0b\x0c\r]")
+WORD_RE = re.compile(r"\s*\S+\s*")
+TRAILING_SPACE_RE = re.compile(r"\s+$")
+
+
+def fit_cells(text, cells):
+    """Number of leading characters of ``text`` that fit in ``cells``."""
+    size = 0
+    for index, char in enumerate(text):
+        size += char_width(char)
+        if size > cells:
+            return index
+    return len(text)
+
+
+class CellWrapper(textwrap.TextWrapper):
+    """TextWrapper that measures chunks in terminal cells, not characters.
+
+    Wide CJK and emoji characters count as two cells and combining marks as
+    none; line breaking otherwise follows ``textwrap`` exactly.
+    """
+
+    def _handle_long_word(self, reversed_chunks, cur_line, cur_len, width):
+        space_left = 1 if width < 1 else width - cur_len
+        chunk = reversed_chunks[-1]
+        end = fit_cells(chunk, space_left)
+        if not end and not cur_line:
+            # A wide character on a line narrower than two cells.
+            end = 1
+        if self.break_on_hyphens and end < len(chunk):
+            hyphen = chunk.rfind("-", 0, end)
+            if hyphen > 0 and any(char != "-" for char in chunk[:hyphen]):
+                end = hyphen + 1
+        cur_line.append(chunk[:end])
+        reversed_chunks[-1] = chunk[end:]
+
+    def _wrap_chunks(self, chunks):
+        lines = []
+        chunks.reverse()
+        while chunks:
+            cur_line = []
+            cur_len = 0
+            if chunks[-1].strip() == "" and lines:
+                del chunks[-1]
+            while chunks:
+                length = cell_width(chunks[-1])
+                if cur_len + length > self.width:
+                    break
+                cur_line.append(chunks.pop())
+                cur_len += length
+            if chunks and cell_width(chunks[-1]) > self.width:
+                self._handle_long_word(chunks, cur_line, cur_len, self.width)
+            if cur_line and cur_line[-1].strip() == "":
+                del cur_line[-1]
+            if cur_line:
+                lines.append("".join(cur_line))
+        return lines
+
+
+@lru_cache(maxsize=WRAP_CACHE_SIZE)
+def wrap(text, width):
+    """Wrap ``text`` into a tuple of lines of at most ``width`` cells.
+
+    ASCII text that fits on one line is returned without running the
+    wrapper, other ASCII text is wrapped by ``textwrap`` and anything else
+    by ``CellWrapper``. Results are memoized in a bounded LRU cache.
+    """
+    if text.isascii():
+        if len(text) <= width and not SPECIAL_SPACE_RE.search(text):
+            line = text.rstrip()
+            return (line,) if line else ()
+        return tuple(textwrap.wrap(text, width=width))
+    return tuple(CellWrapper(width=width).wrap(text))
+
+
+def chop_cells(text, width):
+    """Split ``text`` into pieces of at most ``width`` cells."""
+    if text.isascii():
+        return [text[index : index + width] for index in range(0, len(text), width)]
+    pieces, start, size = [], 0, 0
+    for index, char in enumerate(text):
+        char_size = char_width(char)
+        if size + char_size > width:
+            pieces.append(text[start:index])
+            start, size = index, 0
+        size += char_size
+    if size:
+        pieces.append(text[start:])
+    return pieces
+
+
+def divide_line(text, width):
+    """Return the offsets at which ``text`` is broken to fit ``width`` cells.
+
+    Words move to the next line when they do not fit, and words longer than
+    a line are folded, like rich's word wrapping.
+    """
+    breaks = []
+    offset = 0
+    for match in WORD_RE.finditer(text):
+        start, word = match.start(), match.group(0)
+        word_length = cell_width(word.rstrip())
+        if width - offset >= word_length:
+            offset += cell_width(word)
+        elif word_length > width:
+            pieces = chop_cells(word, width)
+            for index, piece in enumerate(pieces):
+                if start:
+                    breaks.append(start)
+                if index == len(pieces) - 1:
+                    offset = cell_width(piece)
+                else:
+                    start += len(piece)
+        elif offset and start:
+            breaks.append(start)
+            offset = cell_width(word)
+    return breaks
+
+
+def fit_line(text, width):
+    """Number of leading characters of a divided line kept at ``width`` cells.
+
+    Trailing space beyond the width is dropped and a line that is still too
+    wide is cropped, like rich's word wrapping does.
+    """
+    length = len(text)
+    if length > width:
+        trailing = TRAILING_SPACE_RE.search(text)
+        if trailing is not None:
+            length -= min(len(trailing[0]), length - width)
+    if cell_width(text[:length]) > width:
+        length = len(chop_cells(text[:length], width)[0]) if width > 0 else 0
+    return length
+
+
+def wrap_batch(texts, widths):
+    """Wrap every distinct text for every width in one pass, filling the cache.
+
+    Returns a dict mapping ``(text, width)`` to its lines.
+    """
+    distinct = dict.fromkeys(text for text in texts if text)
+    return {(text, width): wrap(text, width) for width in widths for text in distinct}
+
+
+def cache_info():
+    """Statistics of the wrap cache."""
+    return wrap.cache_info()
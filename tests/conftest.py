@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+# The synthetic trees of the benchmarks are used by the tests too.
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+
+@pytest.fixture
+def stderr_runner():
+    """CliRunner whose results have ``stderr`` apart on every click version."""
+    try:
+        return CliRunner(mix_stderr=False)
+    except TypeError:
+        # Click 8.2 removed ``mix_stderr`` and always keeps stderr apart.
+        return CliRunner()
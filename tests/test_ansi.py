@@ -0,0 +1,143 @@
+import importlib.util
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+import pytest
+from synthetic import synthetic_tree
+
+from treeclick import TreeGroup
+from treeclick.ansi import Painter, detect_palette
+from treeclick.catalog import iter_command_paths
+from treeclick.core import format_tree_help, make_help_context, resolve_renderer
+from treeclick.widths import cell_width
+
+DEMO = Path(__file__).parent.parent / "examples" / "demo.py"
+
+SCRIPT = """
+import sys
+from click.testing import CliRunner
+from treeclick import TreeCommand, TreeGroup
+
+cli = TreeGroup(name="test", help="Test CLI")
+cli.add_command(TreeCommand(name="echo", help="Echo it."))
+result = CliRunner().invoke(cli, ["--help"], color=True)
+assert "echo" in result.output and "\\x1b[" in result.output
+print(sorted(m for m in sys.modules if m == "rich" or m.startswith("rich.")))
+"""
+
+
+def _strip(text):
+    return re.sub(r"\x1b\[[0-9;]*m", "", text)
+
+
+def _demo():
+    spec = importlib.util.spec_from_file_location("ansi_demo", DEMO)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.cli
+
+
+@pytest.mark.parametrize("guides", ["tree", "indent", "ascii"])
+@pytest.mark.parametrize("width", [120, 40])
+def test_same_layout_as_rich(guides, width, monkeypatch):
+    """Test that the ANSI backend lays help out exactly like rich."""
+    monkeypatch.setenv("TERM", "xterm-256color")
+    for root in (_demo(), synthetic_tree(depth=3, fanout=2, help_words=20)):
+        for path in iter_command_paths(root):
+            outputs = []
+            for renderer in ("rich", "ansi"):
+                ctx = make_help_context(root, path, terminal_width=width)
+                outputs.append(
+                    format_tree_help(
+                        ctx,
+                        is_group=isinstance(ctx.command, TreeGroup),
+                        max_width=width,
+                        guides=guides,
+                        root_name="prog",
+                        renderer=renderer,
+                    )
+                )
+            assert _strip(outputs[0]) == _strip(outputs[1])
+
+
+def test_piped_help_does_not_import_rich():
+    """Test that help rendered with stdout not a terminal never loads rich."""
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.splitlines() == ["[]"]
+
+
+def test_auto_renderer(monkeypatch):
+    """Test that "auto" only picks rich when stdout is a terminal."""
+
+    class Stream:
+        def __init__(self, tty):
+            self.tty = tty
+
+        def isatty(self):
+            return self.tty
+
+    monkeypatch.setattr(sys, "stdout", Stream(True))
+    assert resolve_renderer() == "rich"
+    monkeypatch.setattr(sys, "stdout", Stream(False))
+    assert resolve_renderer() == "ansi"
+    assert resolve_renderer("rich") == "rich"
+
+
+def test_palette():
+    """Test escape sequences for 256-color, 16-color, NO_COLOR and dumb terminals."""
+    runs = [("name", "bold green dim"), ("[", ""), ("ARG", "orange1")]
+    assert Painter(detect_palette({"TERM": "xterm-256color"})).line(runs) == (
+        "\x1b[1;2;32mname\x1b[0m[\x1b[38;5;214mARG\x1b[0m"
+    )
+    assert "\x1b[93mARG" in Painter(detect_palette({"TERM": "xterm"})).line(runs)
+    no_color = Painter(detect_palette({"TERM": "xterm", "NO_COLOR": "1"}))
+    assert no_color.line(runs) == "\x1b[1;2mname\x1b[0m[ARG"
+    assert Painter(detect_palette({"TERM": "dumb"})).line(runs) == "name[ARG"
+
+
+def _mixed_script_tree():
+    root = TreeGroup(name="test", help="Mixed 日本語 scripts ☰ soft­hyphen")
+    texts = [
+        "हिन्दी में मदद का पाठ जो काफ़ी लंबा है ताकि पंक्तियाँ टूटें",
+        "☰☱☲☳☴☵☶☷ trigram help with soft­hyphens in long­words",
+        "日本語のヘルプ文は幅が二倍になる文字でできています",
+        "café naïve é 가 emoji 🎉 mixed with ASCII words",
+    ]
+    for index, text in enumerate(texts):
+        root.add_command(
+            TreeGroup(
+                name=f"cmd{index}",
+                help=text,
+                params=[click.Option([f"--opt{index}"], help=text)],
+            )
+        )
+    return root
+
+
+@pytest.mark.parametrize("width", [80, 44, 30])
+def test_mixed_scripts_same_in_both_renderers(width, monkeypatch):
+    """Test that both renderers measure mixed scripts with the same widths."""
+    monkeypatch.setenv("TERM", "xterm-256color")
+    root = _mixed_script_tree()
+    for path in iter_command_paths(root):
+        outputs = []
+        for renderer in ("rich", "ansi"):
+            ctx = make_help_context(root, path, terminal_width=width)
+            outputs.append(
+                _strip(
+                    format_tree_help(
+                        ctx,
+                        is_group=isinstance(ctx.command, TreeGroup),
+                        max_width=width,
+                        root_name="prog",
+                        renderer=renderer,
+                    )
+                )
+            )
+        assert outputs[0] == outputs[1]
+        assert all(cell_width(line) <= width for line in outputs[0].splitlines())
@@ -0,0 +1,112 @@
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.core import help_layout
+
+
+def _cli(**kwargs):
+    cli = TreeGroup(name="test", help="Batch CLI", batch_mode=True, **kwargs)
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="greet", cls=TreeCommand)
+    @click.argument("name")
+    @click.option("--shout", is_flag=True)
+    def greet(name, shout):
+        """Greet someone."""
+        click.echo(f"Hello {name.upper() if shout else name}")
+
+    @cli.command(name="fail", cls=TreeCommand)
+    @click.option("--code", type=int, default=3)
+    def fail(code):
+        """Exit with CODE."""
+        raise SystemExit(code)
+
+    @cli.command(name="crash", cls=TreeCommand)
+    def crash():
+        """Raise an error."""
+        raise RuntimeError("boom")
+
+    return cli
+
+
+def test_batch_runs_every_line(stderr_runner):
+    """Test that batch lines run in order with isolated errors and exit codes."""
+    lines = [
+        "# a comment",
+        "sub greet world",
+        "",
+        "fail --code 4",
+        "crash",
+        "sub greet 'big world' --shout",
+        "sub nope",
+    ]
+    result = stderr_runner.invoke(
+        _cli(), ["--batch", "-"], input="\n".join(lines) + "\n", prog_name="test"
+    )
+    assert result.exit_code == 1
+    assert result.stdout.splitlines() == ["Hello world", "Hello BIG WORLD"]
+    report = result.stderr
+    assert "[line 2] exit 0 in" in report
+    assert "[line 4] exit 4 in" in report
+    assert "RuntimeError: boom" in report and "[line 5] exit 1 in" in report
+    assert "No such command 'nope'" in report and "[line 7] exit 2 in" in report
+    assert "5 commands, 3 failed in" in report and "commands/s)" in report
+
+
+def test_batch_success_exit_code(tmp_path, stderr_runner):
+    """Test that a batch file whose commands all succeed exits with 0."""
+    batch = tmp_path / "commands.txt"
+    batch.write_text("sub greet a\nsub greet b\nsub --help\n")
+    result = stderr_runner.invoke(_cli(), ["--batch", str(batch)], prog_name="test")
+    assert result.exit_code == 0
+    assert result.stdout.startswith("Hello a\nHello b\n")
+    assert "3 commands, 0 failed" in result.stderr
+
+
+def test_shell(stderr_runner):
+    """Test that the shell runs lines until ``exit`` and keeps going on errors."""
+    result = stderr_runner.invoke(
+        _cli(),
+        ["--shell"],
+        input="sub greet you\nfail\n'unbalanced\nsub greet again\nexit\nsub greet never\n",
+        prog_name="test",
+    )
+    assert result.exit_code == 0
+    assert "Hello you" in result.stdout and "Hello again" in result.stdout
+    assert "never" not in result.stdout
+    assert "No closing quotation" in result.stderr
+
+
+def test_help_layouts_are_reused():
+    """Test that help layouts are compiled once until the tree changes."""
+    cli = _cli()
+    layout = help_layout(cli, ("sub",))
+    assert help_layout(cli, ("sub",)) is layout
+    cli.add_command(TreeCommand(name="new"))
+    assert help_layout(cli, ("sub",)) is not layout
+
+
+def test_root_options_skip_taken_flags():
+    """Test that a root option never replaces one of the application's own."""
+    cli = _cli(params=[click.Option(["--shell"], help="Shell to use")])
+
+    @cli.command(name="which", cls=TreeCommand)
+    @click.pass_context
+    def which(ctx):
+        """Print the shell."""
+        click.echo(ctx.parent.params["shell"])
+
+    result = CliRunner().invoke(cli, ["--shell", "zsh", "which"])
+    assert result.exit_code == 0 and result.output == "zsh\n"
+    assert [opt for option in cli.root_options() for opt in option.opts] == [
+        "--batch"
+    ]
+
+
+def test_root_options_in_help():
+    """Test that the root options are listed in the root help's options."""
+    result = CliRunner().invoke(_cli(), ["--help"], prog_name="test")
+    options = result.output.split("Options:")[1].split("Commands:")[0]
+    assert "--batch" in options and "--shell" in options
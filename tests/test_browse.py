@@ -0,0 +1,98 @@
+import click
+from click.testing import CliRunner
+
+from treeclick import LazyTreeGroup, TreeCommand, TreeGroup
+from treeclick.browse import Browser
+
+
+def _cli(help_browse=True):
+    cli = TreeGroup(name="test", help="Browse CLI", help_browse=help_browse)
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="cmd", cls=TreeCommand)
+    @click.argument("path")
+    @click.option("--verbose", "-v", is_flag=True, help="Talk more")
+    def cmd(path, verbose):
+        """Run cmd."""
+
+    @cli.command(name="other", cls=TreeCommand)
+    def other():
+        """Other command."""
+
+    return cli
+
+
+def _rows(browser):
+    return [" ".join(item.path()) for item in browser.rows]
+
+
+def test_expand_and_collapse():
+    """Test that groups start collapsed and expand one level at a time."""
+    browser = Browser(_cli(), "test", palette=None)
+    assert _rows(browser) == ["", "other", "sub"]
+    browser.handle("end")
+    browser.handle("expand")
+    assert _rows(browser) == ["", "other", "sub", "sub cmd"]
+    browser.handle("down")
+    browser.handle("toggle")
+    assert _rows(browser) == ["", "other", "sub", "sub cmd", "sub cmd --verbose, -v"]
+    # Collapsing a row that is not expanded moves to its parent.
+    browser.handle("down")
+    browser.handle("collapse")
+    assert browser.cursor == 3
+    browser.handle("up")
+    browser.handle("collapse")
+    assert _rows(browser) == ["", "other", "sub"]
+    # Expansion state below a collapsed group is kept.
+    browser.handle("expand")
+    assert len(browser.rows) == 5
+
+
+def test_render_window():
+    """Test that only the window around the cursor is rendered, with guides."""
+    browser = Browser(_cli(), "test", palette=None)
+    browser.handle("end")
+    browser.handle("expand")
+    lines = browser.render(60, 3)
+    assert len(lines) == 3
+    assert lines[0].startswith("   ├── other")
+    assert lines[1].startswith("❯▾ └── sub")
+    assert lines[2].startswith("test sub  ")
+    assert browser.rows[0].line is None
+    browser.handle("down")
+    lines = browser.render(60, 3)
+    assert lines[1].startswith("❯▸     └── cmd [PATH]")
+
+
+def test_lazy_commands_are_not_imported():
+    """Test that browsing a lazy tree never imports its commands."""
+    cli = LazyTreeGroup.from_manifest(
+        {
+            "name": "test",
+            "commands": {
+                "tools": {
+                    "commands": {
+                        "run": {
+                            "import_path": "no_such_module_anywhere:run",
+                            "options": [{"opts": ["--fast"], "is_flag": True}],
+                        }
+                    }
+                }
+            },
+        }
+    )
+    browser = Browser(cli, "test", palette=None)
+    for action in ("end", "expand", "down", "expand", "down"):
+        browser.handle(action)
+    browser.render(80, 10)
+    assert _rows(browser)[-1] == "tools run --fast"
+
+
+def test_help_browse_without_terminal():
+    """Test that ``--help-browse`` prints the help when not on a terminal."""
+    result = CliRunner().invoke(_cli(), ["--help-browse"], prog_name="test")
+    assert result.exit_code == 0
+    assert "Description:" in result.output and "cmd" in result.output
+    result = CliRunner().invoke(_cli(help_browse=False), ["--help-browse"])
+    assert result.exit_code == 2
@@ -0,0 +1,108 @@
+import re
+
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.layout import Budget, compile_layout
+
+
+def _cli(groups=3, commands=4, **kwargs):
+    cli = TreeGroup(name="test", help="Budget CLI", **kwargs)
+    for i in range(groups):
+        sub = TreeGroup(name=f"group{i}", help=f"Group {i}")
+        cli.add_command(sub)
+        for j in range(commands):
+
+            @sub.command(name=f"cmd{j}", cls=TreeCommand)
+            @click.option("--first", help="First option")
+            @click.option("--second", help="Second option")
+            def cmd(first, second):
+                pass
+
+    return cli
+
+
+def _help(cli, args=()):
+    result = CliRunner().invoke(cli, [*args, "--help"], prog_name="test")
+    assert result.exit_code == 0
+    return re.sub(r"\x1b\[[0-9;]*m", "", result.output)
+
+
+def test_max_depth_collapses_subtrees():
+    """Test that groups beyond max_depth collapse into a summary line."""
+    output = _help(_cli(max_depth=1))
+    assert "group0" in output
+    assert "cmd0" not in output
+    assert output.count("+ 4 commands, 8 options") == 3
+
+
+def test_max_children_and_options():
+    """Test breadth and option budgets for the current command's subtree."""
+    output = _help(_cli(max_children=2, max_options=1), ["group1"])
+    assert "cmd0" in output and "cmd1" in output and "cmd2" not in output
+    assert "+ 1 option" in output
+    assert "+ 2 commands, 4 options" in output
+
+
+def test_commands_only():
+    """Test that commands-only mode drops option branches from the tree."""
+    output = _help(_cli(commands_only=True), ["group0", "cmd0"])
+    tree = output.split("Commands:")[1]
+    assert "cmd0" in tree
+    assert "--first" not in tree
+    assert "--first" in output.split("Commands:")[0]
+
+
+def test_time_budget_collapses_everything():
+    """Test that an exhausted time budget collapses unexpanded groups."""
+    output = _help(_cli(time_budget=0))
+    assert "group0" not in output
+    assert "+ 15 commands, 24 options" in output
+
+
+def test_budget_work_is_proportional_to_output():
+    """Test that only the shown part of a large tree is compiled."""
+    cli = _cli(groups=100, commands=50)
+    full = compile_layout(cli)
+    shown = compile_layout(cli, (), Budget(max_depth=1))
+    assert len(full.nodes) == 1 + 100 + 100 * 50 * 3
+    assert len(shown.nodes) == 101
+
+
+def test_subtree_counts_are_kept_bottom_up():
+    """Test that groups count the commands and options below them as they grow."""
+    cli = _cli(groups=2, commands=3)
+    assert cli.subtree_counts == (2 + 2 * 3, 2 * 3 * 2)
+    cli.commands["group0"].params.append(click.Option(["--extra"]))
+    cli.add_command(cli.commands["group1"], "again")
+    assert cli.subtree_counts == (3 + 3 * 3, 3 * 3 * 2 + 1)
+    cli.add_command(cli, "loop")
+    assert cli.subtree_counts is None
+
+
+def test_hidden_subtrees_are_not_walked():
+    """Test that collapsed groups are summarized from their counts."""
+    cli = _cli(groups=100, commands=50, max_depth=1)
+    walked = []
+    for group in cli.commands.values():
+        group.commands = _Watched(group.commands, walked)
+    output = _help(cli)
+    assert output.count("+ 50 commands, 100 options") == 100
+    assert walked == []
+
+
+class _Watched(dict):
+    """Mapping that records iteration over its values."""
+
+    def __init__(self, commands, walked):
+        super().__init__(commands)
+        self.walked = walked
+
+    def values(self):
+        self.walked.append(self)
+        return super().values()
+
+    def items(self):
+        self.walked.append(self)
+        return super().items()
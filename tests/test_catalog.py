@@ -0,0 +1,161 @@
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup, TreeOption, catalog, core
+from treeclick.__main__ import main
+from treeclick.catalog import build_catalog, tree_fingerprint
+
+MODULE = '''
+import click
+from treeclick import TreeCommand, TreeGroup
+
+cli = TreeGroup(name="test", help="Catalog CLI")
+sub = TreeGroup(name="sub", help="Sub group")
+cli.add_command(sub)
+
+@sub.command(name="cmd", cls=TreeCommand)
+@click.option("--opt", "-o", help="An option")
+def cmd(opt):
+    """Run cmd."""
+'''
+
+
+def _cli():
+    cli = TreeGroup(name="test", help="Catalog CLI", max_width=80)
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="cmd", cls=TreeCommand)
+    @click.option("--opt", "-o", help="An option")
+    def cmd(opt):
+        """Run cmd."""
+
+    return cli
+
+
+def test_catalog_matches_live_help(tmp_path, monkeypatch):
+    """Test that help served from the catalog equals live rendering."""
+    monkeypatch.setattr(sys, "argv", ["test"])
+    cli = _cli()
+    # Catalogs hold help rendered by rich.
+    cli.renderer = "rich"
+    runner = CliRunner()
+    live = runner.invoke(cli, ["sub", "cmd", "--help"], color=True, prog_name="test")
+
+    filename = str(tmp_path / "help.catalog")
+    assert build_catalog(cli, filename, prog_name="test") == 6
+    cli.catalog = filename
+
+    def fail(*args, **kwargs):
+        raise AssertionError("live rendering used")
+
+    monkeypatch.setattr(core, "iter_tree_help", fail)
+    cached = runner.invoke(cli, ["sub", "cmd", "--help"], color=True, prog_name="test")
+    assert cached.exit_code == 0
+    assert cached.output == live.output
+
+
+def test_stale_catalog_falls_back(tmp_path, monkeypatch):
+    """Test that a catalog is ignored once the tree has changed."""
+    monkeypatch.setattr(sys, "argv", ["test"])
+    cli = _cli()
+    filename = str(tmp_path / "help.catalog")
+    build_catalog(cli, filename, prog_name="test")
+    cli.catalog = filename
+
+    @cli.command(name="new", cls=TreeCommand)
+    def new():
+        """Added after the build."""
+
+    result = CliRunner().invoke(cli, ["--help"], color=True, prog_name="test")
+    assert result.exit_code == 0
+    assert "Added after the build." in result.output
+
+
+def test_changed_default_bypasses_catalog(tmp_path, monkeypatch):
+    """Test that a catalog is not served once a shown default changed."""
+    monkeypatch.setattr(sys, "argv", ["test"])
+
+    def tree(region):
+        cli = TreeGroup(name="test", help="Catalog CLI", max_width=80)
+
+        @cli.command(name="deploy", cls=TreeCommand)
+        @click.option("--region", cls=TreeOption, default=region, show_default=True)
+        def deploy(region):
+            """Deploy."""
+
+        return cli
+
+    filename = str(tmp_path / "help.catalog")
+    build_catalog(tree("us-east-1"), filename, prog_name="test")
+    for region in ("us-east-1", "eu-west-1"):
+        cli = tree(region)
+        cli.catalog = filename
+        result = CliRunner().invoke(cli, ["deploy", "--help"], prog_name="test")
+        assert f"[default: {region}]" in result.output
+
+
+def test_fingerprint_cached_until_tree_changes(monkeypatch):
+    """Test that lookups reuse the fingerprint until commands or options change."""
+    cli = _cli()
+    fingerprint = tree_fingerprint(cli)
+
+    def fail(group):
+        raise AssertionError("tree walked again")
+
+    monkeypatch.setattr(catalog, "sorted_children", fail)
+    assert tree_fingerprint(cli) == fingerprint
+    monkeypatch.undo()
+    click.option("--late")(cli.commands["sub"].commands["cmd"])
+    assert tree_fingerprint(cli) != fingerprint
+
+
+def test_fingerprint_covers_shown_choices_and_defaults():
+    """Test that choices and defaults shown in option help change the hash."""
+
+    def tree(choices, default):
+        cli = TreeGroup(name="test")
+
+        @cli.command(name="deploy", cls=TreeCommand)
+        @click.option(
+            "--region",
+            cls=TreeOption,
+            type=click.Choice(choices),
+            default=default,
+            show_default=True,
+        )
+        def deploy(region):
+            """Deploy."""
+
+        return cli
+
+    fingerprint = tree_fingerprint(tree(["a", "b"], "a"))
+    assert tree_fingerprint(tree(["a", "b"], "a")) == fingerprint
+    assert tree_fingerprint(tree(["a", "b", "c"], "a")) != fingerprint
+    assert tree_fingerprint(tree(["a", "b"], "b")) != fingerprint
+
+
+def test_no_catalog_for_providers(tmp_path):
+    """Test that trees with help providers are never served from a catalog."""
+    cli = _cli()
+    cli.add_command(TreeCommand(name="lazy", help=lambda: "Lazy help"))
+    assert tree_fingerprint(cli) is None
+    with pytest.raises(ValueError, match="providers"):
+        build_catalog(cli, str(tmp_path / "help.catalog"))
+
+
+def test_build_catalog_command(tmp_path, monkeypatch):
+    """Test the build-catalog entry point with a process pool."""
+    (tmp_path / "catalog_cli_mod.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    filename = str(tmp_path / "help.catalog")
+    result = CliRunner().invoke(
+        main,
+        ["build-catalog", "catalog_cli_mod:cli", "-o", filename, "-w", "80"]
+        + ["-w", "100", "-p", "2"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Wrote 12 help entries" in result.output
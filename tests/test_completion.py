@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.complete import complete, load_index
+from treeclick.completion import (
+    COMPLETER,
+    completion_script,
+    tree_signature,
+    write_completion_index,
+)
+
+
+def _cli(**kwargs):
+    cli = TreeGroup(name="test", help="Completion CLI", help_json=True, **kwargs)
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="cmd", cls=TreeCommand)
+    @click.argument("target", type=click.Choice(["alpha", "beta"]))
+    @click.option("--mode", type=click.Choice(["fast", "slow"]))
+    @click.option("--verbose/--quiet", "-v")
+    def cmd(target, mode, verbose):
+        """Run cmd."""
+
+    @cli.command(name="secret", cls=TreeCommand, hidden=True)
+    def secret():
+        """Hidden."""
+
+    return cli
+
+
+def test_complete_from_index(tmp_path):
+    """Test command, option, option value and argument choice completion."""
+    index = tmp_path / "cli.index"
+    assert write_completion_index(_cli(), str(index))
+    tree = load_index(index)
+    assert complete(tree, [], "") == ["sub"]
+    assert complete(tree, [], "--help-j") == ["--help-json", "--help-jsonl"]
+    assert complete(tree, ["sub"], "c") == ["cmd"]
+    assert complete(tree, ["sub", "cmd"], "--") == [
+        "--help",
+        "--mode",
+        "--quiet",
+        "--verbose",
+    ]
+    assert complete(tree, ["sub", "cmd", "--mode"], "f") == ["fast"]
+    assert complete(tree, ["sub", "cmd"], "--mode=s") == ["--mode=slow"]
+    assert complete(tree, ["sub", "cmd", "--mode", "fast"], "") == ["alpha", "beta"]
+    assert complete(tree, ["sub", "cmd", "-v", "alpha"], "") == []
+
+
+def test_completer_does_not_import_cli(tmp_path):
+    """Test the standalone completer answers without importing click."""
+    index = tmp_path / "cli.index"
+    write_completion_index(_cli(), str(index))
+    code = (
+        "import runpy, sys; sys.argv = ['complete.py', sys.argv[1]]\n"
+        f"try:\n    runpy.run_path({COMPLETER!r}, run_name='__main__')\n"
+        "except SystemExit:\n    pass\n"
+        "print('click' in sys.modules, 'treeclick' in sys.modules)"
+    )
+    env = dict(os.environ, COMP_WORDS="test sub cmd --mode ", COMP_CWORD="4")
+    result = subprocess.run(
+        [sys.executable, "-c", code, str(index)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    assert result.stdout.splitlines() == ["fast", "slow", "False False"]
+
+
+def test_index_regenerated_on_change(tmp_path, monkeypatch):
+    """Test ``main`` writes a missing index and leaves an existing one alone."""
+    index = tmp_path / "cli.index"
+    cli = _cli(completion_index=str(index))
+    runner = CliRunner()
+    runner.invoke(cli, ["sub", "--help"])
+    assert sorted(load_index(index)["commands"]) == ["sub"]
+    assert not write_completion_index(cli, str(index))
+
+    @cli.command(name="new", cls=TreeCommand)
+    def new():
+        """New command."""
+
+    def fail(root):
+        raise AssertionError("tree walked on a run")
+
+    monkeypatch.setattr("treeclick.completion.tree_signature", fail)
+    runner.invoke(cli, ["--help"])
+    assert sorted(load_index(index)["commands"]) == ["sub"]
+    monkeypatch.undo()
+    assert write_completion_index(cli, str(index))
+    assert sorted(load_index(index)["commands"]) == ["new", "sub"]
+
+
+def test_relative_index_in_cache_dir(tmp_path, monkeypatch):
+    """Test that relative index paths do not depend on the working directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+    CliRunner().invoke(_cli(completion_index="cli.index"), ["--help"])
+    assert not os.path.exists(tmp_path / "cli.index")
+    assert load_index(tmp_path / "cache" / "cli.index")["commands"]
+    script = completion_script("bash", "test", "cli.index")
+    assert str(tmp_path / "cache" / "cli.index") in script
+
+
+def test_unchanged_index_not_rebuilt(tmp_path, monkeypatch):
+    """Test that a fresh run with the same tree only compares signatures."""
+    index = tmp_path / "cli.index"
+    assert write_completion_index(_cli(), str(index))
+    built = []
+    monkeypatch.setattr(
+        "treeclick.completion.index_node", lambda *args, **kwargs: built.append(1)
+    )
+    CliRunner().invoke(_cli(completion_index=str(index)), ["sub", "--help"])
+    assert not built
+    changed = _cli()
+    changed.commands["sub"].commands["cmd"].params[1].type = click.Choice(["fast"])
+    assert tree_signature(changed) != tree_signature(_cli())
+
+
+def test_completion_script():
+    """Test the shell scripts call the completer with the index file."""
+    for shell in ("bash", "zsh", "fish"):
+        script = completion_script(shell, "my-cli", "/tmp/my.index")
+        assert COMPLETER in script and "/tmp/my.index" in script
+    assert "complete -o default -F _my_cli_treeclick_completion my-cli" in (
+        completion_script("bash", "my-cli", "/tmp/my.index")
+    )
@@ -0,0 +1,89 @@
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.dispatch import NameIndex
+
+
+def _cli(**kwargs):
+    cli = TreeGroup(name="test", help="Dispatch CLI", **kwargs)
+
+    @cli.command(name="status", cls=TreeCommand, aliases=["st"])
+    def status():
+        """Show the status."""
+        click.echo("status")
+
+    @cli.command(name="start", cls=TreeCommand)
+    def start():
+        """Start."""
+        click.echo("start")
+
+    @cli.group(name="remote", cls=TreeGroup, aliases=["rm"])
+    def remote():
+        """Remotes."""
+
+    @remote.command(name="add", cls=TreeCommand)
+    def add():
+        """Add a remote."""
+        click.echo("add")
+
+    return cli
+
+
+def _run(cli, *args):
+    return CliRunner().invoke(cli, list(args), prog_name="test")
+
+
+def test_aliases_and_prefixes():
+    """Test that aliases and unique prefixes run the registered command."""
+    cli = _cli(prefix_matching=True)
+    assert _run(cli, "st").output == "status\n"
+    assert _run(cli, "stat").output == "status\n"
+    assert _run(cli, "rm", "ad").output == "add\n"
+    assert _run(cli, "re", "add").output == "add\n"
+    result = _run(cli, "rm", "--help")
+    assert "Usage: test remote [OPTIONS]" in result.output
+    assert "add" in result.output
+
+
+def test_unknown_and_ambiguous_names():
+    """Test that unknown and ambiguous names fail with suggestions."""
+    cli = _cli(prefix_matching=True)
+    result = _run(cli, "statsu")
+    assert result.exit_code == 2
+    assert "No such command 'statsu'. Did you mean 'status'?" in result.output
+    result = _run(cli, "sta")
+    assert result.exit_code == 2
+    assert "Ambiguous command 'sta'" in result.output
+    assert "'start', 'status'" in result.output
+    assert "Did you mean" not in _run(cli, "xyz").output
+
+
+def test_prefix_matching_off():
+    """Test that by default only full names and aliases select commands."""
+    cli = _cli()
+    assert _run(cli, "st").output == "status\n"
+    assert _run(cli, "stat").exit_code == 2
+    assert _run(cli, "rm", "ad").exit_code == 2
+    result = _run(cli, "sta")
+    assert "No such command 'sta'." in result.output
+    assert "Ambiguous" not in result.output
+
+
+def test_name_index():
+    """Test prefix resolution, removal and bounded suggestions of the trie."""
+    index = NameIndex()
+    for name in ("build", "bundle", "deploy"):
+        index.add(name, name)
+    index.add("b", "build")
+    assert index.resolve("b") == "build"
+    assert index.resolve("bu") is None
+    assert index.resolve("bun") == "bundle"
+    assert index.matches("bu") == ["build", "bundle"]
+    assert index.suggest("biuld") == ["build"]
+    assert index.suggest("dpeloy") == ["deploy"]
+    assert index.suggest("zzzzzz") == []
+    index.remove("bundle")
+    assert index.resolve("bu") == "build"
+    assert "bundle" not in index and len(index) == 3
+    assert index.find("bun") is None
@@ -0,0 +1,91 @@
+import click
+from click.testing import CliRunner
+from synthetic import synthetic_tree
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.__main__ import main
+from treeclick.docs import DocsTree, write_docs
+
+
+def _cli():
+    cli = TreeGroup(name="test", help="Docs CLI\n\nLonger description.")
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="cmd", cls=TreeCommand)
+    @click.argument("path")
+    @click.option("--mode", type=click.Choice(["fast", "slow"]), required=True)
+    @click.option("--verbose", "-v", is_flag=True, help="Talk <more>")
+    def cmd(path, mode, verbose):
+        """Run cmd."""
+
+    @cli.command(name="zeta", cls=TreeCommand)
+    def zeta():
+        """Last command."""
+
+    return cli
+
+
+def test_write_all_formats(tmp_path):
+    """Test that every command gets a page in every format."""
+    assert write_docs(_cli(), str(tmp_path)) == 12
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert "test.md" in names and "test-sub-cmd.1" in names
+    assert "test-zeta.html" in names
+    markdown = (tmp_path / "test-sub-cmd.md").read_text()
+    assert markdown.startswith("# test sub cmd\n")
+    assert "test sub cmd [OPTIONS] PATH" in markdown
+    assert "- `--mode [fast|slow]`: (required)" in markdown
+    assert "- `--verbose, -v`: Talk <more>" in markdown
+
+
+def test_pages_share_tree_column(tmp_path):
+    """Test the command trees and links on group pages."""
+    write_docs(_cli(), str(tmp_path), formats=["md", "html"])
+    markdown = (tmp_path / "test.md").read_text()
+    tree = markdown.split("## Commands\n\n```\n", 1)[1].split("```", 1)[0]
+    assert tree.splitlines() == [
+        "├── sub               Sub group",
+        "│   └── cmd [PATH]    Run cmd.",
+        "└── zeta              Last command.",
+    ]
+    page = (tmp_path / "test.html").read_text()
+    link = '<a href="test-sub-cmd.html">cmd [PATH]</a>'
+    assert f"│   └── {link}    Run cmd." in page
+    assert "<p>Longer description.</p>" in page
+    assert "Talk &lt;more&gt;" in (tmp_path / "test-sub-cmd.html").read_text()
+
+
+def test_man_page(tmp_path):
+    """Test the man page sections and escaping."""
+    write_docs(_cli(), str(tmp_path), formats=["man"], prog_name="prog")
+    page = (tmp_path / "prog-sub.1").read_text()
+    assert page.startswith('.TH "PROG-SUB" "1"\n.SH NAME\nprog\\-sub \\- Sub group\n')
+    assert ".SH COMMANDS\n.nf\n└── cmd [PATH]" in page
+    assert "\\fBprog\\-sub\\-cmd\\fR(1)" in page
+    assert "\\fB\\-\\-verbose, \\-v\\fR" in (tmp_path / "prog-sub-cmd.1").read_text()
+
+
+def test_one_record_per_command():
+    """Test that records and guides cover a synthetic tree in pre-order."""
+    tree = DocsTree(synthetic_tree(depth=2, fanout=3, options=0))
+    assert len(tree.records) == 1 + 3 + 9
+    assert [len(flags) for flags in tree.flags[:3]] == [0, 1, 2]
+    assert tree.flags[-1] == (True, True)
+
+
+def test_docs_command(tmp_path, monkeypatch):
+    """Test the docs entry point and its format validation."""
+    (tmp_path / "docs_cli_mod.py").write_text(
+        "from synthetic import synthetic_tree\n"
+        "cli = synthetic_tree(depth=1, fanout=2)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    output = str(tmp_path / "out")
+    runner = CliRunner()
+    args = ["docs", "docs_cli_mod:cli", "-o", output, "-f", "md,man"]
+    result = runner.invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert "Wrote 6 pages" in result.output
+    result = runner.invoke(main, ["docs", "docs_cli_mod:cli", "-f", "pdf"])
+    assert result.exit_code == 2
@@ -0,0 +1,98 @@
+import json
+
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.export import tree_export
+from treeclick.layout import compile_layout
+
+
+def _cli(help_json=True):
+    cli = TreeGroup(name="test", help="Export CLI", help_json=help_json)
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="cmd", cls=TreeCommand)
+    @click.argument("path")
+    @click.option("--mode", type=click.Choice(["fast", "slow"]), required=True)
+    @click.option("--verbose", "-v", is_flag=True, help="Talk more")
+    def cmd(path, mode, verbose):
+        """Run cmd."""
+
+    return cli
+
+
+def test_export_schema():
+    """Test the exported records of groups, commands, arguments and options."""
+    cli = _cli()
+    data = cli.to_dict()
+    assert data["schema"] == "treeclick.tree" and data["version"] == 1
+    assert data["count"] == 3
+    assert data["global_column"] == compile_layout(cli).global_column
+    root, sub, cmd = data["nodes"]
+    assert root["path"] == [] and root["commands"] == ["sub"]
+    assert sub["type"] == "group" and sub["depth"] == 1
+    assert cmd["path"] == ["sub", "cmd"]
+    assert cmd["label"] == "cmd [PATH]" and cmd["label_width"] == 10
+    assert cmd["arguments"] == [
+        {
+            "name": "path",
+            "metavar": "PATH",
+            "required": True,
+            "nargs": 1,
+            "type": "text",
+        }
+    ]
+    mode, verbose = cmd["options"]
+    assert mode["required"] and mode["choices"] == ["fast", "slow"]
+    assert verbose["is_flag"] and verbose["opts"] == ["--verbose", "-v"]
+    assert verbose["label"] == "--verbose, -v" and verbose["help"] == "Talk more"
+
+
+def test_json_lines_match_document():
+    """Test that JSON Lines hold the header and the same node records."""
+    cli = _cli()
+    lines = [json.loads(line) for line in cli.iter_json_lines()]
+    document = json.loads(cli.to_json())
+    assert lines[0] == {k: v for k, v in document.items() if k != "nodes"}
+    assert lines[1:] == document["nodes"]
+
+
+def test_export_cached_until_tree_changes():
+    """Test that the export is reused until a command is added."""
+    cli = _cli()
+    export = tree_export(cli)
+    assert tree_export(cli) is export
+    assert export.to_json() is export.to_json()
+    cli.add_command(TreeCommand(name="new", help="New command"))
+    assert tree_export(cli) is not export
+    assert cli.to_dict()["count"] == 4
+
+
+def test_help_json_options():
+    """Test the root --help-json and --help-jsonl options."""
+    runner = CliRunner()
+    result = runner.invoke(_cli(), ["--help-json"])
+    assert result.exit_code == 0
+    assert json.loads(result.output)["count"] == 3
+    result = runner.invoke(_cli(), ["--help-jsonl"])
+    assert result.exit_code == 0
+    assert len(result.output.splitlines()) == 4
+    assert runner.invoke(_cli(), ["sub", "--help-json"]).exit_code == 2
+    assert runner.invoke(_cli(help_json=False), ["--help-json"]).exit_code == 2
+
+
+def test_json_lines_are_produced_lazily():
+    """Test that JSON Lines are serialized one at a time, also for deep trees."""
+    cli = TreeGroup(name="deep")
+    group = cli
+    for i in range(2000):
+        child = TreeGroup(name=f"level{i}")
+        group.add_command(child)
+        group = child
+    lines = cli.iter_json_lines()
+    assert json.loads(next(lines))["count"] == 2001
+    assert json.loads(next(lines))["path"] == []
+    assert tree_export(cli)._nodes is None
+    assert len(list(lines)) == 2000
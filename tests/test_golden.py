@@ -0,0 +1,86 @@
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+from synthetic import deepest_path, synthetic_tree
+
+from treeclick import TreeGroup
+from treeclick.core import format_tree_help, make_help_context
+
+# Set to regenerate the snapshots after an intended change of the output.
+UPDATE_ENV = "TREECLICK_UPDATE_GOLDEN"
+
+GOLDEN_DIR = Path(__file__).parent / "golden"
+DEMO = Path(__file__).parent.parent / "examples" / "demo.py"
+
+DEMO_PATHS = [
+    (),
+    ("user",),
+    ("user", "manage"),
+    ("user", "manage", "set-role"),
+    ("user", "manage", "permissions", "set", "add"),
+    ("info",),
+    ("project",),
+]
+
+
+def _demo():
+    spec = importlib.util.spec_from_file_location("golden_demo", DEMO)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.cli
+
+
+def _synthetic():
+    root = synthetic_tree(depth=3, fanout=3, options=2, help_words=12)
+    return root, [(), ("group-1-1",), deepest_path(root)]
+
+
+def _render(root, paths, guides, width):
+    parts = []
+    for path in paths:
+        ctx = make_help_context(root, path, terminal_width=width)
+        parts.append(f"=== {' '.join(path) or '(root)'} ===\n")
+        parts.append(
+            format_tree_help(
+                ctx,
+                is_group=isinstance(ctx.command, TreeGroup),
+                max_width=width,
+                guides=guides,
+                root_name=root.name,
+                renderer="rich",
+            )
+        )
+    return "".join(parts)
+
+
+CASES = [
+    ("demo", "tree", 120),
+    ("demo", "tree", 80),
+    ("demo", "tree", 40),
+    ("demo", "indent", 80),
+    ("demo", "ascii", 60),
+    ("synthetic", "tree", 100),
+    ("synthetic", "indent", 100),
+]
+
+
+@pytest.mark.parametrize("tree,guides,width", CASES)
+def test_golden_output(tree, guides, width, monkeypatch):
+    """Test that help output stays byte-identical to the stored snapshots."""
+    monkeypatch.setenv("TERM", "xterm-256color")
+    for name in ("COLORTERM", "NO_COLOR", "FORCE_COLOR", "TREECLICK_CATALOG"):
+        monkeypatch.delenv(name, raising=False)
+    if tree == "demo":
+        root, paths = _demo(), DEMO_PATHS
+    else:
+        root, paths = _synthetic()
+    output = _render(root, paths, guides, width)
+    golden = GOLDEN_DIR / f"{tree}_{guides}_{width}.txt"
+    if os.environ.get(UPDATE_ENV):
+        GOLDEN_DIR.mkdir(exist_ok=True)
+        with open(golden, "w", encoding="utf-8", newline="") as f:
+            f.write(output)
+    with open(golden, encoding="utf-8", newline="") as f:
+        assert output == f.read()
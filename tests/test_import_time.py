@@ -0,0 +1,59 @@
+import re
+import subprocess
+import sys
+
+# treeclick's own import time, excluding click, may be at most this many
+# times that of click. Relative to click, the budget holds on slow and busy
+# machines alike; the best of a few runs filters out scheduling noise.
+IMPORT_BUDGET_RATIO = 1.5
+IMPORT_RUNS = 3
+
+SCRIPT = """
+import sys
+import click
+from treeclick import TreeCommand, TreeGroup
+
+cli = TreeGroup(name="test", help="Test CLI")
+
+@cli.command(name="echo", cls=TreeCommand)
+@click.argument("message")
+def echo(message):
+    click.echo(message)
+
+cli(["echo", "hello"], standalone_mode=False)
+print(sorted(m for m in sys.modules if m == "rich" or m.startswith("rich.")))
+"""
+
+
+def _run(*args):
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def test_dispatch_does_not_import_rich():
+    """Test that importing treeclick and running a command never loads rich."""
+    result = _run("-c", SCRIPT)
+    assert result.stdout.splitlines() == ["hello", "[]"]
+
+
+def _import_times():
+    """Cumulative import time of every module of ``import treeclick``, in us."""
+    result = _run("-X", "importtime", "-c", "import treeclick")
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            cumulative[match.group(2)] = int(match.group(1))
+    return cumulative
+
+
+def test_import_time_budget():
+    """Test that treeclick's own import time stays within budget."""
+    runs = [_import_times() for _ in range(IMPORT_RUNS)]
+    assert not any(name.startswith("rich") for run in runs for name in run)
+    own = min(run["treeclick"] - run["click"] for run in runs)
+    click = min(run["click"] for run in runs)
+    assert own < IMPORT_BUDGET_RATIO * click, (
+        f"treeclick import took {own} us, click {click} us"
+    )
@@ -0,0 +1,75 @@
+import time
+
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.instrument import NULL_RECORDER, Recorder, help_recorder
+
+
+def _cli(**kwargs):
+    cli = TreeGroup(name="test", help="Instrumented CLI", **kwargs)
+    sub = TreeGroup(name="sub", help="Sub group")
+    cli.add_command(sub)
+
+    @sub.command(name="run", cls=TreeCommand)
+    @click.option("--fast", help="Go fast")
+    def run(fast):
+        """Run it."""
+
+    return cli
+
+
+def test_hooks_receive_events():
+    """Test that an instrument hook sees the render events and metrics."""
+    events = []
+    cli = _cli(instrument=lambda event, data: events.append((event, data)))
+    result = CliRunner().invoke(cli, ["sub", "--help"], prog_name="test", color=True)
+    assert result.exit_code == 0
+    names = [event for event, _ in events]
+    assert names[0] == "render_start"
+    assert names[-1] == "render_end"
+    assert names.count("node_visited") == 4
+    start, end = events[0][1], events[-1][1]
+    assert start["path"] == ("sub",)
+    assert set(end["phases"]) >= {"catalog", "layout", "header", "labels", "render"}
+    assert end["counters"]["nodes"] == 4
+    assert end["counters"]["wraps"] > 0
+    assert end["counters"]["output_chars"] == len(result.output) - 1
+    assert end["counters"]["measured"] == 4
+    assert ("cache_miss", {"cache": "layout", "count": 1}) in events
+
+    # The second render reuses the layout and measures nothing.
+    events.clear()
+    CliRunner().invoke(cli, ["sub", "--help"], prog_name="test", color=True)
+    names = [event for event, _ in events]
+    assert "node_visited" not in names
+    assert ("cache_hit", {"cache": "layout", "count": 1}) in events
+    assert "measured" not in events[-1][1]["counters"]
+    assert events[-1][1]["counters"]["nodes"] == 4
+
+
+def test_report_from_environment(monkeypatch, stderr_runner):
+    """Test that the environment variable prints a summary to stderr."""
+    monkeypatch.setenv("TREECLICK_INSTRUMENT", "1")
+    result = stderr_runner.invoke(_cli(), ["--help"], prog_name="test")
+    assert result.exit_code == 0
+    assert result.stderr.startswith("treeclick help: ")
+    assert "4 nodes" in result.stderr
+    result = stderr_runner.invoke(_cli(), ["sub", "--help"], prog_name="test")
+    assert result.stderr.startswith("treeclick help sub: ")
+
+
+def test_disabled_by_default(monkeypatch):
+    """Test that no recorder is created unless instrumentation is enabled."""
+    monkeypatch.delenv("TREECLICK_INSTRUMENT", raising=False)
+    assert help_recorder(_cli()) is NULL_RECORDER
+
+
+def test_phases_are_exclusive():
+    """Test that nested phase time is not counted in the outer phase."""
+    recorder = Recorder()
+    with recorder.phase("outer"), recorder.phase("inner"):
+        time.sleep(0.02)
+    assert recorder.phases["inner"] >= 0.02
+    assert recorder.phases["outer"] < 0.01
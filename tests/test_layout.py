@@ -0,0 +1,176 @@
+import click
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.layout import compile_layout, select_rows
+
+
+def _cli():
+    cli = TreeGroup(name="test", help="Root help")
+    sub = TreeGroup(name="sub", help="Sub help")
+    cli.add_command(sub)
+
+    @sub.command(name="cmd", cls=TreeCommand)
+    @click.argument("name")
+    @click.option("--long-option", "-l", help="Long option")
+    def cmd(name, long_option):
+        pass
+
+    @cli.command(name="other", cls=TreeCommand)
+    def other():
+        pass
+
+    return cli
+
+
+def test_compile_layout_model():
+    """Test that one walk yields every node with its width and depth."""
+    layout = compile_layout(_cli())
+    summary = [(n.kind, n.name, n.depth, n.width) for n in layout.nodes]
+    assert summary == [
+        ("group", "test", 0, 4),
+        ("command", "other", 1, 6),
+        ("group", "sub", 1, 4),
+        ("command", "cmd", 2, 10),
+        ("option", "--long-option, -l", 3, 17),
+    ]
+    # The widest effective label is the option: 17 + 3 * 4 - 4 + 1
+    assert layout.global_column == 26
+
+
+def test_select_rows_for_path():
+    """Test that ancestors are dimmed and only the current subtree expands."""
+    layout = compile_layout(_cli())
+    rows = [
+        (node.name, style, last) for node, style, last in select_rows(layout, ["sub"])
+    ]
+    assert rows == [
+        ("test", "dim", True),
+        ("sub", "current", True),
+        ("cmd", None, True),
+        ("--long-option, -l", None, True),
+    ]
+
+
+def test_guide_levels():
+    """Test the guide pieces computed for each row of the tree."""
+    from treeclick.layout import CONTINUE, END, FORK, SPACE, guide_levels
+
+    layout = compile_layout(_cli())
+    rows = list(select_rows(layout, []))
+    assert [node.name for node, _, _ in rows] == [
+        "test",
+        "other",
+        "sub",
+        "cmd",
+        "--long-option, -l",
+    ]
+    assert [levels for _, _, levels in guide_levels(rows)] == [
+        ((), ()),
+        ((FORK,), (CONTINUE,)),
+        ((END,), (SPACE,)),
+        ((SPACE, END), (SPACE, SPACE)),
+        ((SPACE, SPACE, END), (SPACE, SPACE, SPACE)),
+    ]
+
+
+def test_subtree_extents_follow_added_commands():
+    """Test that path layouts share the column of the whole tree as it grows."""
+    cli = _cli()
+    assert cli.child_names == ["other", "sub"]
+    assert cli.subtree_extents == (18, 29)
+    layout = compile_layout(cli, ("other",))
+    assert [n.name for n in layout.nodes] == ["test", "other"]
+    assert layout.global_column == 26
+
+    sub = cli.commands["sub"]
+    deep = TreeGroup(name="deep")
+    sub.add_command(deep)
+    deep.add_command(TreeCommand(name="a-much-longer-command-name"))
+    assert sub.child_names == ["cmd", "deep"]
+    assert compile_layout(cli, ("other",)).global_column == 40
+    assert compile_layout(cli).global_column == 40
+
+    # Replacing the widest command shrinks the extents again.
+    sub.add_command(TreeGroup(name="deep"))
+    assert compile_layout(cli, ("other",)).global_column == 26
+
+
+def test_subtree_extents_in_mixed_tree():
+    """Test extents below plain click groups and for options added later."""
+    cli = _cli()
+
+    @cli.group()
+    def plain():
+        """A plain click group."""
+
+    assert type(plain) is click.Group and cli.subtree_extents is None
+    plain.add_command(TreeCommand(name="a-much-longer-command-name"))
+    assert compile_layout(cli, ("other",)).global_column == 36
+    assert compile_layout(cli).global_column == 36
+
+    cli = _cli()
+    other = cli.commands["other"]
+    click.option("--a-very-long-option-name", help="Added late")(other)
+    assert cli.subtree_extents == (18, 33)
+    assert compile_layout(cli, ("sub",)).global_column == 30
+    assert compile_layout(cli).global_column == 30
+
+
+def test_compact_nodes():
+    """Test that layout nodes are slotted and option labels are shared."""
+    layout = compile_layout(_cli())
+    option = layout.nodes[-1]
+    assert not hasattr(option, "__dict__")
+    assert option.commands == () and option.options == ()
+    again = compile_layout(_cli()).nodes[-1]
+    assert again.label is option.label
+
+
+def test_deep_trees_are_not_capped():
+    """Test that trees of any depth are compiled and shown in full."""
+    cli = TreeGroup(name="test")
+    group = cli
+    for level in range(1500):
+        child = TreeGroup(name=f"g{level}")
+        group.add_command(child)
+        group = child
+    group.add_command(TreeCommand(name="leaf"))
+    rows = list(select_rows(compile_layout(cli), ()))
+    assert rows[-1][0].name == "leaf" and rows[-1][0].depth == 1501
+    path = tuple(f"g{level}" for level in range(1500))
+    assert compile_layout(cli, path).lookup(path + ("leaf",)) is not None
+
+
+def test_shared_subtrees_are_compiled_once():
+    """Test that a command registered under several groups shares its nodes."""
+    bundle = TreeGroup(name="bundle")
+    bundle.add_command(TreeCommand(name="run", params=[click.Option(["--fast"])]))
+    cli = TreeGroup(name="test")
+    for name in ("a", "b"):
+        group = TreeGroup(name=name)
+        group.add_command(bundle)
+        cli.add_command(group)
+    layout = compile_layout(cli)
+    assert layout.lookup(("a", "bundle")) is layout.lookup(("b", "bundle"))
+    assert [n.name for n in layout.nodes].count("run") == 1
+    names = [node.name for node, _, _ in select_rows(layout, ())]
+    assert names.count("run") == 2 and names.count("--fast") == 2
+
+
+def test_cycles_are_cut():
+    """Test that a group added below itself is shown once with a notice."""
+    from click.testing import CliRunner
+
+    cli = _cli()
+    sub = cli.commands["sub"]
+    sub.add_command(cli, name="again")
+    assert cli.subtree_extents is None and sub.subtree_extents is None
+    rows = list(select_rows(compile_layout(cli), ()))
+    notices = [node for node, _, _ in rows if node.kind == "notice"]
+    assert [node.help for node in notices] == [
+        "Cycle: again is its own ancestor, not expanded again"
+    ]
+    assert compile_layout(cli, ("sub",)).global_column == 26
+    result = CliRunner().invoke(cli, ["sub", "again", "sub", "--help"])
+    assert result.exit_code == 0
+    assert "Cycle: sub is its own ancestor" in result.output
@@ -0,0 +1,107 @@
+import re
+import sys
+
+from click.testing import CliRunner
+
+from treeclick import LazyTreeGroup
+
+MODULE = '''
+import click
+from treeclick import TreeCommand, TreeGroup
+
+@click.command(name="greet", cls=TreeCommand)
+@click.argument("name")
+@click.option("--shout", "-s", is_flag=True, help="Shout the greeting.")
+@click.option("--greeting", default="Hello", help="Greeting to use.")
+def greet(name, shout, greeting):
+    """Greet someone."""
+    msg = f"{greeting} {name}"
+    click.echo(msg.upper() if shout else msg)
+
+@click.group(name="grp", cls=TreeGroup)
+def grp():
+    """The real group."""
+
+@grp.command(name="inner", cls=TreeCommand)
+def inner():
+    """The inner command."""
+'''
+
+MANIFEST = {
+    "name": "test",
+    "help": "Lazy CLI",
+    "commands": {
+        "greet": {
+            "import_path": "lazy_greet_mod:greet",
+            "help": "Greet someone.",
+            "arguments": ["name"],
+            "options": [
+                {"opts": ["--shout", "-s"], "is_flag": True, "help": "Shout it."},
+                {"opts": ["--greeting"], "help": "Greeting."},
+            ],
+        },
+        "grp": {"import_path": "lazy_greet_mod:grp", "help": "A lazy group."},
+        "tools": {
+            "help": "Nested tools.",
+            "commands": {
+                "hi": {"import_path": "lazy_greet_mod:greet", "help": "Say hi."}
+            },
+        },
+    },
+}
+
+
+def _lazy_cli(tmp_path, monkeypatch):
+    (tmp_path / "lazy_greet_mod.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_greet_mod", raising=False)
+    return LazyTreeGroup.from_manifest(MANIFEST)
+
+
+def test_lazy_help_does_not_import(tmp_path, monkeypatch):
+    """Test that help for the root and a lazy command uses only metadata."""
+    cli = _lazy_cli(tmp_path, monkeypatch)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--help"], color=True, prog_name="test")
+    assert result.exit_code == 0
+    output = re.sub(r"\x1b\[[0-9;]*m", "", result.output)
+    assert "greet [NAME]" in output
+    assert "--shout, -s" in output
+    assert "tools" in output and "Say hi." in output
+
+    result = runner.invoke(cli, ["greet", "--help"], color=True, prog_name="test")
+    assert result.exit_code == 0
+    assert "Shout it." in result.output
+    assert "lazy_greet_mod" not in sys.modules
+
+
+def test_lazy_command_runs(tmp_path, monkeypatch):
+    """Test that running a lazy command imports and invokes the real one."""
+    cli = _lazy_cli(tmp_path, monkeypatch)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["greet", "bob", "-s"], prog_name="test")
+    assert result.exit_code == 0
+    assert "HELLO BOB" in result.output
+    assert "lazy_greet_mod" in sys.modules
+
+    result = runner.invoke(cli, ["tools", "hi", "ann"], prog_name="test")
+    assert result.exit_code == 0
+    assert "Hello ann" in result.output
+
+
+def test_lazy_help_flag_placement(tmp_path, monkeypatch):
+    """Test that only a leading help flag is answered from the metadata."""
+    cli = _lazy_cli(tmp_path, monkeypatch)
+    runner = CliRunner()
+    result = runner.invoke(cli, ["greet", "-s", "--help"], prog_name="test")
+    assert "Shout it." in result.output
+    assert "lazy_greet_mod" not in sys.modules
+
+    result = runner.invoke(cli, ["grp", "inner", "--help"], prog_name="test")
+    assert result.exit_code == 0
+    assert "Usage: test grp inner [OPTIONS]" in result.output
+    assert "The inner command." in result.output
+
+    result = runner.invoke(cli, ["greet", "--greeting", "--help", "bob"])
+    assert result.exit_code == 0
+    assert result.output == "--help bob\n"
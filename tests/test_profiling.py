@@ -0,0 +1,75 @@
+import json
+
+import click
+from click.testing import CliRunner
+from synthetic import synthetic_tree
+
+from treeclick.__main__ import main
+from treeclick.profiling import format_report, profile_cli
+
+MODULE = """
+from synthetic import synthetic_tree
+
+cli = synthetic_tree(depth=1, fanout=2)
+"""
+
+
+def test_profile_every_path():
+    """Test a report row per command path and the hot function list."""
+    cli = synthetic_tree(depth=2, fanout=2)
+    report = profile_cli(cli, prog_name="syn", repeat=1, functions=5)
+    paths = [row["path"] for row in report["paths"]]
+    assert paths[:3] == [[], ["group-1-0"], ["group-1-0", "command-2-0"]]
+    assert len(paths) == 7
+    root, group = report["paths"][:2]
+    assert root["nodes"] > group["nodes"] > 0
+    assert root["chars"] > group["chars"] > 0
+    assert root["peak_kib"] > 0 and "layout" in root["phases_ms"]
+    assert 0 < len(report["functions"]) <= 5
+    assert all(f["function"].startswith("treeclick.") for f in report["functions"])
+    assert getattr(cli, "_help_layouts", None) is None
+
+
+def test_plain_click_group_and_depth_limit():
+    """Test profiling a plain click group up to a depth."""
+
+    @click.group()
+    def cli():
+        """Plain group."""
+
+    @cli.group()
+    def sub():
+        """Sub group."""
+
+    @sub.command()
+    def leaf():
+        """Leaf."""
+
+    report = profile_cli(cli, max_depth=1, functions=0)
+    assert [row["path"] for row in report["paths"]] == [[], ["sub"]]
+    assert report["functions"] == []
+
+
+def test_format_report_sorts_rows():
+    """Test the table rows sorted by node count and limited."""
+    report = profile_cli(synthetic_tree(depth=2, fanout=2), repeat=1, functions=2)
+    lines = format_report(report, sort="nodes", limit=2)
+    assert lines[0].startswith("synthetic: 7 paths, width 80")
+    assert lines[2].endswith("  synthetic")
+    assert len(lines) == 2 + 2 + 2 + 2
+
+
+def test_profile_command(tmp_path, monkeypatch):
+    """Test the profile entry point with JSON output and import time."""
+    (tmp_path / "profile_cli_mod.py").write_text(MODULE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    result = CliRunner().invoke(
+        main, ["profile", "profile_cli_mod:cli", "--json", "--repeat", "1"]
+    )
+    assert result.exit_code == 0, result.output
+    report = json.loads(result.output)
+    assert report["target"] == "profile_cli_mod:cli"
+    assert report["import_ms"] > 0
+    assert len(report["paths"]) == 3
+    result = CliRunner().invoke(main, ["profile", "profile_cli_mod:cli"])
+    assert result.exit_code == 0 and "cold ms" in result.output
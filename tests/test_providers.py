@@ -0,0 +1,119 @@
+import re
+
+import click
+from click.testing import CliRunner
+
+from treeclick import LazyChoice, TreeCommand, TreeGroup, TreeOption
+from treeclick.catalog import tree_fingerprint
+from treeclick.completion import tree_signature
+
+
+def _cli(calls, **kwargs):
+    """A CLI whose help texts and choices record when they are produced."""
+
+    def provider(key, value):
+        def produce():
+            calls.append(key)
+            return value
+
+        return produce
+
+    cli = TreeGroup(name="test", help=provider("test", "Provider CLI"), **kwargs)
+    for group_name in ("alpha", "beta"):
+        group = TreeGroup(name=group_name, help=provider(group_name, "A group"))
+        cli.add_command(group)
+
+        run_help = provider(f"{group_name}.run", "Run it")
+
+        @group.command(name="run", cls=TreeCommand, help=run_help)
+        @click.option(
+            "--mode",
+            cls=TreeOption,
+            type=LazyChoice(provider(f"{group_name}.choices", ["fast", "slow"])),
+            help=provider(f"{group_name}.mode", "Run mode"),
+        )
+        def run(mode):
+            click.echo(f"mode={mode}")
+
+    return cli
+
+
+def _help(cli, args=()):
+    result = CliRunner().invoke(cli, [*args, "--help"], prog_name="test")
+    assert result.exit_code == 0, result.output
+    return re.sub(r"\x1b\[[0-9;]*m", "", result.output)
+
+
+def test_dispatch_resolves_nothing():
+    """Test that building the tree and running a command call no provider."""
+    calls = []
+    result = CliRunner().invoke(_cli(calls), ["alpha", "run"])
+    assert result.exit_code == 0 and result.output == "mode=None\n"
+    assert calls == []
+
+
+def test_choices_resolved_when_value_given():
+    """Test that a LazyChoice produces its choices to check a value."""
+    calls = []
+    cli = _cli(calls)
+    assert CliRunner().invoke(cli, ["alpha", "run", "--mode", "slow"]).exit_code == 0
+    assert CliRunner().invoke(cli, ["alpha", "run", "--mode", "wild"]).exit_code == 2
+    assert calls == ["alpha.choices"]
+
+
+def test_root_help_resolves_each_provider_once():
+    """Test the rendered help texts, choices and defaults."""
+    calls = []
+    cli = _cli(calls)
+    output = _help(cli)
+    assert "Provider CLI" in output
+    assert "Run it" in output
+    assert "Run mode [choices: fast, slow]" in output
+    assert sorted(calls) == sorted(set(calls))
+    assert len(calls) == 9
+    _help(cli)
+    assert len(calls) == 9
+
+
+def test_only_shown_nodes_resolved():
+    """Test that help below the root and budgeted help skip hidden nodes."""
+    calls = []
+    output = _help(_cli(calls), ["alpha"])
+    assert "Run mode" in output
+    assert not any(call.startswith("beta") for call in calls)
+    calls = []
+    _help(_cli(calls, max_depth=1))
+    assert not any(call.endswith(("run", "mode", "choices")) for call in calls)
+
+
+def test_signatures_resolve_nothing(tmp_path):
+    """Test that catalog and completion signatures call no provider."""
+    calls = []
+    cli = _cli(calls)
+    # Help from providers cannot be checked, so there is no fingerprint.
+    assert tree_fingerprint(cli) is None
+    signature = tree_signature(cli)
+    assert calls == []
+    _help(cli)
+    assert tree_fingerprint(cli) is None
+    assert tree_signature(_cli([])) == signature
+    calls = []
+    index = tmp_path / "cli.index"
+    CliRunner().invoke(_cli(calls, completion_index=str(index)), ["alpha", "run"])
+    assert sorted(calls) == ["alpha.choices", "beta.choices"]
+    calls = []
+    CliRunner().invoke(_cli(calls, completion_index=str(index)), ["alpha", "run"])
+    assert calls == []
+
+
+def test_default_text():
+    """Test how defaults are shown, including a show_default provider."""
+    assert TreeOption(["--n"], default=3, show_default=True).help_text() == (
+        "[default: 3]"
+    )
+    flag = TreeOption(["--quiet"], is_flag=True, show_default=True, help="Hush")
+    assert flag.help_text() == "Hush"
+    dynamic = TreeOption(["--at"], default=lambda: 1, show_default=True)
+    assert dynamic.help_text() == "[default: (dynamic)]"
+    custom = TreeOption(["--at"], default=lambda: 1, show_default=lambda: "now")
+    assert custom.help_text() == "[default: now]"
@@ -0,0 +1,143 @@
+import re
+import sys
+import time
+
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+from treeclick.catalog import build_catalog
+from treeclick.search import SearchIndex, search_index
+
+
+def _cli(help_search=True):
+    cli = TreeGroup(name="test", help="Search CLI", help_search=help_search)
+    user = TreeGroup(name="user", help="Manage users")
+    cli.add_command(user)
+
+    @user.command(name="set-role", cls=TreeCommand)
+    @click.argument("role")
+    @click.option("--reason", help="Why the role changes")
+    def set_role(role, reason):
+        """Give a user a role."""
+
+    @cli.command(name="deploy", cls=TreeCommand)
+    @click.option("--region", help="Target region for the user")
+    def deploy(region):
+        """Deploy the service."""
+
+    return cli
+
+
+def _search(cli, term):
+    result = CliRunner().invoke(cli, ["--help-search", term], prog_name="test")
+    assert result.exit_code == 0
+    return re.sub(r"\x1b\[[0-9;]*m", "", result.output)
+
+
+def test_search_shows_pruned_tree():
+    """Test that only matches and their ancestors are shown."""
+    output = _search(_cli(), "role")
+    assert "1 match for role" in output
+    assert "user" in output and "set-role [ROLE]" in output
+    assert "--reason" in output
+    assert "deploy" not in output
+
+
+def test_search_ranking():
+    """Test that name matches rank above help and option matches."""
+    results = SearchIndex(_cli()).search("user")
+    assert [path for path, _ in results] == [
+        ("user",),
+        ("deploy",),
+        ("user", "set-role"),
+    ]
+
+
+def test_search_prefix_and_all_terms():
+    """Test prefix matching and that every query term must match."""
+    index = SearchIndex(_cli())
+    assert [path for path, _ in index.search("reg")] == [("deploy",)]
+    assert index.search("role deploy") == []
+
+
+def test_search_no_match():
+    """Test the message shown when nothing matches."""
+    assert "No commands match nothing." in _search(_cli(), "nothing")
+
+
+def test_search_only_on_root():
+    """Test that subgroups do not accept --help-search."""
+    result = CliRunner().invoke(_cli(), ["user", "--help-search", "role"])
+    assert result.exit_code == 2
+    result = CliRunner().invoke(_cli(help_search=False), ["--help-search", "x"])
+    assert result.exit_code == 2
+
+
+def test_search_off_by_default():
+    """Test that --help-search is only added when asked for."""
+    cli = TreeGroup(name="test")
+    assert CliRunner().invoke(cli, ["--help-search", "x"]).exit_code == 2
+
+
+def test_search_index_cached_until_tree_changes():
+    """Test that the index is reused until a command is added."""
+    cli = _cli()
+    index = search_index(cli)
+    assert search_index(cli) is index
+
+    @cli.command(name="rotate", cls=TreeCommand)
+    def rotate():
+        """Rotate the keys."""
+
+    rebuilt = search_index(cli)
+    assert rebuilt is not index
+    assert [path for path, _ in rebuilt.search("rotate")] == [("rotate",)]
+
+
+def test_search_large_tree_is_fast():
+    """Test that a cached search over a large tree stays well under a millisecond."""
+    cli = TreeGroup(name="big")
+    for i in range(100):
+        group = TreeGroup(name=f"group{i}", help=f"Group number {i}")
+        cli.add_command(group)
+        for j in range(100):
+            cmd = TreeCommand(
+                name=f"cmd{j}",
+                help=f"Command {j} of group {i}",
+                params=[click.Option([f"--opt{j}"], help="An option")],
+            )
+            group.add_command(cmd)
+    index = search_index(cli)
+    start = time.perf_counter()
+    for _ in range(100):
+        results = index.search("cmd42")
+    elapsed = (time.perf_counter() - start) / 100
+    assert len(results) == 100
+    assert elapsed < 0.001
+
+
+def test_search_index_deeper_than_recursion_limit():
+    """Test that indexing does not recurse per level of the tree."""
+    cli = group = TreeGroup(name="deep")
+    for depth in range(sys.getrecursionlimit() + 100):
+        child = TreeGroup(name=f"level{depth}")
+        group.add_command(child)
+        group = child
+    path, _ = SearchIndex(cli).search("level5")[0]
+    assert path == tuple(f"level{depth}" for depth in range(6))
+
+
+def test_search_index_from_catalog(tmp_path, monkeypatch):
+    """Test that a fresh help catalog supplies the search index."""
+    cli = _cli()
+    filename = str(tmp_path / "help.catalog")
+    build_catalog(cli, filename, widths=(80,), prog_name="test")
+    cli.catalog = filename
+    expected = SearchIndex(cli).search("user")
+
+    def fail(self, root):
+        raise AssertionError("search index built from the tree")
+
+    monkeypatch.setattr(SearchIndex, "__init__", fail)
+    assert search_index(cli).search("user") == expected
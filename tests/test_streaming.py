@@ -0,0 +1,41 @@
+import click
+from click.testing import CliRunner
+
+from treeclick import TreeCommand, TreeGroup
+
+
+def _cli(**kwargs):
+    cli = TreeGroup(name="test", help="Streaming CLI", **kwargs)
+    for i in range(200):
+        sub = TreeGroup(name=f"group{i:03d}", help=f"Group number {i}")
+        cli.add_command(sub)
+
+        @sub.command(name="cmd", cls=TreeCommand)
+        @click.option("--opt", "-o", help="An option")
+        def cmd(opt):
+            pass
+
+    return cli
+
+
+def test_iter_help_is_lazy():
+    """Test that help is produced line by line from a generator."""
+    cli = _cli()
+    ctx = click.Context(cli, info_name="test")
+    lines = cli.iter_help(ctx)
+    first = [next(lines) for _ in range(5)]
+    assert "Usage:" in first[1]
+    assert "Commands:" in first[4]
+    rest = list(lines)
+    assert len(first) + len(rest) > 600
+    assert "".join(first + rest) == cli.get_help(ctx)
+
+
+def test_streaming_and_pager_output():
+    """Test that streamed and paged help match the regular help output."""
+    runner = CliRunner()
+    expected = runner.invoke(_cli(), ["--help"], prog_name="test").output
+    for settings in ({"streaming": True}, {"pager": True}):
+        result = runner.invoke(_cli(**settings), ["--help"], prog_name="test")
+        assert result.exit_code == 0
+        assert result.output == expected
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from synthetic import synthetic_tree
+
+from treeclick import TreeCommand, TreeGroup, core
+from treeclick.threadsafe import HelpRenderer
+
+
+def _paths(root):
+    """Every command path below ``root``, root included."""
+    paths = [()]
+    for name, cmd in sorted(root.commands.items()):
+        if isinstance(cmd, click.Group):
+            paths.extend((name, *path) for path in _paths(cmd))
+        else:
+            paths.append((name,))
+    return paths
+
+
+def test_render_matches_help_option(monkeypatch):
+    """Test that rendered help equals --help output with the same settings."""
+    monkeypatch.setattr("sys.argv", ["syn"])
+    cli = synthetic_tree(depth=2, fanout=2, renderer="ansi")
+    expected = cli.get_help(click.Context(cli, info_name="syn", terminal_width=70))
+    renderer = HelpRenderer(cli, root_name="syn")
+    assert renderer.render(width=70) == expected
+    monkeypatch.setattr("sys.argv", ["other"])
+    assert renderer.render(width=70) == expected
+
+
+def test_budget_fixed_at_creation():
+    """Test that changing the root's budget later does not affect a renderer."""
+    cli = synthetic_tree(depth=2, fanout=2, renderer="ansi")
+    renderer = HelpRenderer(cli, root_name="syn")
+    expected = renderer.render(width=70)
+    cli.max_depth = 0
+    assert renderer.render(width=70) == expected
+    assert HelpRenderer(cli, root_name="syn").render(width=70) != expected
+
+
+def test_concurrent_renders_are_identical(monkeypatch):
+    """Stress test: many threads render every path at several widths."""
+    cli = synthetic_tree(depth=3, fanout=3)
+    compiles = []
+    compile_layout = core.compile_layout
+
+    def counting_compile(*args):
+        compiles.append(tuple(args[1]))
+        return compile_layout(*args)
+
+    monkeypatch.setattr("treeclick.core.compile_layout", counting_compile)
+    renderer = HelpRenderer(cli, root_name="syn")
+    jobs = [(path, width) for path in _paths(cli) for width in (60, 100)] * 4
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outputs = list(pool.map(lambda job: renderer.render(*job), jobs))
+    expected = {job: renderer.render(*job) for job in set(jobs)}
+    assert outputs == [expected[job] for job in jobs]
+    assert sorted(compiles) == sorted(set(compiles))
+
+
+def test_providers_called_once_across_threads():
+    """Test that a lazy help provider runs once when threads race for it."""
+    calls = []
+    started = threading.Barrier(4)
+
+    def slow_help():
+        calls.append(1)
+        return "Slow help"
+
+    cli = TreeGroup(name="test", help="Test CLI")
+    cli.add_command(TreeCommand(name="cmd", help=slow_help))
+    renderer = HelpRenderer(cli)
+
+    def render():
+        started.wait()
+        return renderer.render(("cmd",))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        outputs = list(pool.map(lambda _: render(), range(4)))
+    assert calls == [1]
+    assert len(set(outputs)) == 1 and "Slow help" in outputs[0]
+
+
+def test_render_async():
+    """Test that the asyncio wrapper renders in an executor."""
+    cli = synthetic_tree(depth=2, fanout=2)
+    renderer = HelpRenderer(cli, root_name="syn", renderer="rich")
+
+    async def render_all():
+        return await asyncio.gather(
+            *(renderer.render_async(path) for path in _paths(cli))
+        )
+
+    outputs = asyncio.run(render_all())
+    assert outputs == [renderer.render(path) for path in _paths(cli)]
@@ -226,3 +226,50 @@ def test_command_execution():
     assert result.exit_code == 0
     assert "Usage:" in result.output
     assert "Echo:" not in result.output  # Should show help, not run command
+
+
+def test_required_option_marker():
+    """Test that required options are marked with a star, not raw markup."""
+    cli = TreeGroup(name="test", help="Test CLI")
+
+    @cli.command(name="cmd", cls=TreeCommand)
+    @click.option("--opt", required=True, help="Needed option")
+    def cmd(opt):
+        pass
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["cmd", "--help"], color=True, prog_name="test")
+    assert result.exit_code == 0
+    output = re.sub(r"\x1b\[[0-9;]*m", "", result.output)
+    assert "[red]" not in output
+    assert re.search(r"--opt\s+\* Needed option", output) is not None
+
+
+def test_ascii_guides():
+    """Test the ASCII guide style, which matches the tree layout."""
+
+    def make_cli(**kwargs):
+        cli = TreeGroup(name="test", help="Test CLI", **kwargs)
+        sub = TreeGroup(name="sub", help="Sub")
+        cli.add_command(sub)
+
+        @sub.command(name="cmd", cls=TreeCommand)
+        @click.option("--opt", help="Option")
+        def cmd(opt):
+            pass
+
+        @cli.command(name="other", cls=TreeCommand)
+        def other():
+            pass
+
+        return cli
+
+    runner = CliRunner()
+    tree = runner.invoke(make_cli(), ["--help"], prog_name="test").output
+    ascii_ = runner.invoke(make_cli(guides="ascii"), ["--help"], prog_name="test")
+    assert ascii_.exit_code == 0
+    assert "+-- " in ascii_.output and "`-- " in ascii_.output
+    assert "─" not in ascii_.output
+    for old, new in (("├── ", "+-- "), ("└── ", "`-- "), ("│   ", "|   ")):
+        tree = tree.replace(old, new)
+    assert ascii_.output == tree
@@ -0,0 +1,20 @@
+from rich.cells import cell_len
+
+from treeclick.widths import cell_width, cell_widths
+
+
+def test_ascii_width():
+    """Test that ASCII labels are one cell per character."""
+    assert cell_width("--user-id, -u") == 13
+    assert cell_width("") == 0
+
+
+def test_wide_characters_match_rich():
+    """Test that wide and combining characters are measured like rich does."""
+    for text in ["日本語", "--名前, -n", "café", "ｆｕｌｌ"]:
+        assert cell_width(text) == cell_len(text)
+
+
+def test_batch_measurement():
+    """Test that batch measurement returns a width per label, in order."""
+    assert cell_widths(["ab", "日本", "ab", ""]) == [2, 4, 2, 0]
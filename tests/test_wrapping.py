@@ -0,0 +1,39 @@
+import textwrap
+
+from treeclick.widths import cell_width
+from treeclick.wrapping import cache_info, wrap, wrap_batch
+
+
+def test_ascii_matches_textwrap():
+    """Test that ASCII text wraps exactly like ``textwrap.wrap``."""
+    texts = [
+        "",
+        "   ",
+        "  leading space kept",
+        "Short help.",
+        "Set the role of the user-account and tab\tseparated words",
+        "averyveryverylongwordthatmustbebroken and x-y-z-hyphenated-words",
+    ]
+    for text in texts:
+        for width in (1, 5, 12, 40, 200):
+            assert list(wrap(text, width)) == textwrap.wrap(text, width=width)
+
+
+def test_wide_characters_fit_cells():
+    """Test that wide characters are wrapped by terminal cells."""
+    lines = wrap("日本語のヘルプテキストはとても長いです 次の行", 10)
+    assert lines == ("日本語のヘ", "ルプテキス", "トはとても", "長いです", "次の行")
+    assert wrap("emoji 😀😀😀😀 done", 5) == ("emoji", "😀😀", "😀😀", "done")
+    assert all(cell_width(line) <= 3 for line in wrap("日本語 ab", 3))
+
+
+def test_wrap_cache_and_batch():
+    """Test that repeated wraps hit the cache and batches wrap distinct texts."""
+    wrap.cache_clear()
+    wrap("Cached help text", 8)
+    wrap("Cached help text", 8)
+    assert cache_info().hits == 1
+    wrapped = wrap_batch(["One help", "Two help", "One help", ""], [4, 40])
+    assert len(wrapped) == 4
+    assert wrapped["One help", 4] == ("One", "help")
+    assert wrapped["Two help", 40] == ("Two help",)